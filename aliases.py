@@ -0,0 +1,202 @@
+# aliases.py
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+from datetime import datetime
+
+import pandas as pd
+
+from names import alias_categories, normalize_name
+from paths import app_data_path
+
+SCHEMA_VERSION = 1
+SOURCES = ('agency', 'protime')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS aliases (
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    worker_id TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    score REAL,
+    added TEXT NOT NULL,
+    PRIMARY KEY (source, name)
+);
+"""
+
+
+def default_alias_path():
+    """
+    Return the per-user location of the name alias table.
+    """
+    return app_data_path('aliases.sqlite')
+
+
+class AliasStore:
+    def __init__(self, path):
+        """
+        SQLite table mapping the normalized names of each source ('agency' or 'protime') to a canonical
+        worker ID, which the comparison uses as the name of both sides. The table is read once into a
+        dict per source; names are resolved per distinct name (category), not per row.
+        Aliases are added by hand with the aliases.py commands or learned from confirmed fuzzy matches.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise ValueError(f"Alias table {path} has schema version {version}, expected {SCHEMA_VERSION}")
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.index = {source: {} for source in SOURCES}
+        self.load()
+
+    def load(self):
+        """
+        Read all aliases into the per-source index.
+        """
+        self.index = {source: {} for source in SOURCES}
+        with self.lock:
+            rows = self.connection.execute("SELECT source, name, worker_id FROM aliases").fetchall()
+        for source, name, worker_id in rows:
+            self.index.setdefault(source, {})[name] = worker_id
+        print(f"Aliases: Loaded {len(rows)} aliases from {self.path}")
+
+    def __len__(self):
+        return sum(len(names) for names in self.index.values())
+
+    def revision(self):
+        """
+        Checksum of the loaded aliases, so results compared with other aliases are not reused.
+        """
+        entries = sorted((source, name, worker_id) for source, names in self.index.items() for name, worker_id in names.items())
+        return zlib.crc32(repr(entries).encode('utf-8'))
+
+    def resolve(self, values, source):
+        """
+        Replace the normalized names of a categorical Series from source by their worker IDs.
+        Names without an alias are kept.
+        """
+        mapping = self.index.get(source)
+        if not mapping:
+            return values
+        return alias_categories(values, mapping)
+
+    def add(self, source, name, worker_id, origin='manual', score=None, replace=True):
+        """
+        Store an alias and add it to the index. Without replace an existing alias of the name is kept.
+        Returns True if the alias was stored.
+        """
+        if source not in SOURCES:
+            raise ValueError(f"Invalid alias source {source}. Please use 'agency' or 'protime'.")
+        if not name or not worker_id:
+            raise ValueError("An alias needs a name and a worker ID.")
+        if not replace and name in self.index[source]:
+            return False
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"INSERT OR {'REPLACE' if replace else 'IGNORE'} INTO aliases "
+                "(source, name, worker_id, origin, score, added) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, name, worker_id, origin, score, datetime.now().isoformat(timespec='seconds'))
+            )
+        self.index[source][name] = worker_id
+        return True
+
+    def remove(self, source, name):
+        """
+        Delete an alias. Returns True if it existed.
+        """
+        with self.lock, self.connection:
+            removed = self.connection.execute(
+                "DELETE FROM aliases WHERE source = ? AND name = ?", (source, name)).rowcount
+        self.index.get(source, {}).pop(name, None)
+        return bool(removed)
+
+    def learn(self, merged_df, min_score):
+        """
+        Store the fuzzy matches of a comparison scoring at least min_score as aliases of the agency
+        name to the Protime name, so the next run joins them exactly. Skipped are agency names that
+        matched different Protime names, that also appear as a Protime name, or that already have an alias.
+        Returns the number of aliases added.
+        """
+        if 'Match Score' not in merged_df.columns:
+            return 0
+        # Fuzzy pairs carry the agency name; swapped first and last names score 100 too
+        fuzzy = merged_df['Matched Name'].astype(object).fillna('') != ''
+        matches = merged_df.loc[fuzzy & (merged_df['Match Score'] >= min_score),
+                                ['Matched Name', 'Normalized Name', 'Match Score']]
+        if matches.empty:
+            return 0
+        matches = matches.astype({'Matched Name': object, 'Normalized Name': object})
+        targets = matches.groupby('Matched Name')['Normalized Name'].nunique()
+        protime_names = set(merged_df.loc[merged_df['Protime Hours'].notna(), 'Normalized Name'].astype(object))
+        added = 0
+        for name, worker_id, score in matches.drop_duplicates('Matched Name').itertuples(index=False):
+            if targets[name] > 1 or name in protime_names:
+                continue
+            added += self.add('agency', name, worker_id, origin='match', score=float(score), replace=False)
+        if added:
+            print(f"Aliases: Learned {added} aliases from matches scoring at least {min_score}")
+        return added
+
+    def entries(self, source=None):
+        """
+        Return the stored aliases, optionally of one source.
+        """
+        sql = "SELECT source, name, worker_id, origin, score, added FROM aliases"
+        params = []
+        if source:
+            sql += " WHERE source = ?"
+            params.append(source)
+        with self.lock:
+            return pd.read_sql_query(sql + " ORDER BY source, name", self.connection, params=params)
+
+    def close(self):
+        self.connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the name aliases applied before comparing.")
+    parser.add_argument('--aliases', default=default_alias_path(), help="Alias table (SQLite file)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    listing = commands.add_parser('list', help="List the aliases")
+    listing.add_argument('--source', choices=SOURCES)
+    listing.add_argument('--output', help="Write the aliases to this .csv file instead of printing them")
+    add = commands.add_parser('add', help="Map a name of a source to a worker ID")
+    add.add_argument('source', choices=SOURCES)
+    add.add_argument('name', help="Name as exported, normalized like the comparison")
+    add.add_argument('worker_id', help="Canonical worker ID (shown as the name in reports)")
+    remove = commands.add_parser('remove', help="Delete the alias of a name")
+    remove.add_argument('source', choices=SOURCES)
+    remove.add_argument('name')
+    args = parser.parse_args(argv)
+
+    store = AliasStore(args.aliases)
+    try:
+        if args.command == 'list':
+            result = store.entries(args.source)
+            if args.output:
+                result.to_csv(args.output, index=False)
+                print(f"{len(result)} aliases written to {args.output}", file=sys.stderr)
+            else:
+                with pd.option_context('display.max_rows', None, 'display.width', 200):
+                    print(result.to_string(index=False))
+        elif args.command == 'add':
+            name = normalize_name(args.name)
+            store.add(args.source, name, args.worker_id.strip())
+            print(f"Aliases: {args.source} '{name}' -> '{args.worker_id.strip()}'")
+        elif not store.remove(args.source, normalize_name(args.name)):
+            print(f"Error: No {args.source} alias for '{normalize_name(args.name)}'", file=sys.stderr)
+            return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
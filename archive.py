@@ -0,0 +1,283 @@
+# archive.py
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from names import normalize_name
+from paths import app_data_path
+
+SCHEMA_VERSION = 1
+# Comparison columns kept for every archived row, with their column in the history table
+HISTORY_COLUMNS = {
+    'Agency': 'agency',
+    'Week': 'week',
+    'Date': 'date',
+    'Normalized Name': 'name',
+    'Protime Hours': 'protime_hours',
+    'Agency Hours': 'agency_hours',
+    'Protime Invoice': 'protime_invoice',
+    'Agency Invoice': 'agency_invoice',
+    'Hours Difference': 'hours_difference',
+    'Difference in Minutes': 'minutes_difference',
+    'Invoice Difference': 'invoice_difference',
+    'Overpay Request': 'overpay_request',
+    'GXO Overpays': 'gxo_overpays'
+}
+SUMMED_COLUMNS = [
+    'protime_hours', 'agency_hours', 'protime_invoice', 'agency_invoice',
+    'hours_difference', 'invoice_difference', 'overpay_request', 'gxo_overpays'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started TEXT NOT NULL,
+    agencies TEXT NOT NULL,
+    protime_folder TEXT NOT NULL,
+    start_week INTEGER,
+    end_week INTEGER,
+    grain TEXT NOT NULL,
+    match_threshold REAL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    agency TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    date TEXT,
+    name TEXT NOT NULL,
+    protime_hours REAL,
+    agency_hours REAL,
+    protime_invoice REAL,
+    agency_invoice REAL,
+    hours_difference REAL,
+    minutes_difference REAL,
+    invoice_difference REAL,
+    overpay_request REAL,
+    gxo_overpays REAL
+);
+CREATE INDEX IF NOT EXISTS history_by_run ON history (run_id);
+CREATE INDEX IF NOT EXISTS history_by_week ON history (agency, week, run_id);
+CREATE INDEX IF NOT EXISTS history_by_name ON history (name, agency, week, run_id);
+"""
+
+# The rows of the latest run of a grain that compared each (agency, week), so repeated runs are not counted twice
+LATEST = """
+latest AS (
+    SELECT agency, week, MAX(run_id) AS run_id FROM history
+    WHERE run_id IN (SELECT run_id FROM runs WHERE grain = ?) GROUP BY agency, week
+)
+"""
+GRAIN_RUNS = "run_id IN (SELECT run_id FROM runs WHERE grain = ?)"
+
+
+def default_archive_path():
+    """
+    Return the per-user location of the reconciliation archive.
+    """
+    return app_data_path('archive.sqlite')
+
+
+class ReconciliationArchive:
+    def __init__(self, path):
+        """
+        SQLite history of every comparison: one row per run with its settings and the unfiltered
+        comparison rows of the run, indexed on run, week and name, so trends and per-person
+        histories are answered without opening any report.
+        Weeks are stored as exported (without a year); queries use the latest run per agency and week
+        of one grain ('week' by default), since day and week comparisons pair names differently.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, SCHEMA_VERSION):
+                raise ValueError(f"Archive {path} has schema version {version}, expected {SCHEMA_VERSION}")
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def append(self, merged_df, agencies, protime_folder, start_week=None, end_week=None, grain='week',
+               match_threshold=None, agency=''):
+        """
+        Archive one comparison (before the threshold is applied, without the totals row).
+        agencies maps agency names to folders; rows without an Agency column get agency.
+        Returns the new run id.
+        """
+        run_id = self.start_run(agencies, protime_folder, start_week, end_week, grain, match_threshold)
+        self.append_rows(run_id, merged_df, agency)
+        return run_id
+
+    def start_run(self, agencies, protime_folder, start_week=None, end_week=None, grain='week', match_threshold=None):
+        """
+        Record a run without rows yet and return its id; append_rows() adds its comparison rows.
+        """
+        with self.lock, self.connection:
+            return self.connection.execute(
+                "INSERT INTO runs (started, agencies, protime_folder, start_week, end_week, grain, match_threshold, rows) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (datetime.now().isoformat(timespec='seconds'), json.dumps(agencies), protime_folder,
+                 start_week, end_week, grain, match_threshold)
+            ).lastrowid
+
+    def append_rows(self, run_id, merged_df, agency=''):
+        """
+        Add comparison rows to a run, e.g. one week at a time.
+        Rows without an Agency column get agency.
+        """
+        df = merged_df.reindex(columns=list(HISTORY_COLUMNS))
+        if 'Agency' not in merged_df.columns:
+            df['Agency'] = agency
+        df['Agency'] = df['Agency'].astype(object).fillna('').astype(str)
+        df['Normalized Name'] = df['Normalized Name'].astype(object).fillna('').astype(str)
+        df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d').astype(object)
+        df['Week'] = df['Week'].astype(np.int64)
+        df = df.astype(object).where(df.notna(), None)
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT INTO history (run_id, {', '.join(HISTORY_COLUMNS.values())}) "
+                f"VALUES (?, {', '.join('?' * len(HISTORY_COLUMNS))})",
+                ((run_id, *row) for row in df.itertuples(index=False))
+            )
+            self.connection.execute("UPDATE runs SET rows = rows + ? WHERE run_id = ?", (len(df), run_id))
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return pd.read_sql_query(sql, self.connection, params=list(params))
+
+    def runs(self, limit=20):
+        """
+        Return the latest archived runs, newest first.
+        """
+        return self.query("SELECT * FROM runs ORDER BY run_id DESC LIMIT ?", [limit])
+
+    def person_history(self, name, agency=None, start_week=None, end_week=None, grain='week'):
+        """
+        Return the weekly hours and invoices of one worker (the name is normalized like the comparison)
+        from the latest run of every week, with the run it came from.
+        """
+        conditions, params = self.filters(agency, start_week, end_week, prefix='h.')
+        sums = ', '.join(f"TOTAL(h.{column}) AS {column}" for column in SUMMED_COLUMNS)
+        return self.query(
+            f"WITH {LATEST} SELECT h.agency, h.week, h.run_id, {sums} FROM history h "
+            "JOIN latest l ON h.agency = l.agency AND h.week = l.week AND h.run_id = l.run_id "
+            f"WHERE h.name = ?{conditions} GROUP BY h.agency, h.week, h.run_id ORDER BY h.agency, h.week",
+            [grain, normalize_name(name)] + params
+        )
+
+    def weekly_trend(self, agency=None, start_week=None, end_week=None, grain='week'):
+        """
+        Return the totals per agency and week from the latest run of every week,
+        with the number of names that differ by more than a minute.
+        """
+        conditions, params = self.filters(agency, start_week, end_week, prefix='h.')
+        sums = ', '.join(f"TOTAL(h.{column}) AS {column}" for column in SUMMED_COLUMNS)
+        return self.query(
+            f"WITH {LATEST} SELECT h.agency, h.week, h.run_id, COUNT(*) AS names, "
+            "SUM(h.minutes_difference > 1) AS names_differing, "
+            f"{sums} FROM history h "
+            "JOIN latest l ON h.agency = l.agency AND h.week = l.week AND h.run_id = l.run_id "
+            f"WHERE 1 = 1{conditions} GROUP BY h.agency, h.week, h.run_id ORDER BY h.agency, h.week",
+            [grain] + params
+        )
+
+    def drifting_weeks(self, agency=None, min_runs=2, grain='week'):
+        """
+        Return the weeks whose totals changed between runs: per agency and week the number of runs,
+        the smallest and largest total hours and invoice difference, and the latest figures.
+        """
+        conditions, params = self.filters(agency, prefix='')
+        return self.query(
+            "WITH per_run AS ("
+            "SELECT agency, week, run_id, TOTAL(hours_difference) AS hours_difference, "
+            f"TOTAL(invoice_difference) AS invoice_difference FROM history WHERE {GRAIN_RUNS}{conditions} "
+            "GROUP BY agency, week, run_id) "
+            "SELECT agency, week, COUNT(*) AS runs, "
+            "MIN(hours_difference) AS min_hours_difference, MAX(hours_difference) AS max_hours_difference, "
+            "MIN(invoice_difference) AS min_invoice_difference, MAX(invoice_difference) AS max_invoice_difference, "
+            "MAX(run_id) AS last_run FROM per_run GROUP BY agency, week "
+            "HAVING COUNT(*) >= ? AND (MAX(hours_difference) - MIN(hours_difference) > 0.005 "
+            "OR MAX(invoice_difference) - MIN(invoice_difference) > 0.005) "
+            "ORDER BY MAX(invoice_difference) - MIN(invoice_difference) DESC",
+            [grain] + params + [min_runs]
+        )
+
+    @staticmethod
+    def filters(agency=None, start_week=None, end_week=None, prefix=''):
+        conditions, params = '', []
+        if agency:
+            conditions += f" AND {prefix}agency = ?"
+            params.append(agency)
+        if start_week is not None:
+            conditions += f" AND {prefix}week >= ?"
+            params.append(int(start_week))
+        if end_week is not None:
+            conditions += f" AND {prefix}week <= ?"
+            params.append(int(end_week))
+        return conditions, params
+
+    def close(self):
+        self.connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the history of archived comparisons.")
+    parser.add_argument('--archive', default=default_archive_path(), help="Archive file (SQLite)")
+    parser.add_argument('--output', help="Write the result to this .csv file instead of printing it")
+    commands = parser.add_subparsers(dest='command', required=True)
+    runs = commands.add_parser('runs', help="List the latest runs")
+    runs.add_argument('--limit', type=int, default=20)
+    for name, description in (('person', "Weekly history of one worker"),
+                              ('trend', "Totals per week"),
+                              ('drift', "Weeks whose totals changed between runs")):
+        command = commands.add_parser(name, help=description)
+        command.add_argument('--agency', help="Only this agency")
+        if name == 'person':
+            command.add_argument('name', help="Worker name, normalized like the comparison")
+        command.add_argument('--grain', default='week', choices=['week', 'day'], help="Runs of this grain only")
+        if name == 'drift':
+            command.add_argument('--min-runs', type=int, default=2, help="Weeks compared at least this often")
+        else:
+            command.add_argument('--start-week', type=int)
+            command.add_argument('--end-week', type=int)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.archive):
+        print(f"Error: No archive found at {args.archive}", file=sys.stderr)
+        return 1
+    archive = ReconciliationArchive(args.archive)
+    try:
+        if args.command == 'runs':
+            result = archive.runs(args.limit)
+        elif args.command == 'person':
+            result = archive.person_history(args.name, args.agency, args.start_week, args.end_week, args.grain)
+        elif args.command == 'trend':
+            result = archive.weekly_trend(args.agency, args.start_week, args.end_week, args.grain)
+        else:
+            result = archive.drifting_weeks(args.agency, args.min_runs, args.grain)
+    finally:
+        archive.close()
+
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"{len(result)} rows written to {args.output}", file=sys.stderr)
+    else:
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(result.round(2).to_string(index=False))
+        if args.command == 'person' and len(result):
+            totals = result[SUMMED_COLUMNS].sum()
+            print(f"\nTotal: overpay request {totals['overpay_request']:.2f}, GXO overpays {totals['gxo_overpays']:.2f}, "
+                  f"hours difference {totals['hours_difference']:.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
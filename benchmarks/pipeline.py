@@ -0,0 +1,185 @@
+# benchmarks/pipeline.py
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from model import DataModel, concat_frames
+from benchmarks.synthetic import generate_dataset
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+
+@contextlib.contextmanager
+def measure(results, stage):
+    """
+    Record the block under results[stage]: wall and CPU time, or, while tracemalloc
+    is tracing, the peak memory allocated on top of what was in use before the block.
+    """
+    record = {}
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    wall, cpu = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield record
+    if tracing:
+        record['peak_mb'] = round((tracemalloc.get_traced_memory()[1] - base) / 2 ** 20, 2)
+    else:
+        record['wall_s'] = round(time.perf_counter() - wall, 4)
+        record['cpu_s'] = round(time.process_time() - cpu, 4)
+    results[stage] = record
+
+
+def run_stages(agency_folder, protime_folder, args):
+    """
+    Run each pipeline stage once on a generated dataset and measure it.
+    """
+    model = DataModel()
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.set_agency_path(agency_folder)
+        model.set_protime_path(protime_folder)
+        model.set_week_range(1, 52)
+        model.set_threshold_minutes(args.threshold)
+        model.set_workers(args.workers)
+        model.set_compare_workers(args.compare_workers)
+    results = {}
+
+    with measure(results, 'load_data') as record:
+        agency_files = model.list_workbooks(model.path_agency, 'Agency')
+        protime_files = model.list_workbooks(model.path_protime, 'Protime')
+        agency_dfs, protime_dfs = model.read_workbooks(agency_files, protime_files)
+        # Workbooks have their own name categories, so combine them like the app does
+        model.agency_data = concat_frames(agency_dfs)
+        model.protime_data = concat_frames(protime_dfs)
+        record['files'] = len(agency_files) + len(protime_files)
+        record['rows_out'] = len(model.agency_data) + len(model.protime_data)
+
+    with measure(results, 'clean_agency_data') as record:
+        record['rows_in'] = len(model.agency_data)
+        model.clean_agency_data(prepared=True)
+        record['rows_out'] = len(model.agency_data)
+
+    with measure(results, 'clean_protime_data') as record:
+        record['rows_in'] = len(model.protime_data)
+        model.clean_protime_data(prepared=True)
+        record['rows_out'] = len(model.protime_data)
+
+    with measure(results, 'process_data') as record:
+        record['rows_in'] = len(model.agency_data) + len(model.protime_data)
+        model.process_data()
+        record['rows_out'] = len(model.differences)
+
+    with tempfile.TemporaryDirectory() as folder:
+        with measure(results, 'save_report') as record:
+            record['rows_in'] = len(model.differences)
+            model.save_report(os.path.join(folder, 'report.xlsx'))
+    return results
+
+
+def bench_size(label, rows, args):
+    """
+    Time every stage on one dataset size, then repeat the run under tracemalloc for the
+    memory figures so tracing overhead does not distort the timings.
+    """
+    agency_folder, protime_folder = generate_dataset(args.data_dir, rows, args.seed)
+    results = run_stages(agency_folder, protime_folder, args)
+    if not args.no_memory:
+        tracemalloc.start()
+        try:
+            traced = run_stages(agency_folder, protime_folder, args)
+        finally:
+            tracemalloc.stop()
+        for stage, values in traced.items():
+            results[stage]['peak_mb'] = values['peak_mb']
+
+    total = sum(stage['wall_s'] for stage in results.values())
+    print(f"{label:>5}: " + ', '.join(f"{stage} {values['wall_s']:.2f}s" for stage, values in results.items())
+          + f" (total {total:.2f}s)")
+    return {'rows': rows, 'stages': results}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    """
+    Print the wall time ratio of every stage against an earlier results file.
+    """
+    with open(baseline_path, encoding='utf-8') as fh:
+        baseline = json.load(fh)
+    print(f"Compared with {baseline_path} ({baseline.get('revision')}):")
+    for label, size in current['sizes'].items():
+        previous = baseline['sizes'].get(label)
+        if not previous:
+            continue
+        for stage, values in size['stages'].items():
+            old = previous['stages'].get(stage)
+            if old and old['wall_s'] > 0:
+                ratio = values['wall_s'] / old['wall_s']
+                flag = '  <-- slower' if ratio > 1.2 else ''
+                print(f"  {label:>5} {stage:<20} {old['wall_s']:>8.2f}s -> {values['wall_s']:>8.2f}s ({ratio:.2f}x){flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the load, clean, process and save stages.")
+    parser.add_argument('--sizes', default='10k,100k', help=f"Comma separated sizes out of {', '.join(SIZES)}")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', default='1', help="Worker processes for parsing (empty = all cores)")
+    parser.add_argument('--compare-workers', default='1',
+                        help="Worker processes for aggregating and merging (empty = all cores)")
+    parser.add_argument('--threshold', default='', help="Minutes threshold passed to the model")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'datacompare_bench'),
+                        help="Folder for the generated workbooks, reused between runs")
+    parser.add_argument('--output', default='benchmark_results', help="Folder for the JSON results")
+    parser.add_argument('--compare', help="Earlier JSON results file to compare against")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc memory pass")
+    args = parser.parse_args(argv)
+
+    current = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'workers': args.workers,
+        'compare_workers': args.compare_workers,
+        'sizes': {}
+    }
+    for label in args.sizes.split(','):
+        label = label.strip().lower()
+        current['sizes'][label] = bench_size(label, SIZES[label], args)
+
+    os.makedirs(args.output, exist_ok=True)
+    output_file = os.path.join(args.output, f"bench_{current['revision'] or 'local'}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output_file, 'w', encoding='utf-8') as fh:
+        json.dump(current, fh, indent=2)
+    print(f"Results written to {output_file}")
+    if args.compare:
+        compare(current, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# benchmarks/readers.py
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_dataset
+from model import read_prepared_workbook
+from readers import CalamineWorkbook
+
+# (label, file extension, .xlsx engine, export options)
+READERS = [
+    ('xlsx openpyxl', '.xlsx', 'openpyxl', None),
+    ('xlsx calamine', '.xlsx', 'calamine', None),
+    ('csv', '.csv', None, {'sep': ',', 'decimal': '.', 'encoding': 'utf-8-sig'}),
+    ('csv semicolon', '.csv', None, {'sep': ';', 'decimal': ',', 'encoding': 'cp1252'}),
+    ('parquet', '.parquet', None, None),
+]
+
+
+def export(path, extension, options):
+    """
+    Write the first sheet of a workbook as a .csv or .parquet file next to it, the way a system
+    exporting those types would: empty cells stay empty and columns mixing numbers and text are text.
+    """
+    target = f"{os.path.splitext(path)[0]}_{(options or {}).get('encoding', 'export')}{extension}"
+    if os.path.exists(target):
+        return target
+    df = pd.read_excel(path, engine='openpyxl', keep_default_na=False, na_values=[''])
+    if extension == '.csv':
+        df.to_csv(target, index=False, **options)
+    else:
+        for column in df.columns:
+            if df[column].dtype == object:
+                df[column] = df[column].map(lambda value: value if isinstance(value, str) or pd.isna(value) else str(value))
+        df.to_parquet(target, index=False)
+    return target
+
+
+def timed_read(path, kind, engine):
+    wall = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        read_prepared_workbook(path, kind, engine=engine)
+    return time.perf_counter() - wall
+
+
+def time_readers(files):
+    """
+    Read every workbook with every reader. Returns {reader: seconds}.
+    tests/test_readers.py checks that the readers prepare the same frames.
+    """
+    seconds = {}
+    for path, kind in files:
+        for label, extension, engine, options in READERS:
+            if engine == 'calamine' and CalamineWorkbook is None:
+                continue
+            source = path if extension == '.xlsx' else export(path, extension, options)
+            seconds[label] = seconds.get(label, 0.0) + timed_read(source, kind, engine)
+    return seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every workbook reader against openpyxl.")
+    parser.add_argument('--rows', type=int, default=100_000, help="Rows per source of the synthetic dataset")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'datacompare_bench'),
+                        help="Folder for the generated workbooks, reused between runs")
+    args = parser.parse_args(argv)
+
+    if CalamineWorkbook is None:
+        print("python-calamine is not installed, skipping the calamine engine")
+    agency_folder, protime_folder = generate_dataset(args.data_dir, args.rows, args.seed)
+    files = []
+    for folder, kind in ((agency_folder, 'agency'), (protime_folder, 'protime')):
+        files += [(os.path.join(folder, name), kind) for name in sorted(os.listdir(folder)) if name.endswith('.xlsx')]
+
+    seconds = time_readers(files)
+    baseline = seconds[READERS[0][0]]
+    for label, wall in seconds.items():
+        print(f"{label:<15} {wall:>8.2f}s ({baseline / wall:.1f}x openpyxl)")
+    print(f"{len(files)} workbooks")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# benchmarks/startup.py
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks.pipeline import git_revision
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules the desktop app must not import before its window is up
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'python_calamine', 'pyarrow', 'rapidfuzz', 'xlsxwriter', 'model']
+
+# Runs in a fresh interpreter: import the controller and, with a display, open the window
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import controller
+result = {'import_s': time.perf_counter() - start}
+if WINDOW:
+    app = controller.DataController()
+    app.root.update()
+    result['window_s'] = time.perf_counter() - start
+    result['heavy_modules'] = [m for m in HEAVY if m in sys.modules]
+    app.model_ready.wait(120)
+    result['model_s'] = time.perf_counter() - start
+    app.root.destroy()
+else:
+    result['heavy_modules'] = [m for m in HEAVY if m in sys.modules]
+print(json.dumps(result))
+"""
+
+
+def probe(window):
+    """
+    Start the app's imports (and window) in a new Python process and return its timings.
+    """
+    code = PROBE.replace('WINDOW', repr(window)).replace('HEAVY', repr(HEAVY_MODULES))
+    completed = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure the desktop app's cold start and fail when it exceeds the budget."
+    )
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes to start (the median is reported)")
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help="Seconds allowed until the window is up, or until the imports are done with --no-window")
+    parser.add_argument('--no-window', action='store_true', help="Only time the imports (no display needed)")
+    parser.add_argument('--output', default='benchmark_results', help="Folder for the JSON results")
+    args = parser.parse_args(argv)
+
+    window = not args.no_window
+    runs = [probe(window) for _ in range(args.runs)]
+    measured = 'window_s' if window else 'import_s'
+    current = {
+        'revision': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'budget_s': args.budget,
+        'runs': runs
+    }
+    for key in ('import_s', 'window_s', 'model_s'):
+        values = [run[key] for run in runs if key in run]
+        if values:
+            current[key] = round(statistics.median(values), 4)
+            print(f"{key:<9} median {current[key]:.3f}s (min {min(values):.3f}s, max {max(values):.3f}s)")
+    heavy = sorted({module for run in runs for module in run['heavy_modules']})
+    current['heavy_modules'] = heavy
+
+    os.makedirs(args.output, exist_ok=True)
+    output_file = os.path.join(args.output, f"startup_{current['revision'] or 'local'}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(output_file, 'w', encoding='utf-8') as fh:
+        json.dump(current, fh, indent=2)
+    print(f"Results written to {output_file}")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: {', '.join(heavy)} imported before the window was up")
+        failed = True
+    if current[measured] > args.budget:
+        print(f"FAIL: {measured} {current[measured]:.3f}s is over the {args.budget:.3f}s budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
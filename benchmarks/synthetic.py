@@ -0,0 +1,163 @@
+# benchmarks/synthetic.py
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+AGENCIES = ['OTTO', 'RANDSTAD', 'TEMPO-TEAM', 'YACHT']
+FIRST_NAMES = [
+    'Jan', 'Piet', 'Kees', 'Henk', 'Johan', 'Willem', 'Daan', 'Sem', 'Lucas', 'Milan', 'Bram', 'Thijs',
+    'Anna', 'Emma', 'Sanne', 'Lotte', 'Fleur', 'Julia', 'Sophie', 'Eva', 'Lisa', 'Noor', 'Iris', 'Femke',
+    'Mohamed', 'Ahmed', 'Fatima', 'Yusuf', 'Piotr', 'Katarzyna', 'Marek', 'Agnieszka', 'Andrei', 'Ioana'
+]
+MIDDLE_NAMES = ['Maria', 'Johannes', 'Cornelis', 'Hendrik', 'Anna-Marie', 'Jan', 'Petrus', 'Elisabeth']
+PREFIXES = ['', '', '', '', 'de', 'van', 'van der', 'van den', 'ter', 'el']
+LAST_NAMES = [
+    'Vries', 'Jansen', 'Bakker', 'Visser', 'Smit', 'Meijer', 'Mulder', 'Bos', 'Vos', 'Peters', 'Hendriks',
+    'Dijk', 'Berg', 'Dekker', 'Brouwer', 'Wit', 'Dijkstra', 'Kok', 'Jacobs', 'Vermeulen', 'Kowalski',
+    'Nowak', 'Popescu', 'Yilmaz', 'Amrani', 'Haddou', 'Groot-Bruinink', 'Boer', 'Linden', 'Heuvel'
+]
+AGENCY_EXTRA_COLUMNS = ['Relatienummer', 'Functie', 'Kostenplaats', 'Tarief', 'Looncomponent']
+PROTIME_EXTRA_COLUMNS = [
+    'Employee ID', 'Department', 'Cost Center', 'Shift', 'Start', 'End', 'Break (Dec)', 'Function',
+    'Site', 'Manager', 'Contract', 'Hours Type', 'Rate', 'ADV %', 'Overtime', 'Comment'
+]
+
+
+def make_people(count, rng):
+    """
+    Return one row per worker with the name parts both systems derive their spelling from.
+    """
+    first = rng.choice(FIRST_NAMES, count)
+    middle = np.where(rng.random(count) < 0.25, rng.choice(MIDDLE_NAMES, count), '')
+    prefix = rng.choice(PREFIXES, count)
+    last = rng.choice(LAST_NAMES, count)
+    # Make names unique enough by adding a numbered surname suffix for large workforces
+    suffix = np.where(np.arange(count) >= len(FIRST_NAMES) * len(LAST_NAMES), np.char.mod('%d', np.arange(count)), '')
+    last = np.char.add(last.astype(str), suffix.astype(str))
+    return pd.DataFrame({
+        'First': first,
+        'Middle': middle,
+        'Prefix': prefix,
+        'Last': last,
+        'Agency': rng.choice(AGENCIES, count, p=[0.55, 0.2, 0.15, 0.1]),
+        'Rate': rng.uniform(14, 32, count).round(2)
+    })
+
+
+def spell(people, rng, upper_share, hyphen_share, middle_share):
+    """
+    Spell each worker's name the way one of the systems would, with the usual variation:
+    capitals, hyphenated first names, middle names written out or left away and stray spaces.
+    """
+    names = []
+    for first, middle, prefix, last in people[['First', 'Middle', 'Prefix', 'Last']].itertuples(index=False):
+        parts = [first]
+        if middle and rng.random() < middle_share:
+            parts.append(middle)
+        if prefix:
+            parts.append(prefix)
+        parts.append(last)
+        name = ' '.join(parts)
+        if rng.random() < hyphen_share:
+            name = name.replace(' ', '-', 1)
+        if rng.random() < upper_share:
+            name = name.upper()
+        if rng.random() < 0.05:
+            name = f" {name}  "
+        names.append(name)
+    return np.array(names, dtype=object)
+
+
+def generate_frames(rows, seed=42, weeks=52):
+    """
+    Generate matching raw agency and Protime frames of about the given number of rows each.
+    Protime covers the shifts of every agency; the agency export only holds OTTO shifts,
+    with a few percent of differing hours, missing shifts and a totals row per week.
+    """
+    rng = np.random.default_rng(seed)
+    people = make_people(max(50, rows // 40), rng)
+    agency_spelling = spell(people, rng, upper_share=0.3, hyphen_share=0.05, middle_share=0.6)
+    protime_spelling = spell(people, rng, upper_share=0.0, hyphen_share=0.15, middle_share=0.2)
+
+    worker = rng.integers(0, len(people), rows)
+    week = rng.integers(1, weeks + 1, rows)
+    day = rng.integers(0, 5, rows)
+    date = pd.Timestamp('2024-01-01') + pd.to_timedelta((week - 1) * 7 + day, unit='D')
+    hours = rng.integers(8, 41, rows) / 4
+    rate = people['Rate'].to_numpy()[worker]
+    agency_name = people['Agency'].to_numpy()[worker]
+
+    protime = pd.DataFrame({
+        'Date': date,
+        'Week': week,
+        'Temp Agency': agency_name,
+        'Full Name': protime_spelling[worker],
+        'Hours (Dec)': hours,
+        'Invoice incl ADV': (hours * rate * 1.0833).round(2),
+        **{column: rng.integers(0, 1000, rows) for column in PROTIME_EXTRA_COLUMNS}
+    })
+
+    otto = agency_name == 'OTTO'
+    kept = otto & (rng.random(rows) > 0.02)
+    agency_hours = np.where(rng.random(rows) < 0.05, hours + rng.choice([-1, -0.5, 0.25, 0.5], rows), hours)
+    agency = pd.DataFrame({
+        'Datum': date[kept],
+        'Gewerkte week': week[kept].astype(object),
+        'Naam Medewerker': agency_spelling[worker[kept]],
+        'Uren': agency_hours[kept],
+        'Nettowaarde': (agency_hours[kept] * rate[kept] * 1.0833).round(2),
+        **{column: rng.integers(0, 1000, kept.sum()) for column in AGENCY_EXTRA_COLUMNS}
+    })
+    # Agency exports close every week with a totals row
+    totals = agency.groupby('Gewerkte week', as_index=False)['Uren'].sum()
+    totals = pd.DataFrame({'Gewerkte week': 'Totaal', 'Uren': totals['Uren'], 'Sort': totals['Gewerkte week']})
+    agency['Sort'] = agency['Gewerkte week']
+    agency = pd.concat([agency, totals], ignore_index=True).sort_values('Sort', kind='mergesort')
+    agency = agency.drop(columns='Sort').reset_index(drop=True)
+    return agency, protime.sort_values('Week', kind='mergesort').reset_index(drop=True)
+
+
+def write_workbooks(df, folder, prefix, files, week_column):
+    """
+    Split a frame into `files` workbooks by week, like a series of weekly exports.
+    """
+    os.makedirs(folder, exist_ok=True)
+    weeks = pd.to_numeric(df[week_column], errors='coerce').ffill().fillna(1).astype(int)
+    bounds = np.array_split(np.sort(weeks.unique()), files)
+    for index, chunk_weeks in enumerate(bounds):
+        chunk = df[weeks.isin(chunk_weeks)]
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(list(chunk.columns))
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False):
+            sheet.append([value.to_pydatetime() if isinstance(value, pd.Timestamp) else value for value in row])
+        workbook.save(os.path.join(folder, f"{prefix}_{index + 1:02d}.xlsx"))
+
+
+def generate_dataset(root, rows, seed=42, files=None):
+    """
+    Write an Agency and a Protime folder with about `rows` rows each under root, unless
+    they already exist. Returns (agency folder, protime folder).
+    """
+    files = files or min(52, max(2, rows // 20000))
+    dataset = os.path.join(root, f"rows{rows}_seed{seed}_files{files}")
+    agency_folder = os.path.join(dataset, 'Agency')
+    protime_folder = os.path.join(dataset, 'Protime')
+    if not (os.path.isdir(agency_folder) and os.path.isdir(protime_folder)):
+        agency, protime = generate_frames(rows, seed)
+        write_workbooks(agency, agency_folder, 'agency', files, 'Gewerkte week')
+        write_workbooks(protime, protime_folder, 'protime', files, 'Week')
+    return agency_folder, protime_folder
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate synthetic Agency and Protime workbooks.")
+    parser.add_argument('root', help="Folder to write the dataset to")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--files', type=int)
+    args = parser.parse_args()
+    print(generate_dataset(args.root, args.rows, args.seed, args.files))
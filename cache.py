@@ -0,0 +1,175 @@
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from paths import app_data_path
+
+# Bump whenever the prepared frame layout changes so old entries are ignored
+CACHE_VERSION = 3
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def default_cache_dir():
+    """
+    Return the per-user folder used for the workbook cache.
+    """
+    return app_data_path('cache')
+
+
+def file_fingerprint(path):
+    """
+    Return a digest of a file's size, modification time and content.
+    """
+    stat = os.stat(path)
+    content = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            content.update(chunk)
+    return hashlib.blake2b(
+        f"{stat.st_size}|{stat.st_mtime_ns}|{content.hexdigest()}".encode('utf-8'),
+        digest_size=16
+    ).hexdigest()
+
+
+class WorkbookCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        On-disk Parquet cache of prepared workbooks.
+        Entries are keyed by the workbook path, size, modification time and content hash,
+        so a changed workbook simply misses the cache and replaces its previous entry.
+        The folder is kept below max_bytes by evicting the least recently used entries.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, kind, path):
+        """
+        Fingerprint a workbook and return its cache key as (path prefix, fingerprint).
+        """
+        path = os.path.abspath(path)
+        prefix = hashlib.blake2b(f"{kind}|{path}".encode('utf-8'), digest_size=8).hexdigest()
+        fingerprint = hashlib.blake2b(
+            f"{CACHE_VERSION}|{file_fingerprint(path)}".encode('utf-8'),
+            digest_size=16
+        ).hexdigest()
+        return prefix, fingerprint
+
+    def entry_path(self, key):
+        prefix, fingerprint = key
+        return os.path.join(self.cache_dir, f"{prefix}-{fingerprint}.parquet")
+
+    def get(self, key):
+        """
+        Return the cached frame for the key, or None on a miss.
+        Unreadable entries are dropped and treated as a miss.
+        """
+        entry = self.entry_path(key)
+        if not os.path.exists(entry):
+            return None
+        try:
+            df = pd.read_parquet(entry)
+            os.utime(entry)  # Mark as recently used for eviction
+            return df
+        except Exception as e:
+            print(f"Cache: Dropping unreadable entry {entry} - {e}")
+            self.remove(entry)
+            return None
+
+    def contains(self, key):
+        """
+        True if the key has an entry, without reading it.
+        """
+        return os.path.exists(self.entry_path(key))
+
+    def put(self, key, df):
+        """
+        Store a prepared frame, replace older entries of the same workbook
+        and evict least recently used entries if the cache grew too large.
+        Failures are reported but never interrupt a run.
+        """
+        entry = self.entry_path(key)
+        prefix = f"{key[0]}-"
+        try:
+            temp_entry = f"{entry}.tmp"
+            df.to_parquet(temp_entry, index=False)
+            os.replace(temp_entry, entry)
+        except Exception as e:
+            print(f"Cache: Could not store {entry} - {e}")
+            self.remove(f"{entry}.tmp")
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and name.endswith('.parquet') and os.path.join(self.cache_dir, name) != entry:
+                self.remove(os.path.join(self.cache_dir, name))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cache_dir, name)))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.remove(entry)
+            total -= size
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet') or name.endswith('.tmp'):
+                self.remove(os.path.join(self.cache_dir, name))
+
+    @staticmethod
+    def remove(entry):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+
+class MemoryCache:
+    def __init__(self, backing=None):
+        """
+        In-memory cache of prepared workbooks, shared between models in one process.
+        Misses fall through to an optional backing WorkbookCache.
+        """
+        self.backing = backing
+        self.frames = {}
+        self.lock = threading.Lock()
+
+    def key(self, kind, path):
+        if self.backing is not None:
+            return self.backing.key(kind, path)
+        return os.path.abspath(path), f"{kind}|{file_fingerprint(path)}"
+
+    def get(self, key):
+        with self.lock:
+            df = self.frames.get(key)
+        if df is None and self.backing is not None:
+            df = self.backing.get(key)
+            if df is not None:
+                with self.lock:
+                    self.frames[key] = df
+        return df
+
+    def contains(self, key):
+        with self.lock:
+            if key in self.frames:
+                return True
+        return self.backing is not None and self.backing.contains(key)
+
+    def put(self, key, df):
+        with self.lock:
+            self.frames[key] = df
+        if self.backing is not None:
+            self.backing.put(key, df)
@@ -0,0 +1,262 @@
+# cli.py
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from model import DataModel
+from cache import MemoryCache, WorkbookCache, default_cache_dir
+from archive import default_archive_path
+from aliases import default_alias_path
+from watch import WorkbookWatcher
+
+JOB_OPTIONS = ['agency', 'agency_name', 'protime', 'start_week', 'end_week', 'threshold', 'match_threshold', 'grain', 'output', 'format', 'name']
+
+
+def get_timestamp():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Compare agency and Protime hours without the desktop app."
+    )
+    parser.add_argument('--agency', action='append',
+                        help="Folder with the agency workbooks, or NAME=FOLDER (repeat for several agencies)")
+    parser.add_argument('--agency-name', default='OTTO',
+                        help="'Temp Agency' value compared with a single agency folder (default: OTTO)")
+    parser.add_argument('--protime', help="Folder with the Protime workbooks")
+    parser.add_argument('--start-week', type=int, help="First week to compare")
+    parser.add_argument('--end-week', type=int, help="Last week to compare")
+    parser.add_argument('--threshold', help="Only report differences above this many minutes")
+    parser.add_argument('--match-threshold', help="Pair unmatched names scoring at least this (0-100)")
+    parser.add_argument('--grain', default='week', choices=['week', 'day'],
+                        help="Compare weekly totals or totals per date (needs Date/Datum columns)")
+    parser.add_argument('--output', default='Reports',
+                        help="Report file, or folder for diff_report_<timestamp>.<format> (default: Reports)")
+    parser.add_argument('--format', default='xlsx', choices=['xlsx', 'csv', 'parquet'],
+                        help="Report type when --output is a folder (default: xlsx)")
+    parser.add_argument('--manifest', help="JSON file with a list of jobs to run in one process")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Number of manifest jobs run at the same time")
+    parser.add_argument('--workers', default='', help="Processes used to parse workbooks (default: all cores)")
+    parser.add_argument('--compare-workers', default='1',
+                        help="Processes used to aggregate and merge large comparisons (empty = all cores, default: 1)")
+    parser.add_argument('--xlsx-engine', default='', choices=['', 'openpyxl', 'calamine'],
+                        help="Reader of .xlsx workbooks (default: calamine when installed, openpyxl otherwise)")
+    parser.add_argument('--cache-dir', default=default_cache_dir(), help="Folder of the parsed workbook cache")
+    parser.add_argument('--no-cache', action='store_true', help="Do not read or write the workbook cache")
+    parser.add_argument('--store', help="Aggregate store for incremental runs (SQLite file)")
+    parser.add_argument('--archive', default=default_archive_path(),
+                        help="History of every comparison, queried with archive.py (SQLite file)")
+    parser.add_argument('--no-archive', action='store_true', help="Do not append the comparison to the archive")
+    parser.add_argument('--aliases', default=default_alias_path(),
+                        help="Name aliases resolved before comparing, managed with aliases.py (SQLite file)")
+    parser.add_argument('--no-aliases', action='store_true', help="Do not resolve names through the alias table")
+    parser.add_argument('--learn-aliases',
+                        help="Store fuzzy matches scoring at least this (0-100) as aliases for the next runs")
+    parser.add_argument('--out-of-core', action='store_true',
+                        help="Compare one week at a time from on-disk partitions, for ranges too large for memory")
+    parser.add_argument('--partition-dir', help="Folder for the week partitions (default: the system temp folder)")
+    parser.add_argument('--profile', choices=['cprofile', 'tracemalloc'],
+                        help="Capture a cProfile (.prof next to the report) or tracemalloc memory profile")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running: reconcile again whenever a workbook is added, changed or removed")
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help="Seconds without changes before a watch run starts (default: 2)")
+    parser.add_argument('--poll', action='store_true', help="Poll the folders instead of using watchdog")
+    parser.add_argument('--quiet', action='store_true', help="Only print the job summary")
+    return parser
+
+
+def parse_agency(values):
+    """
+    Turn the --agency values into a folder, or an {agency name: folder} mapping when given as NAME=FOLDER.
+    """
+    if not values:
+        return None
+    if not any('=' in value for value in values):
+        return values[-1]
+    agencies = {}
+    for value in values:
+        name, separator, folder = value.partition('=')
+        if not separator or not name.strip():
+            raise ValueError(f"Expected NAME=FOLDER for --agency, got: {value}")
+        agencies[name.strip()] = folder
+    return agencies
+
+
+def load_manifest(path, args):
+    """
+    Read a manifest file. It is either a list of jobs or {"defaults": {...}, "jobs": [...]};
+    each job uses the keys of JOB_OPTIONS and falls back to the defaults and command line.
+    A job's "agency" is a folder or an {agency name: folder} object for multi-agency mode.
+    """
+    with open(path, encoding='utf-8') as fh:
+        manifest = json.load(fh)
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+    defaults = {option: getattr(args, option, None) for option in JOB_OPTIONS}
+    defaults.update(manifest.get('defaults', {}))
+    jobs = []
+    for index, job in enumerate(manifest.get('jobs', []), start=1):
+        unknown = set(job) - set(JOB_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)} in manifest job {index}")
+        jobs.append({**defaults, 'name': f"job{index}", **job})
+    if not jobs:
+        raise ValueError(f"No jobs found in manifest: {path}")
+    return jobs
+
+
+def report_path(job):
+    """
+    Resolve the output of a job to a report file path.
+    """
+    output = job['output'] or 'Reports'
+    if os.path.splitext(output)[1]:
+        folder, report = os.path.dirname(output), output
+    else:
+        name = f"_{job['name']}" if job.get('name') else ''
+        extension = job.get('format') or 'xlsx'
+        folder, report = output, os.path.join(output, f"diff_report{name}_{get_timestamp()}.{extension}")
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    return report
+
+
+def configure_model(job, args, cache):
+    model = DataModel()
+    if isinstance(job['agency'], dict):
+        model.set_agency_paths(job['agency'])
+    else:
+        model.set_agency_path(job['agency'] or '')
+    model.set_agency_name(job['agency_name'] or 'OTTO')
+    model.set_protime_path(job['protime'] or '')
+    model.set_threshold_minutes(job['threshold'])
+    model.set_match_threshold(job['match_threshold'])
+    model.set_week_range(job['start_week'], job['end_week'])
+    model.set_grain(job['grain'])
+    model.set_workers(args.workers)
+    model.set_compare_workers(args.compare_workers)
+    model.set_xlsx_engine(args.xlsx_engine)
+    model.set_profile_mode(args.profile)
+    model.cache = cache
+    model.set_out_of_core(args.out_of_core, args.partition_dir)
+    if args.store:
+        model.set_store_path(args.store)
+    if not args.no_archive:
+        model.set_archive_path(args.archive)
+    if not args.no_aliases:
+        model.set_alias_path(args.aliases)
+        model.set_alias_learning(args.learn_aliases)
+    return model
+
+
+def run_job(job, args, cache):
+    """
+    Run one comparison and save its report. Returns (job name, report path or None, error or None, seconds).
+    """
+    start = time.perf_counter()
+    try:
+        model = configure_model(job, args, cache)
+        if model.out_of_core:
+            # The report is written while comparing
+            output_file = report_path(job)
+            model.run_partitioned(output_file)
+        else:
+            model.run()
+            output_file = report_path(job)
+            model.save_report(output_file)
+        return job['name'], output_file, None, time.perf_counter() - start
+    except Exception as e:
+        return job['name'], None, e, time.perf_counter() - start
+
+
+def preload(jobs, args, cache):
+    """
+    Parse every workbook used by the jobs once, across the worker pool, into the shared cache.
+    """
+    agency_files, protime_files = [], []
+    model = DataModel()
+    model.set_workers(args.workers)
+    model.set_xlsx_engine(args.xlsx_engine)
+    model.cache = cache
+    for job in jobs:
+        agency = job['agency'] if isinstance(job['agency'], dict) else {'': job['agency']}
+        folders = [(folder, 'Agency', agency_files) for folder in agency.values()]
+        for folder, label, files in folders + [(job['protime'], 'Protime', protime_files)]:
+            try:
+                files.extend(f for f in model.list_workbooks(folder or '', label) if f not in files)
+            except FileNotFoundError:
+                pass  # Reported by the job itself
+    model.read_workbooks(agency_files, protime_files)
+
+
+def watch(job, args, cache):
+    """
+    Run the watch mode for one job until interrupted.
+    """
+    model = configure_model(job, args, cache)
+    if model.store is not None:
+        print("Watch: Prepared workbooks are kept in memory, the aggregate store is not used")
+        model.set_store_path('')
+    watcher = WorkbookWatcher(model, lambda: report_path(job), debounce=args.debounce, polling=args.poll)
+    try:
+        watcher.run(
+            on_report=lambda path: print(f"Report saved to {path}", file=sys.stderr),
+            on_error=lambda e: print(f"Error: {e}", file=sys.stderr)
+        )
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.agency = parse_agency(args.agency)
+    backing = None if args.no_cache else WorkbookCache(args.cache_dir)
+    cache = MemoryCache(backing)
+
+    if args.manifest:
+        jobs = load_manifest(args.manifest, args)
+    else:
+        jobs = [{option: getattr(args, option, None) for option in JOB_OPTIONS}]
+        jobs[0]['name'] = None
+
+    if args.out_of_core and (args.watch or args.store):
+        raise SystemExit("--out-of-core cannot be combined with --watch or --store, which keep their own data")
+    if args.watch:
+        if len(jobs) > 1:
+            raise SystemExit("--watch runs a single comparison, not a manifest with several jobs")
+        log = io.StringIO() if args.quiet else sys.stdout
+        with contextlib.redirect_stdout(log):
+            return watch(jobs[0], args, cache)
+
+    log = io.StringIO() if args.quiet else sys.stdout
+    with contextlib.redirect_stdout(log):
+        if len(jobs) > 1:
+            preload(jobs, args, cache)
+            with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+                results = list(pool.map(lambda job: run_job(job, args, cache), jobs))
+        else:
+            results = [run_job(jobs[0], args, cache)]
+
+    failed = 0
+    for name, output_file, error, seconds in results:
+        label = f"{name}: " if name else ''
+        if error is None:
+            print(f"{label}Report saved to {output_file} ({seconds:.2f}s)", file=sys.stderr)
+        else:
+            failed += 1
+            print(f"{label}Error: {error}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
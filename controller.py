@@ -2,18 +2,73 @@
 import ttkbootstrap as ttk
 from tkinter import Tk, messagebox, filedialog
 from view import DataView
-from model import DataModel
 import threading
+import multiprocessing
 import os
+import queue
+import time
 from datetime import datetime
 
+POLL_MS = 100  # How often the Tk loop drains the event queue during a run
+# Part of the progress bar (0-100) covered by each stage of a run
+PROGRESS_SPANS = {'read': (0, 85), 'process': (85, 100)}
+
 class DataController:
     def __init__(self):
+        self.started = time.perf_counter()
         self.root = ttk.Window(themename="flatly")
-        self.model = DataModel()
+        self.model = None  # Created in the background by load_model
+        self.model_error = None
+        self.model_ready = threading.Event()
         # Pass the run_processing method as a callback to the view
-        self.view = DataView(self.root, self.run_processing)
-        print("Controller initialized")
+        self.view = DataView(self.root, self.run_processing, self.export_report, self.cancel_processing)
+        # Progress events from the model and the outcome of each run, polled by the Tk loop
+        self.events = queue.Queue()
+        # The window is usable right away; Run is enabled once the model is loaded
+        self.view.run_button.config(state='disabled')
+        self.view.status_label.config(text="Loading...")
+        threading.Thread(target=self.load_model, daemon=True).start()
+        self.root.after(50, self.check_model)
+        print(f"Controller initialized in {time.perf_counter() - self.started:.2f}s")
+
+    def load_model(self):
+        """
+        Import the model with pandas, numpy and the Excel engine and create it, off the Tk thread.
+        """
+        try:
+            from model import DataModel
+            from cache import default_cache_dir
+            from archive import default_archive_path
+            from aliases import default_alias_path
+            model = DataModel()
+            model.set_progress_queue(self.events)
+            # Parse workbooks on all cores; the model falls back to serial for a single core
+            model.set_workers(os.cpu_count())
+            # Reuse parsed workbooks between runs when the folders did not change
+            model.set_cache_dir(default_cache_dir())
+            # Keep the history of every comparison for archive.py queries
+            model.set_archive_path(default_archive_path())
+            # Join the names mapped with aliases.py exactly
+            model.set_alias_path(default_alias_path())
+            self.model = model
+            print(f"Controller: Model loaded in {time.perf_counter() - self.started:.2f}s")
+        except Exception as e:
+            print(f"Controller: Error loading model - {e}")
+            self.model_error = e
+        finally:
+            self.model_ready.set()
+
+    def check_model(self):
+        """
+        Poll from the Tk main loop until load_model is done, then enable Run.
+        """
+        if not self.model_ready.is_set():
+            self.root.after(50, self.check_model)
+        elif self.model_error is not None:
+            self.view.status_label.config(text=f"Error: {self.model_error}")
+        else:
+            self.view.run_button.config(state='normal')
+            self.view.status_label.config(text="")
 
     def run_processing(self):
         print("Run button clicked")
@@ -21,6 +76,8 @@ class DataController:
         self.model.set_agency_path(self.view.agency_path)
         self.model.set_protime_path(self.view.protime_path)
         self.model.set_threshold_minutes(self.view.threshold_minutes_var.get())
+        self.model.set_match_threshold(self.view.match_threshold_var.get())
+        self.model.set_name_filter(self.view.name_filter_var.get())
         start_week = self.view.start_week_var.get()
         end_week = self.view.end_week_var.get()
         print(f"Start Week Entry: {start_week}")
@@ -29,33 +86,122 @@ class DataController:
         print(f"Agency Path: {self.view.agency_path}")
         print(f"Protime Path: {self.view.protime_path}")
         print(f"Threshold Minutes: {self.model.threshold_minutes}")
+        print(f"Match Threshold: {self.model.match_threshold}")
         print(f"Start Week: {self.model.start_week}")
         print(f"End Week: {self.model.end_week}")
         # Disable the run button during processing
         self.view.run_button.config(state='disabled')
+        self.view.export_button.config(state='disabled')
+        self.view.cancel_button.config(state='normal')
         self.view.status_label.config(text="Processing...")
-        self.view.progress_bar.start()
+        self.view.progress_bar.config(mode='determinate', value=0)
 
         # Run the data processing in a separate thread to keep the UI responsive
-        threading.Thread(target=self.process_data_thread).start()
+        threading.Thread(target=self.process_data_thread, daemon=True).start()
+        self.root.after(POLL_MS, self.poll_events)
         print("Processing thread started")
 
     def process_data_thread(self):
+        """
+        Run the comparison off the Tk thread. Widgets are never touched here: the outcome is put on
+        the event queue, like the model's progress events, and handled by poll_events.
+        """
         try:
             print("Thread: Starting data processing")
-            # Load data
-            success = self.model.load_data()
-            print("Thread: Data loaded")
-            # Process data
-            success = self.model.process_data()
+            # Only the threshold, name filter or a narrower week range changed: filter the last comparison
+            if self.model.can_requery():
+                success = self.model.requery()
+            else:
+                # Load and process data
+                success = self.model.run()
             print("Thread: Data processed")
+            self.events.put({'stage': 'done', 'differences': self.model.differences})
+        except Exception as e:
+            # A cancelled run stops with RunCancelled (or whatever it was doing when cancelled)
+            if self.model.cancelled.is_set():
+                print("Thread: Data processing cancelled")
+                self.events.put({'stage': 'cancelled'})
+            else:
+                print(f"Error occurred: {e}")
+                self.events.put({'stage': 'error', 'error': e})
+        finally:
+            print("Processing thread finished")
 
-            # Ask user for save directory
-            save_directory = filedialog.askdirectory(title="Select Save Directory")
-            if not save_directory:
-                raise Exception("No save directory selected.")
-            print(f"Save Directory: {save_directory}")
+    def cancel_processing(self):
+        print("Cancel button clicked")
+        self.model.cancel()
+        self.view.cancel_button.config(state='disabled')
+        self.view.status_label.config(text="Cancelling...")
 
+    def poll_events(self):
+        """
+        Drain the event queue from the Tk main loop: progress events move the bar, the final
+        'done', 'cancelled', 'saved' or 'error' event updates the window and stops polling.
+        """
+        finished = False
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            stage = event['stage']
+            if stage in PROGRESS_SPANS:
+                low, high = PROGRESS_SPANS[stage]
+                self.view.progress_bar.config(value=low + (high - low) * event['done'] / max(event['total'], 1))
+                rows = f", {event['rows']:,} rows" if event['rows'] is not None else ''
+                label = 'Reading workbooks' if stage == 'read' else 'Comparing'
+                self.view.status_label.config(text=f"{label} {event['done']}/{event['total']}{rows}")
+                continue
+            finished = True
+            if stage == 'done':
+                differences = event['differences']
+                self.view.show_results(differences)
+                self.view.progress_bar.config(value=100)
+                self.view.status_label.config(text=f"{len(differences) - 1} differences found")
+            elif stage == 'saved':
+                messagebox.showinfo("Success", f"Report saved to {event['path']}")
+                self.view.export_button.config(state='normal')
+                self.view.status_label.config(text=f"Report saved to {event['path']}")
+            elif stage == 'cancelled':
+                self.view.progress_bar.config(value=0)
+                self.view.status_label.config(text="Cancelled")
+                self.enable_export()
+            else:
+                messagebox.showerror("Error", str(event['error']))
+                self.view.status_label.config(text=f"Error: {event['error']}")
+                self.enable_export()
+        if finished:
+            # Re-enable the run button
+            self.view.progress_bar.stop()
+            self.view.run_button.config(state='normal')
+            self.view.cancel_button.config(state='disabled')
+        else:
+            self.root.after(POLL_MS, self.poll_events)
+
+    def enable_export(self):
+        """
+        Re-enable Export after a failed or cancelled run or export while the last results are still shown.
+        """
+        if not self.model.differences.empty:
+            self.view.export_button.config(state='normal')
+
+    def export_report(self):
+        print("Export button clicked")
+        # Ask user for save directory
+        save_directory = filedialog.askdirectory(title="Select Save Directory")
+        if not save_directory:
+            return
+        print(f"Save Directory: {save_directory}")
+        self.view.run_button.config(state='disabled')
+        self.view.export_button.config(state='disabled')
+        self.view.status_label.config(text="Saving report...")
+        self.view.progress_bar.config(mode='indeterminate')
+        self.view.progress_bar.start()
+        threading.Thread(target=self.export_report_thread, args=(save_directory,), daemon=True).start()
+        self.root.after(POLL_MS, self.poll_events)
+
+    def export_report_thread(self, save_directory):
+        try:
             # Create 'Reports' folder in the save directory
             reports_folder = os.path.join(save_directory, 'Reports')
             os.makedirs(reports_folder, exist_ok=True)
@@ -66,21 +212,12 @@ class DataController:
             output_file = os.path.join(reports_folder, report_name)
             self.model.save_report(output_file)
             print(f"Report saved to {output_file}")
-
-            # Show success message
-            messagebox.showinfo("Success", f"Report saved to {output_file}")
-
-            self.view.status_label.config(text=f"Report saved to {output_file}")
+            self.events.put({'stage': 'saved', 'path': output_file})
         except Exception as e:
-            # Show error message
             print(f"Error occurred: {e}")
-            messagebox.showerror("Error", str(e))
-            self.view.status_label.config(text=f"Error: {e}")
+            self.events.put({'stage': 'error', 'error': e})
         finally:
-            # Re-enable the run button
-            self.view.run_button.config(state='normal')
-            self.view.progress_bar.stop()
-            print("Processing thread finished")
+            print("Export thread finished")
 
         # Get's timestamp
     def get_timestamp(self):
@@ -92,5 +229,7 @@ class DataController:
         self.root.mainloop()
 
 if __name__ == '__main__':
+    # Needed for the workbook process pool in frozen Windows builds
+    multiprocessing.freeze_support()
     app = DataController()
     app.start()
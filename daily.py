@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+PROTIME_VALUES = ['Protime Hours', 'Protime Invoice']
+AGENCY_VALUES = ['Agency Hours', 'Agency Invoice']
+
+
+def composite_key(codes, sizes):
+    """
+    Combine integer code arrays (0 <= code < size) into one int64 key per row.
+    Keys sort in the same order as the codes compared column by column.
+    """
+    if np.prod([float(size) for size in sizes]) >= 2 ** 63:
+        raise ValueError("Too many distinct dates and names to build a day-level key.")
+    key = np.zeros(len(codes[0]), dtype=np.int64)
+    for code, size in zip(codes, sizes):
+        key = key * size + code
+    return key
+
+
+def split_key(key, sizes):
+    """
+    Undo composite_key: return the code arrays the key was built from.
+    """
+    codes = []
+    for size in reversed(sizes):
+        codes.append(key % size)
+        key = key // size
+    return codes[::-1]
+
+
+def sum_sorted(key, values):
+    """
+    Sort the rows once on key and sum the values of every distinct key with a single
+    linear pass over the sorted rows. Missing values count as 0, like a groupby sum.
+    Returns (sorted distinct keys, sums per key, position of the first row of each key).
+    """
+    if not len(key):
+        return key, np.empty((0, values.shape[1])), np.empty(0, dtype=np.int64)
+    order = np.argsort(key, kind='stable')
+    key = key[order]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    sums = np.add.reduceat(np.nan_to_num(values[order]), starts, axis=0)
+    return key[starts], sums, order[starts]
+
+
+def merge_sorted(left_keys, right_keys):
+    """
+    Full outer join of two sorted arrays of distinct keys. A stable sort of two sorted runs
+    is a single linear merge. Returns (keys, left positions, right positions) with -1 where
+    a key only exists on the other side.
+    """
+    keys = np.concatenate([left_keys, right_keys])
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    new = np.r_[True, keys[1:] != keys[:-1]] if len(keys) else np.empty(0, dtype=bool)
+    slot = np.cumsum(new) - 1
+    left_positions = np.full(int(new.sum()), -1, dtype=np.int64)
+    right_positions = np.full(int(new.sum()), -1, dtype=np.int64)
+    from_left = order < len(left_keys)
+    left_positions[slot[from_left]] = order[from_left]
+    right_positions[slot[~from_left]] = order[~from_left] - len(left_keys)
+    return keys[new], left_positions, right_positions
+
+
+def compare_daily(protime_df, agency_df, by_agency=False):
+    """
+    Aggregate both sources per (Date, Normalized Name), per agency first with by_agency,
+    and outer-join them with a sort-merge instead of a hash groupby and merge.
+    'Normalized Name' (and 'Agency') must be categoricals sharing the same sorted categories.
+    The result is ordered like the weekly outer merge: by agency, date and name, with the
+    week taken from the first row of each day.
+    """
+    first_day = min(protime_df['Date'].min(), agency_df['Date'].min()).to_datetime64().astype('datetime64[D]')
+    last_day = max(protime_df['Date'].max(), agency_df['Date'].max()).to_datetime64().astype('datetime64[D]')
+    names = protime_df['Normalized Name'].cat.categories
+    sizes = [int((last_day - first_day).astype(np.int64)) + 1, len(names)]
+    if by_agency:
+        agencies = protime_df['Agency'].cat.categories
+        sizes = [len(agencies)] + sizes
+
+    def key_columns(df):
+        codes = [
+            (df['Date'].to_numpy().astype('datetime64[D]') - first_day).astype(np.int64),
+            df['Normalized Name'].cat.codes.to_numpy().astype(np.int64)
+        ]
+        if by_agency:
+            codes.insert(0, df['Agency'].cat.codes.to_numpy().astype(np.int64))
+        return composite_key(codes, sizes)
+
+    protime_keys, protime_sums, protime_first = sum_sorted(
+        key_columns(protime_df), protime_df[PROTIME_VALUES].to_numpy(dtype=float))
+    agency_keys, agency_sums, agency_first = sum_sorted(
+        key_columns(agency_df), agency_df[AGENCY_VALUES].to_numpy(dtype=float))
+    keys, protime_positions, agency_positions = merge_sorted(protime_keys, agency_keys)
+
+    codes = split_key(keys, sizes)
+    in_protime = protime_positions >= 0
+    weeks = np.where(
+        in_protime,
+        protime_df['Week'].to_numpy()[protime_first[protime_positions]],
+        agency_df['Week'].to_numpy()[agency_first[agency_positions]]
+    ).astype(protime_df['Week'].dtype)
+
+    merged_df = pd.DataFrame({
+        'Date': (first_day + codes[-2].astype('timedelta64[D]')).astype('datetime64[ns]'),
+        'Week': weeks,
+        'Normalized Name': pd.Categorical.from_codes(codes[-1], categories=names)
+    })
+    if by_agency:
+        merged_df.insert(0, 'Agency', pd.Categorical.from_codes(codes[0], categories=agencies))
+    for values, sums, positions in ((PROTIME_VALUES, protime_sums, protime_positions),
+                                    (AGENCY_VALUES, agency_sums, agency_positions)):
+        for index, column in enumerate(values):
+            merged_df[column] = np.where(positions >= 0, sums[positions, index], np.nan)
+    return merged_df
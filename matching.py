@@ -0,0 +1,130 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from names import map_unique
+
+PROTIME_VALUES = ['Protime Hours', 'Protime Invoice']
+AGENCY_VALUES = ['Agency Hours', 'Agency Invoice']
+SOUNDEX_CODES = str.maketrans('bfpvcgjkqsxzdtlmnr', '111122222222334556')
+
+
+def phonetic_key(part):
+    """
+    Return the Soundex code of a single name part, or '' if it has no letters.
+    Accents are dropped first so 'müller' and 'muller' share a key.
+    """
+    part = unicodedata.normalize('NFKD', part)
+    letters = ''.join(c for c in part if 'a' <= c <= 'z')
+    if not letters:
+        return ''
+    digits = letters.translate(SOUNDEX_CODES)
+    key = letters[0]
+    previous = digits[0]
+    for digit in digits[1:]:
+        if digit.isdigit() and digit != previous:
+            key += digit
+        if digit not in 'hw':
+            previous = digit
+    return (key + '000')[:4]
+
+
+def blocking_keys(names):
+    """
+    Return a frame with one row per (name position, key), where the keys are the phonetic
+    codes of the first and the last name part. Sharing either key makes two names candidates,
+    which also pairs up names whose first and last name were swapped.
+    """
+    parts = names.str.split()
+    first = map_unique(parts.str[0].fillna(''), phonetic_key)
+    last = map_unique(parts.str[-1].fillna(''), phonetic_key)
+    keys = pd.DataFrame({
+        'Position': np.concatenate([np.arange(len(names)), np.arange(len(names))]),
+        'Key': np.concatenate([first.to_numpy(), last.to_numpy()])
+    })
+    return keys[keys['Key'] != ''].drop_duplicates()
+
+
+def match_candidates(protime_only, agency_only, threshold, workers=-1, by='Week'):
+    """
+    Score unmatched Protime names against unmatched agency names of the same week
+    (or of the same value of another `by` column, e.g. 'Date').
+    Names are blocked by (Week, phonetic key); all candidate pairs of all blocks are
+    scored in one batched rapidfuzz call using all cores. Pairs are then accepted
+    greedily from the highest score down, so each name is used at most once.
+    Returns a frame of (Protime Position, Agency Position, Match Score).
+    """
+    left = blocking_keys(protime_only['Normalized Name'].reset_index(drop=True))
+    left[by] = protime_only[by].to_numpy()[left['Position'].to_numpy()]
+    right = blocking_keys(agency_only['Normalized Name'].reset_index(drop=True))
+    right[by] = agency_only[by].to_numpy()[right['Position'].to_numpy()]
+
+    candidates = left.merge(right, on=[by, 'Key'], suffixes=(' Protime', ' Agency'))
+    candidates = candidates[['Position Protime', 'Position Agency']].drop_duplicates()
+    candidates.columns = ['Protime Position', 'Agency Position']
+    if candidates.empty:
+        return pd.DataFrame(columns=['Protime Position', 'Agency Position', 'Match Score'])
+
+    protime_names = protime_only['Normalized Name'].to_numpy()
+    agency_names = agency_only['Normalized Name'].to_numpy()
+    candidates['Match Score'] = process.cpdist(
+        protime_names[candidates['Protime Position'].to_numpy()],
+        agency_names[candidates['Agency Position'].to_numpy()],
+        scorer=fuzz.token_sort_ratio,
+        score_cutoff=threshold,
+        workers=workers
+    )
+    candidates = candidates[candidates['Match Score'] >= threshold]
+    candidates = candidates.sort_values(
+        ['Match Score', 'Protime Position', 'Agency Position'],
+        ascending=[False, True, True],
+        kind='mergesort'
+    )
+
+    used_protime = set()
+    used_agency = set()
+    accepted = []
+    for protime_position, agency_position, score in candidates.itertuples(index=False):
+        if protime_position in used_protime or agency_position in used_agency:
+            continue
+        used_protime.add(protime_position)
+        used_agency.add(agency_position)
+        accepted.append((protime_position, agency_position, score))
+    return pd.DataFrame(accepted, columns=['Protime Position', 'Agency Position', 'Match Score'])
+
+
+def apply_fuzzy_matches(merged_df, threshold, workers=-1, by='Week'):
+    """
+    Join rows of an outer-merged comparison that only exist on one side to their best
+    fuzzy match on the other side in the same week (or the same value of `by`).
+    Adds 'Matched Name' (the agency name of a fuzzy match) and 'Match Score'
+    (100 for exact matches, empty for names left unmatched).
+    """
+    protime_side = merged_df[AGENCY_VALUES].isna().all(axis=1)
+    agency_side = merged_df[PROTIME_VALUES].isna().all(axis=1)
+    merged_df = merged_df.assign(**{'Matched Name': '', 'Match Score': np.where(protime_side | agency_side, np.nan, 100.0)})
+
+    protime_only = merged_df[protime_side]
+    agency_only = merged_df[agency_side]
+    if protime_only.empty or agency_only.empty:
+        return merged_df
+
+    matches = match_candidates(protime_only, agency_only, threshold, workers, by)
+    print(f"Model: Fuzzy matching paired {len(matches)} names (threshold {threshold})")
+    if matches.empty:
+        return merged_df
+
+    protime_rows = protime_only.iloc[matches['Protime Position'].to_numpy()].reset_index(drop=True)
+    agency_rows = agency_only.iloc[matches['Agency Position'].to_numpy()].reset_index(drop=True)
+    paired = protime_rows.copy()
+    paired[AGENCY_VALUES] = agency_rows[AGENCY_VALUES].to_numpy()
+    paired['Matched Name'] = agency_rows['Normalized Name'].to_numpy()
+    paired['Match Score'] = matches['Match Score'].to_numpy(dtype=float)
+
+    drop = protime_only.index[matches['Protime Position'].to_numpy()].append(
+        agency_only.index[matches['Agency Position'].to_numpy()]
+    )
+    merged_df = pd.concat([merged_df.drop(index=drop), paired], ignore_index=True)
+    return merged_df.sort_values([by, 'Normalized Name'], kind='mergesort').reset_index(drop=True)
@@ -0,0 +1,269 @@
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+PROFILE_MODES = (None, 'cprofile', 'tracemalloc')
+# Seconds between two readings of the resident memory while a stage or workbook is measured
+SAMPLE_INTERVAL = 0.01
+
+
+def peak_rss_mb():
+    """
+    Return the peak resident memory of this process in MB, or None if it cannot be read.
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return round(peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024, 1)
+    except ImportError:
+        pass
+    counters = windows_memory_counters()
+    return round(counters.PeakWorkingSetSize / 2 ** 20, 1) if counters is not None else None
+
+
+def windows_memory_counters():
+    """
+    Return the PROCESS_MEMORY_COUNTERS of this process on Windows, or None elsewhere.
+    """
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters
+    except Exception:
+        pass
+    return None
+
+
+def current_rss():
+    """
+    Return the resident memory of this process in bytes, or None if it cannot be read cheaply (macOS).
+    """
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    counters = windows_memory_counters() if sys.platform == 'win32' else None
+    return counters.WorkingSetSize if counters is not None else None
+
+
+class MemorySampler:
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        """
+        Peak resident memory of the blocks being measured, read every interval seconds by a
+        background thread that only runs while a block is open. The process-wide high-water mark
+        cannot be reset, so this is what tells the memory of one stage or workbook from the
+        stages before it. Spikes shorter than the interval can be missed.
+        """
+        self.interval = interval
+        self.next_token = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the open blocks. Called in forked worker processes, which do not inherit the sampling thread.
+        """
+        self.lock = threading.Lock()
+        self.peaks = {}  # {token: [memory at start, peak so far]} of the open blocks
+        self.thread = None
+
+    def start(self):
+        """
+        Start measuring a block. Returns a token for stop(), or None if the memory cannot be read.
+        """
+        rss = current_rss()
+        if rss is None:
+            return None
+        with self.lock:
+            token = self.next_token
+            self.next_token += 1
+            self.peaks[token] = [rss, rss]
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.sample, name='memory-sampler', daemon=True)
+                self.thread.start()
+        return token
+
+    def sample(self):
+        while True:
+            time.sleep(self.interval)
+            rss = current_rss()
+            with self.lock:
+                if not self.peaks:
+                    self.thread = None
+                    return
+                for peak in self.peaks.values():
+                    peak[1] = max(peak[1], rss)
+
+    def stop(self, token):
+        """
+        Stop measuring a block. Returns {'peak_rss_mb', 'rss_growth_mb'}: the peak resident memory
+        while the block ran and how far it rose above the memory at its start.
+        """
+        if token is None:
+            return {}
+        rss = current_rss()
+        with self.lock:
+            start, peak = self.peaks.pop(token)
+        peak = max(peak, rss)
+        return {'peak_rss_mb': round(peak / 2 ** 20, 1), 'rss_growth_mb': round((peak - start) / 2 ** 20, 1)}
+
+
+sampler = MemorySampler()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=sampler.reset)
+
+
+class RunMetrics:
+    def __init__(self, profile=None):
+        """
+        Timings of one run: wall time, CPU time, rows in/out and peak memory per stage and per workbook.
+        With profile='cprofile' the whole run is profiled; with profile='tracemalloc'
+        every stage also records the peak Python/numpy memory it allocated.
+        """
+        if profile not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {profile!r}, expected one of {PROFILE_MODES}")
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.profile = profile
+        self.stages = []
+        self.files = []
+        self.profiler = None
+        self.top_allocations = None
+        self.depth = 0
+        if profile == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif profile == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Measure the block as a stage. The yielded dict can be given 'rows_out' and other figures.
+        Nested stages are recorded with their depth; traced memory is only kept for top-level stages.
+        peak_rss_mb is the peak resident memory during the stage, rss_growth_mb how far it rose above
+        the memory at the start of the stage.
+        """
+        record = {'stage': name, 'depth': self.depth}
+        if rows_in is not None:
+            record['rows_in'] = rows_in
+        tracing = self.profile == 'tracemalloc' and tracemalloc.is_tracing() and self.depth == 0
+        if tracing:
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        memory = sampler.start()
+        wall, cpu = time.perf_counter(), time.process_time()
+        self.stages.append(record)
+        self.depth += 1
+        try:
+            yield record
+        finally:
+            self.depth -= 1
+            record['wall_s'] = round(time.perf_counter() - wall, 4)
+            record['cpu_s'] = round(time.process_time() - cpu, 4)
+            record.update(sampler.stop(memory))
+            if tracing:
+                record['traced_peak_mb'] = round((tracemalloc.get_traced_memory()[1] - base) / 2 ** 20, 2)
+
+    def add_file(self, path, kind, source, rows, wall_s=None, cpu_s=None, memory=None):
+        """
+        Record how one workbook was loaded ('parsed' or 'cache') and how long it took.
+        memory holds the peak_rss_mb and rss_growth_mb of the process that parsed it.
+        """
+        record = {'path': path, 'kind': kind, 'source': source, 'rows': rows}
+        if wall_s is not None:
+            record['wall_s'] = round(wall_s, 4)
+            record['cpu_s'] = round(cpu_s, 4)
+        record.update(memory or {})
+        self.files.append(record)
+
+    def finish(self):
+        """
+        Stop profiling and keep the largest tracemalloc allocations, if tracing.
+        """
+        if self.profiler is not None:
+            self.profiler.disable()
+        elif self.profile == 'tracemalloc' and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self.top_allocations = [
+                {'location': str(stat.traceback[0]), 'size_mb': round(stat.size / 2 ** 20, 2), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:25]
+            ]
+
+    def to_dict(self):
+        data = {
+            'started': self.started,
+            'profile': self.profile,
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': self.stages,
+            'files': self.files
+        }
+        if self.top_allocations:
+            data['top_allocations'] = self.top_allocations
+        return data
+
+    def write(self, base_path):
+        """
+        Write the run log as <base_path>.run.json, plus <base_path>.prof when profiling with cProfile.
+        Returns the path of the run log.
+        """
+        self.finish()
+        log_path = f"{base_path}.run.json"
+        with open(log_path, 'w', encoding='utf-8') as fh:
+            json.dump(self.to_dict(), fh, indent=2)
+        if self.profiler is not None:
+            self.profiler.dump_stats(f"{base_path}.prof")
+        return log_path
+
+    def summary(self):
+        """
+        Return a short text table of the stages in run order and the slowest workbooks.
+        """
+        lines = ["Stage timings:"]
+        for record in self.stages:
+            indent = '  ' * record['depth']
+            rows = f" rows {record.get('rows_in', '-')} -> {record.get('rows_out', '-')}"
+            memory = f" +{record['rss_growth_mb']} MB" if 'rss_growth_mb' in record else ''
+            lines.append(f"  {indent}{record['stage']:<24} {record.get('wall_s', 0):>8.3f}s wall "
+                         f"{record.get('cpu_s', 0):>8.3f}s cpu{rows}{memory}")
+        parsed = sorted((f for f in self.files if 'wall_s' in f), key=lambda f: f['wall_s'], reverse=True)
+        if parsed:
+            lines.append("Slowest workbooks:")
+            for record in parsed[:5]:
+                memory = f" +{record['rss_growth_mb']} MB" if 'rss_growth_mb' in record else ''
+                lines.append(f"  {os.path.basename(record['path']):<40} {record['wall_s']:>8.3f}s {record['rows']} rows{memory}")
+        return '\n'.join(lines)
+
+
+def print_profile(path, limit=25):
+    """
+    Print the most expensive functions of a .prof file written by RunMetrics.
+    """
+    pstats.Stats(path).sort_stats('cumulative').print_stats(limit)
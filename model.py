@@ -1,7 +1,335 @@
 import pandas as pd
 import os
 import numpy as np
+import multiprocessing
+import queue
 import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from cache import WorkbookCache, DEFAULT_MAX_BYTES, file_fingerprint
+from store import AggregateStore, aggregate_workbook
+from readers import CalamineWorkbook, WORKBOOK_EXTENSIONS, XLSX_ENGINES, read_columns
+from names import normalize_categories, shared_categories
+from matching import apply_fuzzy_matches
+from daily import compare_daily
+from metrics import RunMetrics, PROFILE_MODES, sampler
+from report import report_writer, write_report
+from results import ResultSet, TOTAL_COLUMNS, totals_row
+from preflight import preflight
+from archive import ReconciliationArchive
+from aliases import AliasStore
+from partitions import WeekPartitions
+from parallel import parallel_compare, PARALLEL_MIN_ROWS
+
+AGENCY_COLUMNS = {
+    'Datum': 'Date',
+    'Gewerkte week': 'Week',
+    'Naam Medewerker': 'Name',
+    'Uren': 'Agency Hours',
+    'Nettowaarde': 'Agency Invoice'
+}
+PROTIME_COLUMNS = {
+    'Hours (Dec)': 'Protime Hours',
+    'Invoice incl ADV': 'Protime Invoice'
+}
+# Columns read from each source's workbooks; all other columns are skipped while parsing
+SOURCE_COLUMNS = {
+    'agency': list(AGENCY_COLUMNS),
+    'protime': ['Date', 'Week', 'Temp Agency', 'Full Name', 'Hours (Dec)', 'Invoice incl ADV']
+}
+# Only the day-level comparison needs these, so workbooks without them can still be compared per week
+OPTIONAL_COLUMNS = {
+    'agency': ['Datum'],
+    'protime': ['Date']
+}
+GRAINS = ('week', 'day')
+# Parsed workbooks waiting to be pruned, and workbooks parsed ahead per worker, while reading
+PIPELINE_DEPTH = 2
+# Progress steps reported by process_data
+PROCESS_STEPS = 4
+# Columns every workbook of a source must have, checked on the header before any workbook is parsed
+REQUIRED_COLUMNS = {
+    kind: [column for column in columns if column not in OPTIONAL_COLUMNS[kind]]
+    for kind, columns in SOURCE_COLUMNS.items()
+}
+
+
+def compact_weeks(weeks):
+    """
+    Cast week numbers to int16, or int64 if any week does not fit.
+    """
+    weeks = weeks.astype(int)
+    if weeks.empty or (weeks.min() >= np.iinfo(np.int16).min and weeks.max() <= np.iinfo(np.int16).max):
+        return weeks.astype(np.int16)
+    return weeks
+
+
+def concat_frames(dfs):
+    """
+    Concatenate prepared frames. Categorical columns are first recoded onto the union of
+    their categories, so the result stays categorical instead of falling back to objects.
+    """
+    for column in dfs[0].columns:
+        if isinstance(dfs[0][column].dtype, pd.CategoricalDtype):
+            categories = dfs[0][column].cat.categories
+            for df in dfs[1:]:
+                categories = categories.union(df[column].cat.categories)
+            recoded = []
+            for df in dfs:
+                df = df.copy(deep=False)  # Cached frames are shared, only replace the column here
+                df[column] = df[column].cat.set_categories(categories)
+                recoded.append(df)
+            dfs = recoded
+    return pd.concat(dfs, ignore_index=True)
+
+
+def select_rows(df, mask):
+    """
+    Return the rows of df where mask is True with a fresh RangeIndex, copying the data once.
+    """
+    df = df[mask]
+    df.index = pd.RangeIndex(len(df))
+    return df
+
+
+def parse_dates(values):
+    """
+    Parse a date column to day precision; missing or unreadable dates become NaT.
+    ISO dates (as CSV and Parquet exports write them) are read year first, other text day first.
+    """
+    if values.dtype != object:
+        return pd.to_datetime(values, errors='coerce', dayfirst=True).dt.normalize()
+    parsed = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    text = parsed.isna() & values.notna()
+    if text.any():
+        parsed[text] = pd.to_datetime(values[text], errors='coerce', dayfirst=True)
+    return parsed.dt.normalize()
+
+
+def prepare_agency_frame(df):
+    """
+    Reduce a raw agency frame to the compared columns with their final types.
+    The week range is not applied here, so the result only depends on the workbook itself.
+    """
+    df = df.rename(columns=AGENCY_COLUMNS)
+    if 'Date' not in df.columns:
+        df = df.assign(Date=pd.NaT)
+    df = df[pd.to_numeric(df['Week'], errors='coerce').notna()]
+    df = df[['Date', 'Week', 'Name', 'Agency Hours', 'Agency Invoice']]
+    df['Date'] = parse_dates(df['Date'])
+    df['Agency Hours'] = df['Agency Hours'].astype(float).round(2)
+    df['Agency Invoice'] = pd.to_numeric(df['Agency Invoice'], errors='coerce').round(2)
+    df['Week'] = compact_weeks(df['Week'])
+    df['Name'] = df['Name'].astype(str).str.strip().astype('category')
+    return df.reset_index(drop=True)
+
+
+def prepare_protime_frame(df):
+    """
+    Reduce a raw Protime frame to the compared columns with their final types.
+    The week range and agency filters are not applied here, so the result only depends on the workbook itself.
+    """
+    if 'Date' not in df.columns:
+        df = df.assign(Date=pd.NaT)
+    df = df[pd.to_numeric(df['Week'], errors='coerce').notna()]
+    df = df.rename(columns=PROTIME_COLUMNS)
+    df = df[['Date', 'Week', 'Temp Agency', 'Full Name', 'Protime Hours', 'Protime Invoice']]
+    df['Date'] = parse_dates(df['Date'])
+    df['Protime Hours'] = df['Protime Hours'].astype(float).round(2)
+    df['Protime Invoice'] = pd.to_numeric(df['Protime Invoice'], errors='coerce').round(2)
+    df['Week'] = compact_weeks(df['Week'])
+    df['Temp Agency'] = df['Temp Agency'].astype('category')
+    df['Full Name'] = df['Full Name'].astype(str).str.strip().astype('category')
+    return df.reset_index(drop=True)
+
+
+PREPARERS = {
+    'agency': prepare_agency_frame,
+    'protime': prepare_protime_frame
+}
+
+
+def read_prepared_workbook(path, kind, check=None, engine=None):
+    """
+    Read the required columns of a workbook (.xlsx, .csv or .parquet) and prepare them for the
+    given source ('agency' or 'protime'). Kept at module level so it can be sent to worker processes.
+    check is passed to read_columns to stop reading a workbook part way; engine picks the .xlsx reader.
+    """
+    columns = read_columns(path, SOURCE_COLUMNS[kind], OPTIONAL_COLUMNS[kind], check, engine)
+    return PREPARERS[kind](columns)
+
+
+def read_prepared_workbook_timed(path, kind, check=None, engine=None, cancelled=None):
+    """
+    Same as read_prepared_workbook, also returning the wall and CPU seconds spent in the worker
+    and its peak memory while parsing ({'peak_rss_mb', 'rss_growth_mb'}, see metrics.MemorySampler).
+    cancelled is an Event shared with the parent (a Manager Event in worker processes); once it
+    is set the workbook stops reading at its next chunk with RunCancelled.
+    """
+    if cancelled is not None:
+        check = cancel_check(cancelled)
+    memory = sampler.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        df = read_prepared_workbook(path, kind, check, engine)
+    finally:
+        usage = sampler.stop(memory)
+    return df, time.perf_counter() - wall, time.process_time() - cpu, usage
+
+
+class RunCancelled(Exception):
+    """
+    Raised inside a run stopped with DataModel.cancel().
+    """
+
+
+def cancel_check(cancelled):
+    """
+    Return a check callback raising RunCancelled once the cancelled event is set.
+    """
+    def check():
+        if cancelled.is_set():
+            raise RunCancelled("The run was cancelled.")
+    return check
+
+
+KEYS = ['Week', 'Normalized Name']
+AGENCY_KEYS = ['Agency', 'Week', 'Normalized Name']
+DEFAULT_AGENCY = 'OTTO'
+
+
+def aggregate_protime(df, keys=KEYS):
+    """
+    Sum Protime hours and invoices per week and normalized name (per agency with AGENCY_KEYS).
+    """
+    return df.groupby(keys, as_index=False, observed=True).agg({
+        'Protime Hours': 'sum',
+        'Protime Invoice': 'sum'
+    })
+
+
+def aggregate_agency(df, keys=KEYS):
+    """
+    Sum agency hours and invoices per week and normalized name (per agency with AGENCY_KEYS).
+    """
+    return df.groupby(keys, as_index=False, observed=True).agg({
+        'Agency Hours': 'sum',
+        'Agency Invoice': 'sum'
+    })
+
+
+def compare_aggregates(protime_agg, agency_agg, match_threshold=None, keys=KEYS):
+    """
+    Outer-merge the aggregated datasets and calculate the differences.
+    With a match threshold, names left on one side are paired by fuzzy matching first
+    (within each agency when the keys include 'Agency').
+    """
+    # Merge the aggregated DataFrames
+    merged_df = pd.merge(
+        protime_agg,
+        agency_agg,
+        how='outer',
+        on=keys,
+        suffixes=('_Protime', '_Agency')
+    )
+
+    # Pair up names that only exist on one side, e.g. typos or swapped first/last names
+    if match_threshold is not None:
+        merged_df = match_names(merged_df, match_threshold)
+
+    return add_differences(merged_df)
+
+
+def match_names(merged_df, match_threshold, by='Week'):
+    """
+    Fuzzy match the names left on one side within each week (or day with by='Date'),
+    and within each agency when the comparison has an 'Agency' column.
+    """
+    if 'Agency' not in merged_df.columns:
+        return apply_fuzzy_matches(merged_df, match_threshold, by=by)
+    return pd.concat(
+        [apply_fuzzy_matches(group, match_threshold, by=by)
+         for _, group in merged_df.groupby('Agency', sort=False, observed=True)]
+        or [merged_df.assign(**{'Matched Name': '', 'Match Score': np.nan})],
+        ignore_index=True
+    )
+
+
+def add_differences(merged_df):
+    """
+    Add the hours, minutes and invoice difference columns to a merged comparison.
+    """
+    merged_df['Hours Difference'] = merged_df['Protime Hours'] - merged_df['Agency Hours']
+    merged_df['Difference in Minutes'] = abs(merged_df['Hours Difference']) * 60
+    merged_df['Invoice Difference'] = merged_df['Protime Invoice'] - merged_df['Agency Invoice']
+    merged_df['Overpay Request'] = np.where((merged_df['Protime Invoice'] - merged_df['Agency Invoice']) < 0, merged_df['Protime Invoice'] - merged_df['Agency Invoice'], 0)
+    merged_df['GXO Overpays'] = np.where((merged_df['Protime Invoice'] - merged_df['Agency Invoice']) > 0, merged_df['Protime Invoice'] - merged_df['Agency Invoice'], 0)
+    return merged_df
+
+
+def filter_differences(merged_df, threshold_minutes=None):
+    """
+    Keep the rows above the minutes threshold (all rows if it is not set) and append the totals row.
+    """
+    # Apply threshold if it is set
+    conditions = pd.Series(True, index=merged_df.index)
+    if threshold_minutes is not None and threshold_minutes > 0:
+        conditions &= (merged_df['Difference in Minutes'] > threshold_minutes)
+    diff_df = merged_df[conditions]
+
+    # **Add Totals Row**
+    totals = diff_df[TOTAL_COLUMNS].sum(numeric_only=True)
+
+    # Append the totals row to the DataFrame
+    return pd.concat([diff_df, totals_row(totals, 'Agency' in diff_df.columns)], ignore_index=True)
+
+
+def split_agencies(merged_df, agencies, threshold_minutes=None):
+    """
+    Split a multi-agency comparison into one filtered report per agency, in the given agency order.
+    Agencies without any rows get a report with only the totals row.
+    """
+    groups = dict(list(merged_df.groupby('Agency', sort=False, observed=True)))
+    return {
+        agency: filter_differences(
+            groups.get(agency, merged_df.iloc[:0]).drop(columns='Agency').reset_index(drop=True),
+            threshold_minutes
+        )
+        for agency in agencies
+    }
+
+
+def summarize_agencies(reports):
+    """
+    Build the combined summary: the totals row of every agency report plus an overall total.
+    """
+    return agency_summary({
+        agency: (len(report) - 1, report.iloc[-1][TOTAL_COLUMNS].to_dict()) for agency, report in reports.items()
+    })
+
+
+def agency_summary(reports):
+    """
+    Build the combined summary from {agency: (rows, totals per total column)}.
+    """
+    summary = pd.DataFrame([
+        {'Agency': agency, 'Rows': rows, **totals} for agency, (rows, totals) in reports.items()
+    ], columns=['Agency', 'Rows'] + TOTAL_COLUMNS)
+    totals_row = pd.DataFrame([{
+        'Agency': 'Total', 'Rows': summary['Rows'].sum(), **summary[TOTAL_COLUMNS].sum().to_dict()
+    }])
+    return pd.concat([summary, totals_row], ignore_index=True)
+
+
+def agency_report_path(output_path, agency):
+    """
+    Return the path of an agency's report next to the summary report: <report>_<agency><ext>.
+    """
+    base, extension = os.path.splitext(output_path)
+    safe_name = re.sub(r'[^\w-]+', '_', agency)
+    return f"{base}_{safe_name}{extension}"
+
 
 class DataModel:
     def __init__(self):
@@ -11,12 +339,37 @@ class DataModel:
         """
         self.path_agency = ''
         self.path_protime = ''
+        self.agency_name = DEFAULT_AGENCY  # 'Temp Agency' value in Protime matched against the agency folder
+        self.agency_paths = {}  # Optional {agency name: folder} to reconcile several agencies in one pass
         self.threshold_minutes = None  # Optional threshold for filtering differences
+        self.match_threshold = None  # Optional fuzzy name match score (0-100) for unmatched names
+        self.grain = 'week'  # 'week' compares weekly totals, 'day' compares per date
         self.start_week = None
         self.end_week = None
+        self.workers = 1  # Number of processes used to parse workbooks (1 = serial)
+        self.xlsx_engine = None  # Reader of .xlsx workbooks, None uses calamine when installed
+        self.compare_workers = 1  # Number of processes used to aggregate and merge by week (1 = serial)
+        self.cache = None  # Optional WorkbookCache of prepared workbooks
+        self.store = None  # Optional AggregateStore for incremental runs
+        self.archive = None  # Optional ReconciliationArchive every comparison is appended to
+        self.aliases = None  # Optional AliasStore resolving names to worker IDs before comparing
+        self.alias_min_score = None  # Optional match score from which fuzzy matches are stored as aliases
+        self.out_of_core = False  # Compare one week partition at a time with run_partitioned()
+        self.partition_dir = None  # Optional folder for the week partitions (the system temp folder if empty)
+        self.profile_mode = None  # Optional 'cprofile' or 'tracemalloc' capture for each run
+        self.metrics = RunMetrics()
         self.protime_data = pd.DataFrame()
         self.agency_data = pd.DataFrame()
         self.differences = pd.DataFrame()
+        self.agency_reports = {}  # Per-agency reports in multi-agency mode
+        self.summary = pd.DataFrame()  # Combined totals per agency in multi-agency mode
+        self.name_filter = ''  # Optional text the normalized names must contain
+        self.results = None  # ResultSet of the last comparison, re-queried without comparing again
+        self.results_settings = None  # Sources and settings the results were compared with
+        self.loaded_settings = None
+        self.row_estimates = {}  # Data rows declared by each workbook to parse, from its header scan
+        self.progress = None  # Optional queue.Queue receiving progress events of each run
+        self.cancelled = threading.Event()  # Set by cancel() to stop the current run
 
     # Setters for paths and parameters
     def set_agency_path(self, path):
@@ -33,6 +386,33 @@ class DataModel:
         self.path_protime = path
         print(f"Model: Protime path set to {path}")
 
+    def set_agency_name(self, name):
+        """
+        Set the 'Temp Agency' value of the Protime rows compared with the agency folder.
+        """
+        name = str(name or '').strip()
+        if not name:
+            raise ValueError("Agency name cannot be empty.")
+        self.agency_name = name
+        print(f"Model: Agency name set to {name}")
+
+    def set_agency_paths(self, agency_paths):
+        """
+        Set the {agency name: folder} mapping for multi-agency mode, where Protime is loaded once
+        and every agency folder is matched to its 'Temp Agency' value. An empty mapping turns it off.
+        """
+        agency_paths = {str(name).strip(): path for name, path in (agency_paths or {}).items()}
+        if '' in agency_paths:
+            raise ValueError("Agency names cannot be empty.")
+        self.agency_paths = agency_paths
+        print(f"Model: Agency folders set to {agency_paths or None}")
+
+    def agency_folders(self):
+        """
+        Return the {agency name: folder} pairs to reconcile, a single pair outside multi-agency mode.
+        """
+        return dict(self.agency_paths) if self.agency_paths else {self.agency_name: self.path_agency}
+
     def set_threshold_minutes(self, minutes):
         """
         Set the threshold in minutes for filtering output data based on differences.
@@ -47,6 +427,40 @@ class DataModel:
         except ValueError:
             raise ValueError("Invalid input for threshold minutes. Please enter a numeric value.")
 
+    def set_match_threshold(self, score):
+        """
+        Set the minimum similarity score (0-100) for pairing names that did not match exactly.
+        An empty value disables fuzzy matching. If invalid input is provided, raise a ValueError.
+        """
+        try:
+            if score is not None and score != '':
+                self.match_threshold = float(score)
+                if not 0 < self.match_threshold <= 100:
+                    raise ValueError("Match threshold must be between 0 and 100.")
+            else:
+                self.match_threshold = None  # Optional
+            print(f"Model: Match threshold set to {self.match_threshold}")
+        except ValueError:
+            raise ValueError("Invalid input for match threshold. Please enter a number between 0 and 100.")
+
+    def set_name_filter(self, name_filter):
+        """
+        Only report names containing this text (case-insensitive). An empty value reports all names.
+        """
+        self.name_filter = (name_filter or '').strip()
+        print(f"Model: Name filter set to {self.name_filter or None}")
+
+    def set_grain(self, grain):
+        """
+        Set the comparison grain: 'week' (default) or 'day'.
+        The day grain needs the 'Date' column in Protime and 'Datum' in the agency workbooks.
+        """
+        grain = (grain or 'week').lower()
+        if grain not in GRAINS:
+            raise ValueError(f"Invalid comparison grain {grain}. Please use 'week' or 'day'.")
+        self.grain = grain
+        print(f"Model: Comparison grain set to {grain}")
+
     def set_week_range(self, start_week, end_week):
         """
         Set the week range for filtering data.
@@ -64,6 +478,161 @@ class DataModel:
         except ValueError:
             raise ValueError("Invalid week numbers. Please enter numeric values for both start and end weeks.")
 
+    def set_workers(self, workers):
+        """
+        Set the number of worker processes used to parse workbooks.
+        An empty value uses one worker per CPU core, 1 keeps the serial path.
+        """
+        try:
+            if workers is None or workers == '':
+                self.workers = os.cpu_count() or 1
+            else:
+                self.workers = int(workers)
+            if self.workers < 1:
+                raise ValueError("Worker count must be at least 1.")
+            print(f"Model: Workers set to {self.workers}")
+        except ValueError:
+            raise ValueError("Invalid worker count. Please enter a positive whole number.")
+
+    def set_xlsx_engine(self, engine):
+        """
+        Set the reader of .xlsx workbooks: 'openpyxl', or 'calamine' (needs the python-calamine package).
+        An empty value uses calamine when it is installed and openpyxl otherwise.
+        """
+        engine = (engine or '').strip().lower() or None
+        if engine is not None and engine not in XLSX_ENGINES:
+            raise ValueError(f"Invalid xlsx engine {engine}. Please use {' or '.join(XLSX_ENGINES)}.")
+        if engine == 'calamine' and CalamineWorkbook is None:
+            raise ValueError("The calamine engine is not installed. Please run 'pip install python-calamine'.")
+        self.xlsx_engine = engine
+        print(f"Model: Xlsx engine set to {engine or ('calamine' if CalamineWorkbook is not None else 'openpyxl')}")
+
+    def set_compare_workers(self, workers):
+        """
+        Set the number of worker processes used to aggregate and merge the weekly comparison.
+        An empty value uses one worker per CPU core, 1 keeps the serial path.
+        Comparisons of fewer than PARALLEL_MIN_ROWS rows always run serially.
+        """
+        try:
+            if workers is None or workers == '':
+                self.compare_workers = os.cpu_count() or 1
+            else:
+                self.compare_workers = int(workers)
+            if self.compare_workers < 1:
+                raise ValueError("Worker count must be at least 1.")
+            print(f"Model: Compare workers set to {self.compare_workers}")
+        except ValueError:
+            raise ValueError("Invalid worker count. Please enter a positive whole number.")
+
+    def set_cache_dir(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Enable the on-disk cache of prepared workbooks in the given folder.
+        An empty value disables the cache.
+        """
+        self.cache = WorkbookCache(cache_dir, max_bytes) if cache_dir else None
+        print(f"Model: Cache folder set to {cache_dir or None}")
+
+    def set_store_path(self, store_path):
+        """
+        Enable incremental runs backed by the aggregate store at the given path.
+        An empty value disables incremental runs.
+        """
+        if self.store is not None:
+            self.store.close()
+        self.store = AggregateStore(store_path) if store_path else None
+        print(f"Model: Aggregate store set to {store_path or None}")
+
+    def set_archive_path(self, archive_path):
+        """
+        Append every comparison to the reconciliation archive at the given path.
+        An empty value disables archiving.
+        """
+        if self.archive is not None:
+            self.archive.close()
+        self.archive = ReconciliationArchive(archive_path) if archive_path else None
+        print(f"Model: Archive set to {archive_path or None}")
+
+    def set_alias_path(self, alias_path):
+        """
+        Resolve names through the alias table at the given path before comparing.
+        An empty value disables aliases.
+        """
+        if self.aliases is not None:
+            self.aliases.close()
+        self.aliases = AliasStore(alias_path) if alias_path else None
+        print(f"Model: Alias table set to {alias_path or None}")
+
+    def set_alias_learning(self, score):
+        """
+        Store fuzzy matches scoring at least this (0-100) as aliases for the next runs.
+        An empty value stores none. If invalid input is provided, raise a ValueError.
+        """
+        try:
+            if score:
+                self.alias_min_score = float(score)
+                if not 0 < self.alias_min_score <= 100:
+                    raise ValueError
+            else:
+                self.alias_min_score = None  # Optional
+            print(f"Model: Alias learning score set to {self.alias_min_score}")
+        except ValueError:
+            raise ValueError("Invalid input for alias learning score. Please enter a number between 0 and 100.")
+
+    def set_out_of_core(self, enabled, partition_dir=None):
+        """
+        Compare out of core: run_partitioned() writes the prepared rows to week partitions under
+        partition_dir (the system temp folder if empty) and compares one week at a time.
+        """
+        self.out_of_core = bool(enabled)
+        self.partition_dir = partition_dir or None
+        print(f"Model: Out-of-core comparison {'enabled' if self.out_of_core else 'disabled'}"
+              f"{f' in {partition_dir}' if self.out_of_core and partition_dir else ''}")
+
+    def set_profile_mode(self, mode):
+        """
+        Set the optional profiling capture for each run: 'cprofile', 'tracemalloc' or empty for none.
+        """
+        mode = mode or None
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Invalid profile mode {mode}. Please use 'cprofile' or 'tracemalloc'.")
+        self.profile_mode = mode
+        print(f"Model: Profile mode set to {mode}")
+
+    def set_progress_queue(self, progress):
+        """
+        Send progress events to a queue.Queue (or None to stop). Every event is a dict with the
+        'stage' ('read' or 'process'), 'done' and 'total' steps of that stage and 'rows' so far.
+        Events are put from the thread running the model, so a UI polls the queue from its own loop.
+        """
+        self.progress = progress
+
+    def report_progress(self, stage, done, total, rows=None):
+        if self.progress is not None:
+            self.progress.put({'stage': stage, 'done': done, 'total': total, 'rows': rows})
+
+    def cancel(self):
+        """
+        Ask the current run to stop; it raises RunCancelled at its next check. Safe to call from any thread.
+        Workbooks waiting for a parsing worker are dropped and workbooks being parsed stop at their next chunk.
+        """
+        print("Model: Cancelling the run")
+        self.cancelled.set()
+
+    def check_cancelled(self):
+        """
+        Raise RunCancelled if cancel() was called during this run.
+        """
+        if self.cancelled.is_set():
+            raise RunCancelled("The run was cancelled.")
+
+    def start_metrics(self):
+        """
+        Start a new run: record its metrics from here on and clear an earlier cancel().
+        """
+        self.metrics.finish()
+        self.metrics = RunMetrics(self.profile_mode)
+        self.cancelled.clear()
+
     def normalize_name(self, name):
         """
         Normalize the given name by:
@@ -85,103 +654,291 @@ class DataModel:
         else:
             return ''  # Return empty string for invalid names
 
+    def list_workbooks(self, path, label):
+        """
+        Return the full paths of all .xlsx, .csv and .parquet files in the given folder.
+        Raise errors if the folder is invalid or contains no workbooks.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{label} path does not exist: {path}")
+        files = [os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith(WORKBOOK_EXTENSIONS) and not f.startswith('~$')]
+        if not files:
+            raise FileNotFoundError(f"No .xlsx, .csv or .parquet files found in {label.lower()} path: {path}")
+        return files
+
+    def list_sources(self):
+        """
+        List the workbooks to compare: ({agency name: agency workbooks}, Protime workbooks).
+        """
+        if self.agency_paths:
+            agency_files = {
+                agency: self.list_workbooks(path, f"Agency {agency}") for agency, path in self.agency_paths.items()
+            }
+        else:
+            agency_files = {self.agency_name: self.list_workbooks(self.path_agency, 'Agency')}
+        return agency_files, self.list_workbooks(self.path_protime, 'Protime')
+
+    def source_settings(self, agency_files, protime_files):
+        """
+        Describe what a comparison depends on apart from the threshold, week range and name filter:
+        the folders, agencies, match threshold, grain, aliases and the size and modification time of every workbook.
+        """
+        files = [(agency, path) for agency, paths in agency_files.items() for path in paths]
+        files += [('protime', path) for path in protime_files]
+        stats = tuple((kind, os.path.abspath(path), os.stat(path).st_size, os.stat(path).st_mtime_ns)
+                      for kind, path in files)
+        aliases = self.aliases.revision() if self.aliases is not None else None
+        return (self.path_protime, tuple(self.agency_folders().items()), self.match_threshold, self.grain, aliases, stats)
+
+    def read_workbooks(self, agency_files, protime_files, prune=None):
+        """
+        Read and prepare the agency and Protime workbooks.
+        Workbooks found in the cache are read from it; the others are parsed and stored.
+        Reading is a pipeline: a producer thread parses the workbooks (in a process pool with more
+        than one worker) and hands them over in listing order through a bounded queue, while this
+        thread applies prune(df, kind) to each frame as soon as it arrives. Only the pruned frames
+        are kept, so peak memory follows the pruned data instead of all parsed workbooks.
+        Results are collected in listing order so the output matches the serial path.
+        """
+        with self.metrics.stage('read_workbooks') as stage:
+            jobs = [(f, 'agency') for f in agency_files] + [(f, 'protime') for f in protime_files]
+            keys = {}
+            cached = set()
+            if self.cache is not None:
+                for job in jobs:
+                    keys[job] = self.cache.key(job[1], job[0])
+                    if self.cache.contains(keys[job]):
+                        cached.add(job)
+                print(f"Model: {len(cached)} of {len(jobs)} workbooks found in cache")
+            pending = [job for job in jobs if job not in cached]
+
+            # Check the headers of the workbooks to parse first, so a wrong file fails before any parsing
+            with self.metrics.stage('preflight', rows_in=len(pending)) as preflight_stage:
+                headers = preflight(pending, REQUIRED_COLUMNS)
+                self.row_estimates = {header['path']: header['rows'] for header in headers}
+                preflight_stage['estimated_rows'] = sum(rows or 0 for rows in self.row_estimates.values())
+
+            frames = {}
+            rows_in = 0
+            self.report_progress('read', 0, len(jobs), 0)
+            for job, df in self.iter_workbooks(jobs, cached, keys):
+                self.check_cancelled()
+                rows_in += len(df)
+                frames[job] = prune(df, job[1]) if prune is not None else df
+                self.report_progress('read', len(frames), len(jobs), rows_in)
+
+            agency_dfs = [frames[(f, 'agency')] for f in agency_files]
+            protime_dfs = [frames[(f, 'protime')] for f in protime_files]
+            stage['files'] = len(jobs)
+            stage['rows_in'] = rows_in
+            stage['rows_out'] = sum(len(df) for df in frames.values())
+        return agency_dfs, protime_dfs
+
+    def iter_workbooks(self, jobs, cached, keys):
+        """
+        Yield (job, prepared frame) for every (path, kind) job in order. The frames are produced
+        by parse_workbooks on a separate thread, at most PIPELINE_DEPTH frames ahead of the consumer.
+        An error in the producer is raised here; stopping early stops the producer.
+        """
+        handoff = queue.Queue(maxsize=PIPELINE_DEPTH)
+        stopped = threading.Event()
+
+        def hand_over(item):
+            while not stopped.is_set():
+                try:
+                    handoff.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for item in self.parse_workbooks(jobs, cached, keys):
+                    if not hand_over((*item, None)):
+                        return
+                hand_over((None, None, None))
+            except Exception as e:
+                hand_over((None, None, e))
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                job, df, error = handoff.get()
+                if error is not None:
+                    raise error
+                if job is None:
+                    return
+                yield job, df
+        finally:
+            stopped.set()
+            producer.join()
+
+    def parse_workbooks(self, jobs, cached, keys):
+        """
+        Yield (job, prepared frame) in job order, loading cached jobs from the cache and parsing
+        the others. With more than one worker the workbooks are parsed in a process pool, keeping
+        PIPELINE_DEPTH workbooks per worker submitted ahead of the one being handed over.
+        Checks for cancel() between workbooks, while waiting for a worker and, through a shared
+        event, inside the workers and the serial parse every CHECK_ROWS rows.
+        """
+        parse_jobs = [job for job in jobs if job not in cached]
+        workers = min(self.workers, len(parse_jobs))
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        manager = multiprocessing.Manager() if pool is not None else None
+        # Checked by the workers between chunks, so cancel() also stops the workbooks being parsed
+        stop_workers = manager.Event() if manager is not None else None
+        if pool is not None:
+            print(f"Model: Loading {len(parse_jobs)} agency and protime workbooks with {workers} workers")
+        futures = {}
+        upcoming = iter(parse_jobs)
+
+        def submit_ahead():
+            while pool is not None and len(futures) < workers * PIPELINE_DEPTH:
+                job = next(upcoming, None)
+                if job is None:
+                    break
+                futures[job] = pool.submit(read_prepared_workbook_timed, *job, engine=self.xlsx_engine,
+                                            cancelled=stop_workers)
+
+        try:
+            submit_ahead()
+            for job in jobs:
+                self.check_cancelled()
+                df = self.cache.get(keys[job]) if job in cached else None
+                if df is not None:
+                    self.metrics.add_file(job[0], job[1], 'cache', len(df))
+                else:
+                    if job in futures:
+                        future = futures.pop(job)
+                        while True:
+                            try:
+                                df, wall, cpu, memory = future.result(timeout=0.2)
+                                break
+                            except FutureTimeout:
+                                self.check_cancelled()
+                        submit_ahead()
+                    else:
+                        print(f"Model: Loading {job[1]} workbook {os.path.basename(job[0])}")
+                        df, wall, cpu, memory = read_prepared_workbook_timed(*job, check=self.check_cancelled, engine=self.xlsx_engine)
+                    self.metrics.add_file(job[0], job[1], 'parsed', len(df), wall, cpu, memory)
+                    if self.cache is not None:
+                        self.cache.put(keys[job], df)
+                yield job, df
+        finally:
+            if pool is not None:
+                # Drop the queued workbooks and stop the ones being parsed at their next chunk
+                stop_workers.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+                manager.shutdown()
+
+    def prune_frame(self, df, kind):
+        """
+        Keep only the rows of a prepared frame that are compared: the selected week range and,
+        for Protime, the compared agencies. Applied to each workbook while reading.
+        """
+        mask = np.ones(len(df), dtype=bool)
+        if self.start_week and self.end_week:
+            mask &= df['Week'].between(self.start_week, self.end_week).to_numpy()
+        if kind == 'protime':
+            mask &= df['Temp Agency'].isin(list(self.agency_folders())).to_numpy()
+        return select_rows(df, mask)
+
     def load_data(self):
         """
         Load data from the provided paths for both agency and Protime datasets.
         Raise errors if paths are invalid or files are missing.
         """
         try:
-            print("Model: Loading agency data")
-            # Load Agency Data
-            if not os.path.exists(self.path_agency):
-                raise FileNotFoundError(f"Agency path does not exist: {self.path_agency}")
-            agency_files = [f for f in os.listdir(self.path_agency) if f.endswith('.xlsx')]
-            if not agency_files:
-                raise FileNotFoundError(f"No .xlsx files found in agency path: {self.path_agency}")
-            agency_dfs = [pd.read_excel(os.path.join(self.path_agency, f)) for f in agency_files]
-            self.agency_data = pd.concat(agency_dfs, ignore_index=True)
-            print(f"Model: Agency data loaded with {len(self.agency_data)} records")
-            self.clean_agency_data()
-
-            print("Model: Loading protime data")
-            # Load Protime Data
-            if not os.path.exists(self.path_protime):
-                raise FileNotFoundError(f"Protime path does not exist: {self.path_protime}")
-            protime_files = [f for f in os.listdir(self.path_protime) if f.endswith('.xlsx')]
-            if not protime_files:
-                raise FileNotFoundError(f"No .xlsx files found in protime path: {self.path_protime}")
-            protime_dfs = [pd.read_excel(os.path.join(self.path_protime, f)) for f in protime_files]
-            self.protime_data = pd.concat(protime_dfs, ignore_index=True)
-            print(f"Model: Protime data loaded with {len(self.protime_data)} records")
-            self.clean_protime_data()
+            self.start_metrics()
+            agency_files, protime_files = self.list_sources()
+            self.loaded_settings = self.source_settings(agency_files, protime_files)
+            # Each workbook is pruned to the week range (and agencies) as soon as it is parsed,
+            # so only the pruned frames are ever combined
+            agency_dfs, protime_dfs = self.read_workbooks(
+                sum(agency_files.values(), []), protime_files, prune=self.prune_frame)
+
+            frames = iter(agency_dfs)
+            self.set_frames({agency: [next(frames) for _ in files] for agency, files in agency_files.items()}, protime_dfs)
 
             return True
         except Exception as e:
             print(f"Model: Error loading data - {e}")
             raise e
 
-    def clean_protime_data(self):
+    def set_frames(self, agency_dfs, protime_dfs):
+        """
+        Combine prepared workbook frames and apply the week and agency filters.
+        agency_dfs maps every agency name to its frames; outside multi-agency mode it has one entry.
+        Used by load_data and by callers that keep prepared frames in memory between runs.
+        """
+        if self.agency_paths:
+            # Tag every agency workbook with its agency so all agencies are compared in one pass
+            tagged = []
+            for agency, dfs in agency_dfs.items():
+                for df in dfs:
+                    df = df.copy(deep=False)
+                    df['Agency'] = pd.Categorical([agency] * len(df), categories=sorted(agency_dfs))
+                    tagged.append(df)
+            self.agency_data = concat_frames(tagged)
+        else:
+            self.agency_data = concat_frames(sum(agency_dfs.values(), []))
+        print(f"Model: Agency data loaded with {len(self.agency_data)} records")
+        self.clean_agency_data(prepared=True)
+
+        self.protime_data = concat_frames(protime_dfs)
+        print(f"Model: Protime data loaded with {len(self.protime_data)} records")
+        self.clean_protime_data(prepared=True)
+
+    def clean_protime_data(self, prepared=False):
         """
         Clean the Protime data by:
         - Filtering valid weeks.
         - Renaming columns for clarity.
         - Applying week and other necessary filters.
+        Set prepared when the data already went through prepare_protime_frame.
         """
         try:
             print("Model: Cleaning protime data")
-            df = self.protime_data.copy()
-            df = df[pd.to_numeric(df['Week'], errors='coerce').notna()]
-            df = df.rename(columns={
-                'Hours (Dec)': 'Protime Hours',
-                'Invoice incl ADV': 'Protime Invoice'
-            })
-            df = df[['Week', 'Temp Agency', 'Full Name', 'Protime Hours', 'Protime Invoice']]
-            df['Protime Hours'] = df['Protime Hours'].astype(float).round(2)
-            df['Protime Invoice'] = pd.to_numeric(df['Protime Invoice'], errors='coerce').round(2)
-            df['Week'] = df['Week'].astype(int)
-
-            # Apply week filter if set
-            if self.start_week and self.end_week:
-                df = df[(df['Week'] >= self.start_week) & (df['Week'] <= self.end_week)]
-                print(f"Protime data week range after filtering: {df['Week'].min()} to {df['Week'].max()}")
-            # Filter by Temp Agency (e.g., 'OTTO')
-            df = df[df['Temp Agency'] == 'OTTO']
-            df['Full Name'] = df['Full Name'].astype(str).str.strip()
-            self.protime_data = df.reset_index(drop=True)
+            with self.metrics.stage('clean_protime_data', rows_in=len(self.protime_data)) as stage:
+                df = self.protime_data if prepared else prepare_protime_frame(self.protime_data)
+
+                # Filter by Temp Agency (e.g., 'OTTO', or every agency in multi-agency mode)
+                mask = df['Temp Agency'].isin(list(self.agency_folders())).to_numpy()
+                # Apply week filter if set
+                if self.start_week and self.end_week:
+                    in_range = df['Week'].between(self.start_week, self.end_week).to_numpy()
+                    weeks = df['Week'][in_range]
+                    print(f"Protime data week range after filtering: {weeks.min()} to {weeks.max()}")
+                    mask &= in_range
+                df = select_rows(df, mask)
+                self.protime_data = df
+                stage['rows_out'] = len(df)
             print(f"Model: Protime data cleaned with {len(df)} records")
         except Exception as e:
             print(f"Model: Error cleaning protime data - {e}")
             raise Exception(f'Exception occurred while cleaning Protime data: {e}')
 
-    def clean_agency_data(self):
+    def clean_agency_data(self, prepared=False):
         """
         Clean the Agency data by:
         - Filtering valid weeks.
         - Renaming columns for clarity.
         - Applying week and other necessary filters.
+        Set prepared when the data already went through prepare_agency_frame.
         """
         try:
             print("Model: Cleaning agency data")
-            df = self.agency_data.copy()
-            column_renames = {
-                'Gewerkte week': 'Week',
-                'Naam Medewerker': 'Name',
-                'Uren': 'Agency Hours',
-                'Nettowaarde': 'Agency Invoice'
-            }
-            df = df.rename(columns=column_renames)
-            df = df[pd.to_numeric(df['Week'], errors='coerce').notna()]
-            df = df[['Week', 'Name', 'Agency Hours', 'Agency Invoice']]
-            df['Agency Hours'] = df['Agency Hours'].astype(float).round(2)
-            df['Agency Invoice'] = pd.to_numeric(df['Agency Invoice'], errors='coerce').round(2)
-            df['Week'] = df['Week'].astype(int)
-
-            # Apply week filter if set
-            if self.start_week and self.end_week:
-                df = df[(df['Week'] >= self.start_week) & (df['Week'] <= self.end_week)]
-                print(f"Agency data week range after filtering: {df['Week'].min()} to {df['Week'].max()}")
-            df['Name'] = df['Name'].astype(str).str.strip()
-            self.agency_data = df.reset_index(drop=True)
+            with self.metrics.stage('clean_agency_data', rows_in=len(self.agency_data)) as stage:
+                df = self.agency_data if prepared else prepare_agency_frame(self.agency_data)
+
+                # Apply week filter if set
+                if self.start_week and self.end_week:
+                    df = select_rows(df, df['Week'].between(self.start_week, self.end_week).to_numpy())
+                    print(f"Agency data week range after filtering: {df['Week'].min()} to {df['Week'].max()}")
+                self.agency_data = df
+                stage['rows_out'] = len(df)
             print(f"Model: Agency data cleaned with {len(df)} records")
         except Exception as e:
             print(f"Model: Error cleaning agency data - {e}")
@@ -199,28 +956,63 @@ class DataModel:
         try:
             print("Model: Processing data")
 
-            if self.protime_data.empty or self.agency_data.empty:
-                raise Exception("One or both of the DataFrames are empty. Cannot proceed with merging.")
+            with self.metrics.stage('process_data', rows_in=len(self.protime_data) + len(self.agency_data)) as stage:
+                if self.protime_data.empty or self.agency_data.empty:
+                    raise Exception("One or both of the DataFrames are empty. Cannot proceed with merging.")
+                self.report_progress('process', 0, PROCESS_STEPS)
+                merged_df = self.compare_frames()
+
+                # Apply threshold and append the totals row
+                self.check_cancelled()
+                self.report_progress('process', 3, PROCESS_STEPS)
+                with self.metrics.stage('filter_differences', rows_in=len(merged_df)) as filter_stage:
+                    self.set_differences(merged_df)
+                    filter_stage['rows_out'] = len(self.differences)
+                stage['rows_out'] = len(self.differences)
+                self.report_progress('process', PROCESS_STEPS, PROCESS_STEPS, len(self.differences))
+            print(f"Model: Data processing completed with {len(self.differences)} records (including totals)")
+            return True
+        except Exception as e:
+            print(f"Model: Error processing data - {e}")
+            raise e
 
-            # Normalize names in both datasets
-            self.protime_data['Normalized Name'] = self.protime_data['Full Name'].apply(self.normalize_name)
-            self.agency_data['Normalized Name'] = self.agency_data['Name'].apply(self.normalize_name)
+    def compare_frames(self, partition=False):
+        """
+        Normalize, aggregate and compare the cleaned protime_data and agency_data and return the
+        unfiltered comparison. With partition the frames hold a single week partition: either side
+        may be empty and the checks and progress of the whole week range are left to the caller.
+        """
+        # Normalize names in both datasets (each distinct name is normalized once),
+        # as categoricals sharing one name dictionary so groupby and merge compare codes
+        with self.metrics.stage('normalize_names'):
+            protime_names = normalize_categories(self.protime_data['Full Name'])
+            agency_names = normalize_categories(self.agency_data['Name'])
+            if self.aliases is not None:
+                # Known aliases become their worker ID, looked up once per distinct name
+                protime_names = self.aliases.resolve(protime_names, 'protime')
+                agency_names = self.aliases.resolve(agency_names, 'agency')
+            protime_names, agency_names = shared_categories(protime_names, agency_names)
+            self.protime_data['Normalized Name'] = protime_names
+            self.agency_data['Normalized Name'] = agency_names
 
-            # Remove entries with empty 'Normalized Name'
-            self.protime_data = self.protime_data[self.protime_data['Normalized Name'] != '']
-            self.agency_data = self.agency_data[self.agency_data['Normalized Name'] != '']
+        # Remove entries with empty 'Normalized Name'
+        self.protime_data = select_rows(self.protime_data, (protime_names != '').to_numpy())
+        self.agency_data = select_rows(self.agency_data, (agency_names != '').to_numpy())
+        self.check_cancelled()
+        if not partition:
+            self.report_progress('process', 1, PROCESS_STEPS)
 
             # Check if the week range exists in both datasets
             protime_weeks = set(self.protime_data['Week'].unique())
             agency_weeks = set(self.agency_data['Week'].unique())
             common_weeks = protime_weeks.intersection(agency_weeks)
+            min_protime_week = self.protime_data['Week'].min()
+            max_protime_week = self.protime_data['Week'].max()
+            min_agency_week = self.agency_data['Week'].min()
+            max_agency_week = self.agency_data['Week'].max()
 
             # If no common weeks exist, inform the user and display week ranges from both datasets
             if not common_weeks:
-                min_protime_week = self.protime_data['Week'].min()
-                max_protime_week = self.protime_data['Week'].max()
-                min_agency_week = self.agency_data['Week'].min()
-                max_agency_week = self.agency_data['Week'].max()
                 raise Exception(
                     f"No matching weeks found between datasets. "
                     f"Protime weeks range from {min_protime_week} to {max_protime_week}, "
@@ -228,84 +1020,441 @@ class DataModel:
                     f"Please check your week selection."
                 )
 
-            # Filter the data to include only matching weeks in the selected range
-            protime_agg = self.protime_data[self.protime_data['Week'].between(self.start_week, self.end_week)]
-            agency_agg = self.agency_data[self.agency_data['Week'].between(self.start_week, self.end_week)]
-
-            if protime_agg.empty or agency_agg.empty:
+        # Take only the compared columns of the matching weeks in the selected range,
+        # grouped by agency too in multi-agency mode and with the date for the day grain
+        daily = self.grain == 'day'
+        keys = AGENCY_KEYS if self.agency_paths else KEYS
+        extra_columns = ['Date'] if daily else []
+        protime_columns = (['Temp Agency'] if self.agency_paths else []) + KEYS + extra_columns
+        protime_mask = self.protime_data['Week'].between(self.start_week, self.end_week).to_numpy()
+        agency_mask = self.agency_data['Week'].between(self.start_week, self.end_week).to_numpy()
+        if daily:
+            protime_dated = self.protime_data['Date'].notna().to_numpy()
+            agency_dated = self.agency_data['Date'].notna().to_numpy()
+            if not partition and (not protime_dated.any() or not agency_dated.any()):
                 raise Exception(
-                    "No data available for the selected week range. "
-                    f"Please select a range between Protime weeks {min_protime_week}-{max_protime_week} and "
-                    f"Agency weeks {min_agency_week}-{max_agency_week}."
+                    "The day comparison needs dates: a 'Date' column in the Protime workbooks "
+                    "and a 'Datum' column in the agency workbooks."
                 )
+            undated = (protime_mask & ~protime_dated).sum() + (agency_mask & ~agency_dated).sum()
+            if undated:
+                print(f"Model: Skipping {undated} rows without a date")
+            protime_mask &= protime_dated
+            agency_mask &= agency_dated
+        protime_agg = self.protime_data.loc[protime_mask, protime_columns + ['Protime Hours', 'Protime Invoice']]
+        protime_agg.columns = keys + extra_columns + ['Protime Hours', 'Protime Invoice']
+        agency_agg = self.agency_data.loc[agency_mask, keys + extra_columns + ['Agency Hours', 'Agency Invoice']]
 
-            # Proceed with aggregation and comparison
-            protime_agg = protime_agg.groupby(['Week', 'Normalized Name'], as_index=False).agg({
-                'Protime Hours': 'sum',
-                'Protime Invoice': 'sum'
-            })
-
-            agency_agg = agency_agg.groupby(['Week', 'Normalized Name'], as_index=False).agg({
-                'Agency Hours': 'sum',
-                'Agency Invoice': 'sum'
-            })
-
-            # Merge the aggregated DataFrames
-            merged_df = pd.merge(
-                protime_agg,
-                agency_agg,
-                how='outer',
-                on=['Week', 'Normalized Name'],
-                suffixes=('_Protime', '_Agency')
+        if not partition and (protime_agg.empty or agency_agg.empty):
+            raise Exception(
+                "No data available for the selected week range. "
+                f"Please select a range between Protime weeks {min_protime_week}-{max_protime_week} and "
+                f"Agency weeks {min_agency_week}-{max_agency_week}."
             )
 
-            # Calculate the differences
-            merged_df['Hours Difference'] = merged_df['Protime Hours'] - merged_df['Agency Hours']
-            merged_df['Difference in Minutes'] = abs(merged_df['Hours Difference']) * 60
-            merged_df['Invoice Difference'] = merged_df['Protime Invoice'] - merged_df['Agency Invoice']
-            merged_df['Overpay Request'] = np.where((merged_df['Protime Invoice'] - merged_df['Agency Invoice']) < 0, merged_df['Protime Invoice'] - merged_df['Agency Invoice'], 0)
-            merged_df['GXO Overpays'] = np.where((merged_df['Protime Invoice'] - merged_df['Agency Invoice']) > 0, merged_df['Protime Invoice'] - merged_df['Agency Invoice'], 0)
-            # Apply threshold if it is set
-            conditions = pd.Series(True, index=merged_df.index)
-            if self.threshold_minutes is not None and self.threshold_minutes > 0:
-                conditions &= (merged_df['Difference in Minutes'] > self.threshold_minutes)
-            diff_df = merged_df[conditions]
-
-            # **Add Totals Row**
-            totals = diff_df[['Protime Hours', 'Agency Hours',
-                              'Protime Invoice', 'Agency Invoice',
-                              'Hours Difference', 'Difference in Minutes', 'Invoice Difference', 'Overpay Request', 'GXO Overpays']].sum(numeric_only=True)
-            totals_row = pd.DataFrame({
-                'Week': ['Total'],
-                'Normalized Name': [''],
-                'Protime Hours': [totals['Protime Hours']],
-                'Agency Hours': [totals['Agency Hours']],
-                'Protime Invoice': [totals['Protime Invoice']],
-                'Agency Invoice': [totals['Agency Invoice']],
-                'Hours Difference': [totals['Hours Difference']],
-                'Difference in Minutes': [totals['Difference in Minutes']],
-                'Invoice Difference': [totals['Invoice Difference']],
-                'Overpay Request': [totals['Overpay Request']],
-                'GXO Overpays': [totals['GXO Overpays']]
-
-            })
-
-            # Append the totals row to the DataFrame
-            self.differences = pd.concat([diff_df, totals_row], ignore_index=True)
+        # Proceed with aggregation and comparison
+        self.check_cancelled()
+        if not partition:
+            self.report_progress('process', 2, PROCESS_STEPS)
+        if self.agency_paths:
+            protime_agg['Agency'], agency_agg['Agency'] = shared_categories(
+                protime_agg['Agency'], agency_agg['Agency'])
+        if daily:
+            # Both sides are sorted once on an integer (agency, date, name) key, summed and joined linearly
+            with self.metrics.stage('sort_merge', rows_in=len(protime_agg) + len(agency_agg)) as compare_stage:
+                merged_df = compare_daily(protime_agg, agency_agg, by_agency=bool(self.agency_paths))
+                if self.match_threshold is not None:
+                    merged_df = match_names(merged_df, self.match_threshold, by='Date')
+                merged_df = add_differences(merged_df)
+                compare_stage['rows_out'] = len(merged_df)
+        elif self.compare_workers > 1 and len(protime_agg) + len(agency_agg) >= PARALLEL_MIN_ROWS:
+            # Partitions are aggregated and merged in worker processes; fuzzy matching needs every
+            # partition, so it runs afterwards and the differences are added after it
+            with self.metrics.stage('parallel_compare', rows_in=len(protime_agg) + len(agency_agg)) as compare_stage:
+                compare_stage['workers'] = self.compare_workers
+                merged_df = parallel_compare(protime_agg, agency_agg, keys, self.compare_workers,
+                                             differences=self.match_threshold is None, check=self.check_cancelled)
+                if self.match_threshold is not None:
+                    merged_df = add_differences(match_names(merged_df, self.match_threshold))
+                compare_stage['rows_out'] = len(merged_df)
+        else:
+            with self.metrics.stage('aggregate', rows_in=len(protime_agg) + len(agency_agg)) as aggregate_stage:
+                protime_agg = aggregate_protime(protime_agg, keys)
+                agency_agg = aggregate_agency(agency_agg, keys)
+                aggregate_stage['rows_out'] = len(protime_agg) + len(agency_agg)
+            with self.metrics.stage('compare', rows_in=len(protime_agg) + len(agency_agg)) as compare_stage:
+                merged_df = compare_aggregates(protime_agg, agency_agg, self.match_threshold, keys)
+                compare_stage['rows_out'] = len(merged_df)
+        return merged_df
+
+    def set_differences(self, merged_df):
+        """
+        Apply the minutes threshold, the name filter and the totals row to a comparison.
+        In multi-agency mode the comparison is also split into one report per agency and summarized.
+        The unfiltered comparison is kept as a ResultSet for requery() and appended to the archive, if set.
+        Fuzzy matches scoring at least alias_min_score are stored as aliases.
+        """
+        if self.aliases is not None and self.alias_min_score is not None:
+            with self.metrics.stage('learn_aliases') as stage:
+                stage['aliases'] = self.aliases.learn(merged_df, self.alias_min_score)
+        self.results = ResultSet(merged_df, self.start_week, self.end_week)
+        self.results_settings = self.loaded_settings
+        if self.archive is not None:
+            with self.metrics.stage('archive', rows_in=len(merged_df)) as stage:
+                stage['run_id'] = self.archive.append(
+                    merged_df, self.agency_folders(), self.path_protime, self.start_week, self.end_week,
+                    self.grain, self.match_threshold, agency=self.agency_name
+                )
+        if self.name_filter:
+            self.apply_results(*self.results.select(self.threshold_minutes, name_filter=self.name_filter))
+            return
+        self.differences = filter_differences(merged_df, self.threshold_minutes)
+        if self.agency_paths:
+            self.agency_reports = split_agencies(merged_df, list(self.agency_paths), self.threshold_minutes)
+            self.summary = summarize_agencies(self.agency_reports)
+        else:
+            self.agency_reports = {}
+            self.summary = pd.DataFrame()
+
+    def apply_results(self, positions, totals):
+        """
+        Set the differences (and agency reports) to the given rows of the result set and their totals.
+        """
+        self.differences = self.results.query_rows(positions, totals)
+        if self.agency_paths:
+            rows = self.differences.iloc[:-1]
+            self.agency_reports = split_agencies(rows, list(self.agency_paths))
+            self.summary = summarize_agencies(self.agency_reports)
+        else:
+            self.agency_reports = {}
+            self.summary = pd.DataFrame()
+
+    def can_requery(self):
+        """
+        True if the last comparison can answer the current settings: only the minutes threshold,
+        the name filter or a week range within the compared one changed, and no workbook changed.
+        """
+        if self.results is None or self.results_settings is None:
+            return False
+        if not self.results.covers(self.start_week, self.end_week):
+            return False
+        try:
+            return self.source_settings(*self.list_sources()) == self.results_settings
+        except (OSError, ValueError):
+            return False
+
+    def requery(self):
+        """
+        Apply the current threshold, week range and name filter to the last comparison
+        without loading or comparing again.
+        """
+        try:
+            if self.results is None:
+                raise ValueError("There is no comparison to filter yet. Please run a comparison first.")
+            if not self.results.covers(self.start_week, self.end_week):
+                raise ValueError(
+                    f"Weeks {self.start_week} to {self.end_week} are outside the compared range "
+                    f"{self.results.start_week} to {self.results.end_week}. Please run the comparison again."
+                )
+            self.start_metrics()
+            print("Model: Filtering the last comparison")
+            with self.metrics.stage('requery', rows_in=len(self.results)) as stage:
+                self.apply_results(*self.results.select(
+                    self.threshold_minutes, self.start_week, self.end_week, self.name_filter))
+                stage['rows_out'] = len(self.differences)
+            print(f"Model: Data processing completed with {len(self.differences)} records (including totals)")
+            return True
+        except Exception as e:
+            print(f"Model: Error filtering data - {e}")
+            raise e
+
+    def process_incremental(self):
+        """
+        Reconcile the selected week range using the aggregate store:
+        - Reading only workbooks that were added or changed since the last run.
+        - Forgetting workbooks that were removed.
+        - Comparing again only the weeks those workbooks touch; other weeks come from the store.
+        - Applying thresholds and the totals row like process_data.
+        In multi-agency mode Protime workbooks are still read once; each agency is compared
+        against its own 'Temp Agency' rows from the store.
+        """
+        try:
+            self.start_metrics()
+            print("Model: Processing data incrementally")
+            self.loaded_settings = self.source_settings(*self.list_sources())
+            agency_folders = {agency: os.path.abspath(path) for agency, path in self.agency_folders().items()}
+            protime_folder = os.path.abspath(self.path_protime)
+            # One entry per scanned folder: (source, folder, workbooks)
+            sources = [
+                ('agency', folder, [
+                    os.path.abspath(f) for f in self.list_workbooks(
+                        folder, f"Agency {agency}" if self.agency_paths else 'Agency')
+                ])
+                for agency, folder in agency_folders.items()
+            ]
+            sources.append(('protime', protime_folder, [
+                os.path.abspath(f) for f in self.list_workbooks(self.path_protime, 'Protime')
+            ]))
+
+            # Find out which workbooks changed and which weeks they touch
+            dirty_weeks = set()
+            fingerprints = {}
+            changed = {'agency': [], 'protime': []}
+            with self.metrics.stage('fingerprint_workbooks') as stage:
+                for kind, folder, paths in sources:
+                    fingerprints.update({(kind, path): file_fingerprint(path) for path in paths})
+                    stale, removed = self.store.stale_files(
+                        kind, folder, {path: fingerprints[(kind, path)] for path in paths})
+                    changed[kind] += [(folder, path) for path in stale]
+                    for path in removed:
+                        dirty_weeks |= self.store.remove_file(kind, path)
+                stage['files'] = len(fingerprints)
+            print(f"Model: {len(changed['agency'])} agency and {len(changed['protime'])} protime workbooks changed")
+
+            agency_dfs, protime_dfs = self.read_workbooks(
+                [path for _, path in changed['agency']], [path for _, path in changed['protime']])
+            with self.metrics.stage('update_store') as stage:
+                for kind, dfs in (('agency', agency_dfs), ('protime', protime_dfs)):
+                    for (folder, path), df in zip(changed[kind], dfs):
+                        dirty_weeks |= self.store.replace_file(
+                            kind, folder, path, fingerprints[(kind, path)], aggregate_workbook(kind, df)
+                        )
+                self.store.invalidate(dirty_weeks)
+                stage['dirty_weeks'] = sorted(int(week) for week in dirty_weeks)
+
+            weeks = range(self.start_week, self.end_week + 1)
+            merged_dfs = []
+            with self.metrics.stage('compare') as stage:
+                stage['weeks'] = 0
+                for index, (agency, agency_folder) in enumerate(agency_folders.items()):
+                    self.check_cancelled()
+                    self.report_progress('process', index, len(agency_folders))
+                    # Check if the week range exists in both datasets
+                    protime_weeks = self.store.source_weeks('protime', protime_folder, self.start_week, self.end_week, agency=agency)
+                    agency_weeks = self.store.source_weeks('agency', agency_folder, self.start_week, self.end_week)
+                    if not set(protime_weeks).intersection(agency_weeks):
+                        message = (
+                            "No matching weeks found between datasets for the selected week range. "
+                            f"Protime has weeks {protime_weeks or 'none'} and Agency has weeks {agency_weeks or 'none'}. "
+                            "Please check your week selection."
+                        )
+                        if not self.agency_paths:
+                            raise Exception(message)
+                        print(f"Model: {agency}: {message}")
+
+                    # Compare only the weeks without stored results
+                    aliases = self.aliases.revision() if self.aliases is not None else None
+                    settings = f"{agency_folder}|{protime_folder}|{agency}|{self.match_threshold}|{aliases}"
+                    missing_weeks = self.store.missing_weeks(settings, weeks)
+                    print(f"Model: Comparing {len(missing_weeks)} of {len(weeks)} weeks for {agency}")
+                    if missing_weeks:
+                        protime_agg = self.store.weekly_aggregates('protime', protime_folder, missing_weeks, agency=agency).rename(
+                            columns={'Hours': 'Protime Hours', 'Invoice': 'Protime Invoice'})
+                        agency_agg = self.store.weekly_aggregates('agency', agency_folder, missing_weeks).rename(
+                            columns={'Hours': 'Agency Hours', 'Invoice': 'Agency Invoice'})
+                        if self.aliases is not None:
+                            protime_agg = self.resolve_aggregates(protime_agg, 'protime')
+                            agency_agg = self.resolve_aggregates(agency_agg, 'agency')
+                        merged_df = compare_aggregates(protime_agg, agency_agg, self.match_threshold)
+                        self.store.store_results(settings, missing_weeks, merged_df)
+                    stage['weeks'] += len(missing_weeks)
+
+                    merged_df = self.store.load_results(settings, self.start_week, self.end_week)
+                    if self.agency_paths:
+                        merged_df.insert(0, 'Agency', agency)
+                    merged_dfs.append(merged_df)
+
+                merged_df = pd.concat([df for df in merged_dfs if not df.empty] or merged_dfs[:1], ignore_index=True)
+                if self.match_threshold is None:
+                    merged_df = merged_df.drop(columns=['Matched Name', 'Match Score'])
+                merged_df = add_differences(merged_df)
+                stage['rows_out'] = len(merged_df)
+
+            # Apply threshold and append the totals row
+            with self.metrics.stage('filter_differences', rows_in=len(merged_df)) as stage:
+                self.set_differences(merged_df)
+                stage['rows_out'] = len(self.differences)
+            self.report_progress('process', len(agency_folders), len(agency_folders), len(self.differences))
             print(f"Model: Data processing completed with {len(self.differences)} records (including totals)")
             return True
         except Exception as e:
             print(f"Model: Error processing data - {e}")
             raise e
 
+    def resolve_aggregates(self, df, source):
+        """
+        Resolve the names of stored weekly aggregates through the alias table and sum the names that
+        resolve to the same worker ID again.
+        """
+        names = self.aliases.resolve(df['Normalized Name'].astype('category'), source)
+        df = df.assign(**{'Normalized Name': names.astype(object)})
+        return df.groupby(KEYS, as_index=False, observed=True, sort=True).sum()
+
+    def run(self):
+        """
+        Load and process the data, incrementally when an aggregate store is set.
+        """
+        if self.store is not None and self.grain == 'day':
+            print("Model: The aggregate store keeps weekly totals, comparing days without it")
+        elif self.store is not None:
+            return self.process_incremental()
+        self.load_data()
+        return self.process_data()
+
+    def run_partitioned(self, output_path):
+        """
+        Compare out of core and save the report to output_path, for week ranges too large for memory:
+        - Every workbook is pruned and written to on-disk week partitions as soon as it is parsed.
+        - Each week is then read back, compared like process_data and filtered.
+        - Its rows are streamed to the report writer (one per agency in multi-agency mode),
+          with running totals for the totals row and the agency summary.
+        Peak memory follows the largest workbook and week instead of the whole range.
+        The rows are not kept, so requery() needs a new run; the archive receives every week.
+        """
+        try:
+            self.start_metrics()
+            print("Model: Processing data out of core")
+            agency_files, protime_files = self.list_sources()
+            self.results = None
+            self.results_settings = None
+            with WeekPartitions(self.partition_dir) as partitions:
+                # Workbooks arrive in listing order, so each agency workbook is tagged with its agency
+                agency_of = iter([agency for agency, files in agency_files.items() for _ in files])
+
+                def partition(df, kind):
+                    df = self.prune_frame(df, kind)
+                    if kind == 'agency' and self.agency_paths:
+                        df = df.copy(deep=False)
+                        df['Agency'] = pd.Categorical([next(agency_of)] * len(df), categories=sorted(agency_files))
+                    partitions.add(kind, df)
+                    return df.iloc[:0]
+
+                with self.metrics.stage('partition_workbooks') as stage:
+                    self.read_workbooks(sum(agency_files.values(), []), protime_files, prune=partition)
+                    stage['rows_out'] = partitions.rows
+                print(f"Model: {partitions.rows} rows written to week partitions in {partitions.folder}")
+
+                protime_weeks = partitions.weeks('protime')
+                agency_weeks = partitions.weeks('agency')
+                if not set(protime_weeks).intersection(agency_weeks):
+                    raise Exception(
+                        "No matching weeks found between datasets for the selected week range. "
+                        f"Protime has weeks {protime_weeks or 'none'} and Agency has weeks {agency_weeks or 'none'}. "
+                        "Please check your week selection."
+                    )
+                weeks = sorted(set(protime_weeks) | set(agency_weeks))
+                with self.metrics.stage('compare_partitions', rows_in=partitions.rows) as stage:
+                    reports = self.compare_partitions(partitions, weeks, output_path)
+                    stage['weeks'] = len(weeks)
+                    stage['rows_out'] = sum(rows for rows, _ in reports.values())
+
+            if self.agency_paths:
+                self.summary = agency_summary(reports)
+                write_report(output_path, self.summary)
+                rows, totals = sum(rows for rows, _ in reports.values()), self.summary.iloc[-1][TOTAL_COLUMNS]
+            else:
+                self.summary = pd.DataFrame()
+                rows, totals = reports['']
+            # Only the totals row stays in memory
+            self.differences = totals_row(totals)
+            self.agency_reports = {}
+            print(f"Model: Data processing completed with {rows + 1} records (including totals)")
+            log_path = self.metrics.write(os.path.splitext(output_path)[0])
+            print(self.metrics.summary())
+            print(f"Model: Run log saved to {log_path}")
+            return True
+        except Exception as e:
+            print(f"Model: Error processing data - {e}")
+            raise e
+
+    def compare_partitions(self, partitions, weeks, output_path):
+        """
+        Compare the partitions week by week and stream the rows passing the threshold and name filter
+        to the report (or to one report per agency). Returns {agency or '': (rows, totals)}.
+        """
+        agencies = list(self.agency_paths) or ['']
+        totals = {agency: np.zeros(len(TOTAL_COLUMNS)) for agency in agencies}
+        writers = {}
+        run_id = None
+        if self.archive is not None:
+            run_id = self.archive.start_run(self.agency_folders(), self.path_protime, self.start_week,
+                                            self.end_week, self.grain, self.match_threshold)
+        columns = None
+        try:
+            for index, week in enumerate(weeks):
+                self.check_cancelled()
+                self.report_progress('process', index, len(weeks), sum(writer.rows for writer in writers.values()))
+                with self.metrics.stage('compare_week') as stage:
+                    stage['week'] = week
+                    self.protime_data = concat_frames(partitions.frames('protime', week))
+                    self.agency_data = concat_frames(partitions.frames('agency', week))
+                    stage['rows_in'] = len(self.protime_data) + len(self.agency_data)
+                    merged_df = self.compare_frames(partition=True)
+                    stage['rows_out'] = len(merged_df)
+                if self.aliases is not None and self.alias_min_score is not None:
+                    self.aliases.learn(merged_df, self.alias_min_score)
+                if run_id is not None:
+                    self.archive.append_rows(run_id, merged_df, self.agency_name)
+
+                rows = merged_df
+                if self.threshold_minutes is not None and self.threshold_minutes > 0:
+                    rows = rows[rows['Difference in Minutes'] > self.threshold_minutes]
+                if self.name_filter:
+                    names = rows['Normalized Name'].astype(str)
+                    rows = rows[names.str.contains(self.name_filter.lower(), regex=False).to_numpy()]
+                if columns is None:
+                    columns = [column for column in merged_df.columns if column != 'Agency']
+                groups = rows.groupby('Agency', sort=False, observed=True) if self.agency_paths else [('', rows)]
+                for agency, group in groups:
+                    if group.empty:
+                        continue
+                    if agency not in writers:
+                        writers[agency] = self.open_partition_writer(output_path, agency, columns)
+                    writers[agency].write_chunk(group)
+                    totals[agency] += group[TOTAL_COLUMNS].sum(numeric_only=True).to_numpy()
+            self.report_progress('process', len(weeks), len(weeks), sum(writer.rows for writer in writers.values()))
+
+            reports = {}
+            for agency in agencies:
+                if agency not in writers:
+                    writers[agency] = self.open_partition_writer(output_path, agency, columns)
+                sums = dict(zip(TOTAL_COLUMNS, totals[agency].tolist()))
+                reports[agency] = (writers[agency].rows, sums)
+                writers[agency].write_totals(totals_row(sums).reindex(columns=columns))
+            return reports
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+    def open_partition_writer(self, output_path, agency, columns):
+        path = agency_report_path(output_path, agency) if agency else output_path
+        print(f"Model: Saving {f'{agency} report' if agency else 'report'} to {path}")
+        writer = report_writer(path, columns)
+        writer.open()
+        return writer
+
     def save_report(self, output_path):
         """
-        Save the report to the specified output path.
+        Save the report to the specified output path as .xlsx, .csv or .parquet.
+        In multi-agency mode the path gets the combined summary and every agency gets <report>_<agency>.
+        The run log (stage and workbook timings) is written next to it as <report>.run.json.
         """
         try:
             print(f"Model: Saving report to {output_path}")
-            self.differences.to_excel(output_path, index=False)
+            with self.metrics.stage('save_report', rows_in=len(self.differences)) as stage:
+                if self.agency_paths:
+                    # The summary goes to output_path, each agency to <report>_<agency> next to it
+                    stage['rows_out'] = write_report(output_path, self.summary)
+                    for agency, report in self.agency_reports.items():
+                        agency_path = agency_report_path(output_path, agency)
+                        print(f"Model: Saving {agency} report to {agency_path}")
+                        stage['rows_out'] += write_report(agency_path, report)
+                else:
+                    stage['rows_out'] = write_report(output_path, self.differences)
             print("Model: Report saved successfully")
+            log_path = self.metrics.write(os.path.splitext(output_path)[0])
+            print(self.metrics.summary())
+            print(f"Model: Run log saved to {log_path}")
         except Exception as e:
             print(f"Model: Error saving report - {e}")
             raise e
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+
+def map_unique(values, func):
+    """
+    Apply func once per distinct value of the Series and broadcast the results back.
+    Missing values are passed to func as well.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    results = np.empty(len(uniques), dtype=object)
+    results[:] = [func(value) for value in uniques]
+    return pd.Series(results[codes], index=values.index, dtype=object)
+
+
+def normalize_names(values):
+    """
+    Vectorized equivalent of DataModel.normalize_name for a whole Series.
+    Each distinct raw name is normalized once with pandas string operations:
+    lowercase, hyphens to spaces, collapsed whitespace and only the first and last part kept.
+    Values that are not strings become an empty string.
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    uniques = pd.Series(uniques, dtype=object)
+    is_text = np.fromiter((isinstance(value, str) for value in uniques), dtype=bool, count=len(uniques))
+
+    parts = uniques[is_text].str.lower().str.replace('-', ' ', regex=False).str.split()
+    count = parts.str.len().to_numpy()
+    first = parts.str[0].fillna('')
+    last = parts.str[-1].fillna('')
+    normalized = np.full(len(uniques), '', dtype=object)
+    normalized[is_text] = np.where(count >= 2, first + ' ' + last, first)
+    return pd.Series(normalized[codes], index=values.index, dtype=object)
+
+
+def normalize_name(name):
+    """
+    Normalize a single name, such as one typed on the command line, the way the comparison does.
+    """
+    return normalize_names(pd.Series([name], dtype=object)).iloc[0]
+
+
+def normalize_categories(values):
+    """
+    normalize_names for a categorical Series: only the categories are normalized and the codes
+    are remapped, so the result is a categorical with sorted normalized names as its categories.
+    Missing values become an empty string.
+    """
+    # The extra '' at the end is picked by code -1 (missing values)
+    normalized = np.append(normalize_names(pd.Series(values.cat.categories, dtype=object)).to_numpy(), '')
+    codes, categories = pd.factorize(normalized, sort=True)
+    return pd.Series(
+        pd.Categorical.from_codes(codes[values.cat.codes.to_numpy()], categories=categories),
+        index=values.index
+    )
+
+
+def shared_categories(*columns):
+    """
+    Recode categorical Series onto one sorted dictionary, so groupby and merge compare codes
+    across sources and still order keys like plain strings.
+    """
+    categories = columns[0].cat.categories
+    for column in columns[1:]:
+        categories = categories.union(column.cat.categories)
+    return [column.cat.set_categories(categories.sort_values()) for column in columns]
+
+
+def alias_categories(values, mapping):
+    """
+    Replace the categories of a categorical Series found in mapping by their mapped value and
+    remap the codes; categories that end up equal are merged. The result has sorted categories.
+    """
+    categories = values.cat.categories
+    mapped = np.fromiter((mapping.get(name, name) for name in categories), dtype=object, count=len(categories))
+    # The extra '' at the end is picked by code -1 (missing values)
+    codes, merged = pd.factorize(np.append(mapped, ''), sort=True)
+    return pd.Series(
+        pd.Categorical.from_codes(codes[values.cat.codes.to_numpy()], categories=merged),
+        index=values.index
+    )
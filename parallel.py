@@ -0,0 +1,158 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Below this many input rows the pool costs more than it saves and the comparison stays serial
+PARALLEL_MIN_ROWS = 1_000_000
+
+
+def key_values(column):
+    """
+    Return the values of a column as a plain numpy array: the codes of a categorical, the values otherwise.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy()
+    return column.to_numpy()
+
+
+def share_columns(df, order):
+    """
+    Copy every column of df, with its rows in the given order, into its own shared memory block.
+    Returns the blocks (closed and unlinked by the caller) and the specs workers attach with.
+    """
+    blocks, specs = [], []
+    try:
+        for column in df.columns:
+            values = key_values(df[column])[order]
+            block = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+            specs.append((column, block.name, values.dtype.str, len(values)))
+    except Exception:
+        release(blocks)
+        raise
+    return blocks, specs
+
+
+def release(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def attach(name):
+    """
+    Open a shared memory block created by the parent, which also unlinks it.
+    Pool workers share the parent's resource tracker, so attaching does not register the block twice.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+def read_shared(specs, start, stop):
+    """
+    Copy rows start:stop of the shared columns into a frame.
+    """
+    columns = {}
+    for column, name, dtype, length in specs:
+        block = attach(name)
+        try:
+            columns[column] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)[start:stop].copy()
+        finally:
+            block.close()
+    return pd.DataFrame(columns)
+
+
+def compare_partition(task):
+    """
+    Aggregate and outer-merge one partition of both sides, on the integer codes of the key columns.
+    Kept at module level so it can be sent to worker processes.
+    """
+    # Imported here: the model imports this module
+    from model import aggregate_protime, aggregate_agency, add_differences
+
+    protime_specs, protime_range, agency_specs, agency_range, keys, differences = task
+    merged_df = pd.merge(
+        aggregate_protime(read_shared(protime_specs, *protime_range), keys),
+        aggregate_agency(read_shared(agency_specs, *agency_range), keys),
+        how='outer',
+        on=keys,
+        suffixes=('_Protime', '_Agency')
+    )
+    return add_differences(merged_df) if differences else merged_df
+
+
+def assign_partitions(protime_df, agency_df, partitions):
+    """
+    Return the partition of every row of both sides. Whole weeks are spread over the partitions,
+    largest first, when there are at least as many weeks as partitions; otherwise rows are
+    spread by the code of their name. Rows of one key always land in the same partition.
+    """
+    weeks = pd.concat([protime_df['Week'], agency_df['Week']], ignore_index=True).value_counts()
+    if len(weeks) >= partitions:
+        loads = np.zeros(partitions)
+        assigned = {}
+        for week, rows in sorted(weeks.items(), key=lambda item: (-item[1], item[0])):
+            assigned[week] = int(np.argmin(loads))
+            loads[assigned[week]] += rows
+        return [df['Week'].map(assigned).to_numpy(dtype=np.int64) for df in (protime_df, agency_df)]
+    return [key_values(df['Normalized Name']).astype(np.int64) % partitions for df in (protime_df, agency_df)]
+
+
+def parallel_compare(protime_df, agency_df, keys, workers, differences=True, check=None):
+    """
+    Parallel equivalent of aggregating both sides and outer-merging them on keys (with the
+    difference columns when differences is set): both sides are partitioned by week (or name),
+    copied once into shared memory, and every partition is aggregated and merged in a worker.
+    The partitions are concatenated and sorted on the keys, so the result matches the serial
+    path row for row. Key columns that are categoricals must share their categories across the sides.
+    check() is called while waiting for the workers, e.g. to cancel.
+    """
+    categories = {
+        key: protime_df[key].dtype for key in keys if isinstance(protime_df[key].dtype, pd.CategoricalDtype)
+    }
+    protime_parts, agency_parts = assign_partitions(protime_df, agency_df, workers)
+    blocks = []
+    try:
+        tasks = []
+        shared = []
+        for df, parts in ((protime_df, protime_parts), (agency_df, agency_parts)):
+            order = np.argsort(parts, kind='stable')
+            side_blocks, specs = share_columns(df, order)
+            blocks += side_blocks
+            bounds = np.searchsorted(parts[order], np.arange(workers + 1))
+            shared.append((specs, bounds))
+        (protime_specs, protime_bounds), (agency_specs, agency_bounds) = shared
+        for part in range(workers):
+            protime_range = (int(protime_bounds[part]), int(protime_bounds[part + 1]))
+            agency_range = (int(agency_bounds[part]), int(agency_bounds[part + 1]))
+            if protime_range[0] < protime_range[1] or agency_range[0] < agency_range[1]:
+                tasks.append((protime_specs, protime_range, agency_specs, agency_range, keys, differences))
+
+        pool = ProcessPoolExecutor(max_workers=max(1, min(workers, len(tasks))))
+        finished = False
+        try:
+            futures = [pool.submit(compare_partition, task) for task in tasks]
+            pending = set(futures)
+            while pending:
+                if check is not None:
+                    check()
+                _, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            results = [future.result() for future in futures]
+            finished = True
+        finally:
+            # After an error or cancel do not wait for the partitions still being compared
+            pool.shutdown(wait=finished, cancel_futures=True)
+    finally:
+        release(blocks)
+
+    merged_df = pd.concat(results, ignore_index=True)
+    order = np.lexsort([merged_df[key].to_numpy() for key in reversed(keys)])
+    merged_df = merged_df.take(order).reset_index(drop=True)
+    for key, dtype in categories.items():
+        merged_df[key] = pd.Categorical.from_codes(merged_df[key].to_numpy(), dtype=dtype)
+    return merged_df
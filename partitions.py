@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+
+class WeekPartitions:
+    def __init__(self, folder=None):
+        """
+        Prepared rows of both sources written to disk as one parquet file per workbook and week,
+        so a comparison can read back a single week at a time instead of every row.
+        The files live in a new temporary folder (inside folder, if given) that close() removes.
+        """
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.folder = tempfile.mkdtemp(prefix='partitions-', dir=folder or None)
+        self.files = {'agency': {}, 'protime': {}}  # {kind: {week: [parquet files]}}
+        self.empty = {}  # {kind: frame without rows}, with the columns and types of the source
+        self.rows = 0
+
+    def add(self, kind, df):
+        """
+        Write the rows of a prepared (and pruned) workbook frame to the partitions of their weeks.
+        """
+        self.empty.setdefault(kind, df.iloc[:0])
+        categorical = [column for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)]
+        for week, part in df.groupby('Week', sort=True, observed=True):
+            # Keep only the names of this week, so a week does not carry the dictionary of the whole workbook
+            part = part.assign(**{column: part[column].cat.remove_unused_categories() for column in categorical})
+            files = self.files[kind].setdefault(int(week), [])
+            folder = os.path.join(self.folder, kind, str(int(week)))
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"{len(files)}.parquet")
+            part.to_parquet(path, index=False)
+            files.append(path)
+            self.rows += len(part)
+
+    def weeks(self, kind):
+        """
+        Return the sorted weeks with rows of the source.
+        """
+        return sorted(self.files[kind])
+
+    def frames(self, kind, week):
+        """
+        Read back the frames of one source and week, in the order they were added.
+        A week without rows gives a single empty frame of the source.
+        """
+        files = self.files[kind].get(week)
+        if not files:
+            return [self.empty[kind]] if kind in self.empty else []
+        return [pd.read_parquet(path) for path in files]
+
+    def close(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
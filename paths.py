@@ -0,0 +1,13 @@
+import os
+
+# Folder under the per-user data location shared by the cache, stores and archive
+APP_FOLDER = 'DataCompare'
+
+
+def app_data_path(filename):
+    """
+    Return the per-user location of a file or folder of the application:
+    %LOCALAPPDATA%\\DataCompare on Windows, ~/.cache/DataCompare elsewhere.
+    """
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, APP_FOLDER, filename)
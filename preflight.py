@@ -0,0 +1,186 @@
+import csv
+import os
+import posixpath
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+from readers import csv_format
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+CELL_REFERENCE = re.compile(r'([A-Z]+)(\d+)')
+SOURCE_LABELS = {'agency': 'an agency', 'protime': 'a Protime'}
+
+
+def column_index(reference):
+    """
+    Return the 0-based column of a cell reference like 'C1', or None if it has none.
+    """
+    match = CELL_REFERENCE.match(reference or '')
+    if not match:
+        return None
+    index = 0
+    for letter in match.group(1):
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def first_sheet_path(archive):
+    """
+    Return the path inside the archive of the first worksheet, the one read_xlsx_columns reads.
+    """
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    sheet = workbook.find(f'{MAIN_NS}sheets/{MAIN_NS}sheet')
+    if sheet is None:
+        raise ValueError("the workbook has no sheets")
+    relations = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in relations.iter(f'{PACKAGE_REL_NS}Relationship')}
+    target = targets[sheet.get(f'{REL_NS}id')]
+    return target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+
+
+def shared_strings(archive, indexes):
+    """
+    Return {index: text} for the given shared string indexes, stopping after the largest one,
+    so a workbook with millions of strings only has its first few parsed.
+    """
+    found = {}
+    if not indexes or 'xl/sharedStrings.xml' not in archive.namelist():
+        return found
+    last = max(indexes)
+    with archive.open('xl/sharedStrings.xml') as fh:
+        index = 0
+        for _, element in ElementTree.iterparse(fh, events=('end',)):
+            if element.tag != f'{MAIN_NS}si':
+                continue
+            if index in indexes:
+                # Rich text keeps its runs in several <t> elements
+                found[index] = ''.join(text.text or '' for text in element.iter(f'{MAIN_NS}t'))
+            element.clear()
+            if index >= last:
+                break
+            index += 1
+    return found
+
+
+def scan_xlsx_header(path):
+    """
+    Read only the header row and the sheet dimension of a workbook's first sheet, straight from
+    the xlsx XML, without loading cell data. Returns {'path', 'columns', 'rows'} where rows is the
+    number of data rows the dimension declares, or None if the sheet does not declare one.
+    Exports often carry a wrong dimension, so rows is an estimate for progress reporting only.
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            sheet_path = first_sheet_path(archive)
+            dimension = None
+            cells = []
+            with archive.open(sheet_path) as fh:
+                position = 0
+                for event, element in ElementTree.iterparse(fh, events=('start', 'end')):
+                    if event == 'start':
+                        if element.tag == f'{MAIN_NS}dimension':
+                            dimension = element.get('ref')
+                        elif element.tag == f'{MAIN_NS}row' and element.get('r', '1') != '1':
+                            break  # The first row is empty, so there is no header
+                        continue
+                    if element.tag == f'{MAIN_NS}c':
+                        index = column_index(element.get('r'))
+                        position = position if index is None else index
+                        kind = element.get('t')
+                        if kind == 'inlineStr':
+                            value = ''.join(text.text or '' for text in element.iter(f'{MAIN_NS}t'))
+                        else:
+                            value = element.findtext(f'{MAIN_NS}v')
+                        cells.append((position, kind, value))
+                        position += 1
+                    elif element.tag == f'{MAIN_NS}row':
+                        break  # Only the first row is needed
+            strings = shared_strings(archive, {int(value) for _, kind, value in cells if kind == 's' and value})
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError, ValueError) as e:
+        raise ValueError(f"{path} is not a readable .xlsx workbook: {e}")
+
+    columns = {}
+    for position, kind, value in cells:
+        if kind == 's' and value:
+            value = strings.get(int(value))
+        if value is not None and value not in columns:
+            columns[value] = position
+    rows = None
+    if dimension and ':' in dimension:
+        last_row = CELL_REFERENCE.match(dimension.split(':')[1])
+        rows = max(int(last_row.group(2)) - 1, 0) if last_row else None
+    return {'path': path, 'columns': list(columns), 'rows': rows}
+
+
+def scan_csv_header(path):
+    """
+    Read only the header line of a CSV export. rows is None, counting the lines would read the whole file.
+    """
+    try:
+        encoding, delimiter, _ = csv_format(path)
+        with open(path, newline='', encoding=encoding) as fh:
+            header = next(csv.reader(fh, delimiter=delimiter), [])
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f"{path} is not a readable .csv file: {e}")
+    return {'path': path, 'columns': list(dict.fromkeys(header)), 'rows': None}
+
+
+def scan_parquet_header(path):
+    """
+    Read only the schema and row count from the footer of a Parquet export.
+    """
+    import pyarrow.parquet as pq
+
+    try:
+        metadata = pq.read_metadata(path)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"{path} is not a readable .parquet file: {e}")
+    return {'path': path, 'columns': list(metadata.schema.to_arrow_schema().names), 'rows': metadata.num_rows}
+
+
+def scan_header(path):
+    """
+    Scan the header of a workbook with the scanner of its file type (.xlsx, .csv or .parquet).
+    Returns {'path', 'columns', 'rows'}; see scan_xlsx_header.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return scan_csv_header(path)
+    if extension == '.parquet':
+        return scan_parquet_header(path)
+    return scan_xlsx_header(path)
+
+
+def detect_kind(columns, required):
+    """
+    Return the source type ('agency' or 'protime') whose required columns are all in the header, or None.
+    """
+    for kind, names in required.items():
+        if set(names) <= set(columns):
+            return kind
+    return None
+
+
+def preflight(jobs, required, workers=None):
+    """
+    Scan the headers of (path, kind) jobs in parallel and check each has the required columns
+    of its source type. Raise a KeyError naming the first offending workbook (in job order)
+    and its missing columns, and the source it looks like when it is the other export.
+    Returns the scanned headers, each with its detected 'kind', in job order.
+    """
+    if not jobs:
+        return []
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        headers = list(pool.map(scan_header, [path for path, _ in jobs]))
+    for (path, kind), header in zip(jobs, headers):
+        header['kind'] = detect_kind(header['columns'], required)
+        missing = [column for column in required[kind] if column not in header['columns']]
+        if missing:
+            hint = f"; it looks like {SOURCE_LABELS[header['kind']]} workbook" if header['kind'] else ''
+            raise KeyError(f"Columns {missing} not found in {path}{hint}")
+    return headers
@@ -0,0 +1,238 @@
+import codecs
+import csv
+import os
+from itertools import islice
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # Optional, .xlsx workbooks are read with openpyxl instead
+    CalamineWorkbook = None
+
+# Rows read between two calls of the check callback
+CHECK_ROWS = 5000
+# File types read as workbooks, with the reader picked by extension
+WORKBOOK_EXTENSIONS = ('.xlsx', '.csv', '.parquet')
+XLSX_ENGINES = ('openpyxl', 'calamine')
+# Bytes of a CSV file used to detect its encoding and delimiter
+CSV_SAMPLE_BYTES = 64 * 1024
+
+
+def locate_columns(header, columns, optional, path):
+    """
+    Return {column: position} of the first header cell of every requested column found.
+    Raise a KeyError naming the file if a column that is not optional is missing.
+    """
+    positions = {}
+    for index, name in enumerate(header):
+        if name in columns and name not in positions:
+            positions[name] = index
+    missing = [column for column in columns if column not in positions and column not in optional]
+    if missing:
+        raise KeyError(f"Columns {missing} not found in {path}")
+    return positions
+
+
+def picked_rows(rows, positions, found, check=None):
+    """
+    Keep the cells of the found columns of every row, calling check every CHECK_ROWS rows.
+    rows must start at the first column of positions' coordinates.
+    """
+    picker = itemgetter(*[positions[column] for column in found])
+    picked = []
+    while True:
+        chunk = [picker(row) for row in islice(rows, CHECK_ROWS)]
+        picked += chunk
+        if len(chunk) < CHECK_ROWS:
+            break
+        if check is not None:
+            check()
+    if len(found) == 1:
+        picked = [(value,) for value in picked]
+    return picked
+
+
+def clean_missing(series):
+    """
+    Turn empty, blank-string and error cells into NaN, as they are with pd.read_excel.
+    """
+    if series.dtype != object:
+        return series
+    missing_values = series.isna() | series.isin(ERROR_CODES + ('',))
+    if missing_values.any():
+        series = series.copy()
+        series[missing_values] = np.nan
+    return series.infer_objects()
+
+
+def columns_frame(data, columns, rows):
+    """
+    Return the requested columns in order, with the ones not found as all-NaN columns.
+    """
+    for column in columns:
+        if column not in data:
+            data[column] = pd.Series(np.nan, index=range(rows), dtype=object)
+    return pd.DataFrame({column: data[column] for column in columns})
+
+
+def rows_frame(picked, found, columns):
+    """
+    Build the frame of read_columns from the picked cell tuples of the found columns.
+    """
+    values = list(zip(*picked)) or [()] * len(found)
+    data = {column: clean_missing(pd.Series(column_values, dtype=object)) for column, column_values in zip(found, values)}
+    return columns_frame(data, columns, len(picked))
+
+
+def read_xlsx_columns(path, columns, optional=(), check=None):
+    """
+    Read only the given columns from the first sheet of a workbook.
+    The header row is used to locate the columns, after which the remaining rows are
+    streamed in read-only mode and only the requested cells are kept.
+    Empty, blank-string and error cells become NaN, as they do with pd.read_excel.
+    Raise a KeyError naming the workbook if a column is missing from the header,
+    unless it is listed in optional; those come back as all-NaN columns.
+    check, if given, is called every CHECK_ROWS rows and may raise to stop reading.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        # Exports often carry a wrong <dimension>, so let the rows decide
+        sheet.reset_dimensions()
+        header = next(sheet.iter_rows(max_row=1, values_only=True), ())
+        positions = locate_columns(header, columns, optional, path)
+        found = [column for column in columns if column in positions]
+
+        first_col = min(positions.values())
+        last_col = max(positions.values())
+        rows = sheet.iter_rows(min_row=2, min_col=first_col + 1, max_col=last_col + 1, values_only=True)
+        picked = picked_rows(rows, {column: positions[column] - first_col for column in found}, found, check)
+    finally:
+        workbook.close()
+    return rows_frame(picked, found, columns)
+
+
+def excel_number(value):
+    """
+    Return a whole float as an int, the way openpyxl reads a number stored without decimals.
+    """
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def read_calamine_columns(path, columns, optional=(), check=None):
+    """
+    read_xlsx_columns with the calamine engine (Rust), which parses the sheet much faster.
+    Calamine reads every number as a float, so columns mixing numbers and text get whole
+    numbers back as ints and dates come back as dates; the prepared frames are the same.
+    """
+    if CalamineWorkbook is None:
+        raise ImportError("The calamine engine needs the python-calamine package (pip install python-calamine).")
+    workbook = CalamineWorkbook.from_path(path)
+    try:
+        # Rows start at the first row of the sheet and at its first used column
+        rows = iter(workbook.get_sheet_by_index(0).iter_rows())
+        header = next(rows, ())
+        positions = locate_columns(header, columns, optional, path)
+        found = [column for column in columns if column in positions]
+        picked = picked_rows(rows, positions, found, check)
+    finally:
+        workbook.close()
+    frame = rows_frame(picked, found, columns)
+    for column in found:
+        if frame[column].dtype == object:
+            frame[column] = frame[column].map(excel_number)
+    return frame
+
+
+def csv_format(path):
+    """
+    Return (encoding, delimiter, decimal) of a CSV export: UTF-8 (with or without BOM) or
+    Windows-1252, and a comma, semicolon or tab delimiter. Semicolon files are the Excel export
+    of locales that write decimals with a comma.
+    """
+    with open(path, 'rb') as fh:
+        sample = fh.read(CSV_SAMPLE_BYTES)
+    try:
+        text = codecs.getincrementaldecoder('utf-8-sig')().decode(sample, final=False)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        text = sample.decode('cp1252', errors='replace')
+        encoding = 'cp1252'
+    header = text.splitlines()[0] if text else ''
+    try:
+        delimiter = csv.Sniffer().sniff(header, delimiters=',;\t').delimiter
+    except csv.Error:
+        delimiter = ','
+    return encoding, delimiter, ',' if delimiter == ';' else '.'
+
+
+def read_csv_columns(path, columns, optional=(), check=None):
+    """
+    read_xlsx_columns for a CSV export: only the requested columns are parsed, in chunks of
+    CHECK_ROWS rows. Numbers are parsed by pandas and text cells are kept as text.
+    """
+    encoding, delimiter, decimal = csv_format(path)
+    header = pd.read_csv(path, nrows=0, sep=delimiter, encoding=encoding).columns
+    positions = locate_columns(header, columns, optional, path)
+    found = [column for column in columns if column in positions]
+    chunks = []
+    reader = pd.read_csv(path, sep=delimiter, decimal=decimal, encoding=encoding, usecols=found,
+                         chunksize=CHECK_ROWS, low_memory=False)
+    with reader:
+        for chunk in reader:
+            chunks.append(chunk)
+            if check is not None:
+                check()
+    df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=found)
+    data = {column: clean_missing(df[column].astype(object) if df[column].dtype == object else df[column])
+            for column in found}
+    return columns_frame(data, columns, len(df))
+
+
+def read_parquet_columns(path, columns, optional=(), check=None):
+    """
+    read_xlsx_columns for a Parquet export: only the requested columns are read, one row group at a time.
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    positions = locate_columns(parquet_file.schema_arrow.names, columns, optional, path)
+    found = [column for column in columns if column in positions]
+    chunks = []
+    for group in range(parquet_file.num_row_groups):
+        chunks.append(parquet_file.read_row_group(group, columns=found).to_pandas())
+        if check is not None:
+            check()
+    df = pd.concat(chunks, ignore_index=True) if chunks else parquet_file.schema_arrow.empty_table().to_pandas()[found]
+    data = {column: clean_missing(df[column]) for column in found}
+    return columns_frame(data, columns, len(df))
+
+
+def xlsx_reader(engine=None):
+    """
+    Return the .xlsx reader of the engine: calamine when installed, openpyxl otherwise, unless one is given.
+    """
+    engine = engine or ('calamine' if CalamineWorkbook is not None else 'openpyxl')
+    if engine not in XLSX_ENGINES:
+        raise ValueError(f"Unknown xlsx engine {engine!r}, expected one of {', '.join(XLSX_ENGINES)}")
+    return read_calamine_columns if engine == 'calamine' else read_xlsx_columns
+
+
+def read_columns(path, columns, optional=(), check=None, engine=None):
+    """
+    Read the given columns of a workbook with the reader for its file type (.xlsx, .csv or .parquet).
+    engine picks the .xlsx engine ('openpyxl' or 'calamine'); see read_xlsx_columns for the arguments.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return read_csv_columns(path, columns, optional, check)
+    if extension == '.parquet':
+        return read_parquet_columns(path, columns, optional, check)
+    if extension == '.xlsx':
+        return xlsx_reader(engine)(path, columns, optional, check)
+    raise ValueError(f"Unsupported workbook type '{extension}' of {path}, expected one of {', '.join(WORKBOOK_EXTENSIONS)}")
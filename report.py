@@ -0,0 +1,187 @@
+import csv
+import json
+import os
+
+REPORT_FORMATS = {'.xlsx': 'xlsx', '.csv': 'csv', '.parquet': 'parquet'}
+CHUNK_ROWS = 50_000
+
+# Excel number formats of the report columns, columns not listed keep the General format
+COLUMN_FORMATS = {
+    'Date': 'yyyy-mm-dd',
+    'Protime Hours': '0.00',
+    'Agency Hours': '0.00',
+    'Hours Difference': '0.00',
+    'Difference in Minutes': '0',
+    'Protime Invoice': '#,##0.00',
+    'Agency Invoice': '#,##0.00',
+    'Invoice Difference': '#,##0.00',
+    'Overpay Request': '#,##0.00',
+    'GXO Overpays': '#,##0.00',
+    'Match Score': '0'
+}
+COLUMN_WIDTHS = {'Date': 12, 'Normalized Name': 32, 'Matched Name': 32}
+
+
+def report_format(path):
+    """
+    Return the report format for the extension of the output path.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in REPORT_FORMATS:
+        raise ValueError(f"Unsupported report type '{extension}', expected one of {', '.join(REPORT_FORMATS)}")
+    return REPORT_FORMATS[extension]
+
+
+def cell_rows(chunk):
+    """
+    Yield the rows of a frame as lists of plain Python values with missing values as None.
+    """
+    columns = [chunk[column].astype(object).where(chunk[column].notna(), None).tolist() for column in chunk.columns]
+    return zip(*columns)
+
+
+class ReportWriter:
+    def __init__(self, path, columns):
+        """
+        Writes a report in chunks: open(), write_chunk() for every block of rows,
+        write_totals() once for the totals row, then close(). Only the current chunk
+        is converted at a time, so the size of the report does not drive peak memory.
+        """
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+
+    def open(self):
+        pass
+
+    def write_chunk(self, chunk):
+        raise NotImplementedError
+
+    def write_totals(self, totals):
+        self.write_chunk(totals)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class XlsxReportWriter(ReportWriter):
+    def open(self):
+        """
+        Open a constant-memory workbook: every row is flushed to disk once the next one starts.
+        The header is bold and frozen and the number formats are set per column.
+        """
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(self.path, {'constant_memory': True})
+        self.worksheet = self.workbook.add_worksheet('Report')
+        header = self.workbook.add_format({'bold': True, 'bottom': 1, 'text_wrap': True, 'valign': 'top'})
+        self.total_formats = []
+        for col, column in enumerate(self.columns):
+            number_format = COLUMN_FORMATS.get(column)
+            cell_format = self.workbook.add_format({'num_format': number_format}) if number_format else None
+            self.worksheet.set_column(col, col, COLUMN_WIDTHS.get(column, 14), cell_format)
+            total_format = {'bold': True, 'top': 1}
+            if number_format:
+                total_format['num_format'] = number_format
+            self.total_formats.append(self.workbook.add_format(total_format))
+        self.worksheet.write_row(0, 0, self.columns, header)
+        self.worksheet.freeze_panes(1, 0)
+
+    def write_chunk(self, chunk):
+        for values in cell_rows(chunk[self.columns]):
+            self.rows += 1
+            self.worksheet.write_row(self.rows, 0, values)
+
+    def write_totals(self, totals):
+        if self.rows:
+            self.worksheet.autofilter(0, 0, self.rows, len(self.columns) - 1)
+        for values in cell_rows(totals[self.columns]):
+            self.rows += 1
+            for col, value in enumerate(values):
+                if value is None:
+                    self.worksheet.write_blank(self.rows, col, None, self.total_formats[col])
+                else:
+                    self.worksheet.write(self.rows, col, value, self.total_formats[col])
+
+    def close(self):
+        self.workbook.close()
+
+
+class CsvReportWriter(ReportWriter):
+    def open(self):
+        # utf-8-sig so Excel detects the encoding of names with accents
+        self.handle = open(self.path, 'w', newline='', encoding='utf-8-sig')
+        csv.writer(self.handle).writerow(self.columns)
+
+    def write_chunk(self, chunk):
+        chunk[self.columns].to_csv(self.handle, header=False, index=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        self.handle.close()
+
+
+class ParquetReportWriter(ReportWriter):
+    """
+    Parquet keeps a typed column per field, so the totals row (with 'Total' in the Week column)
+    is stored as JSON in the file metadata under 'datacompare.totals' instead of as a row.
+    """
+
+    def open(self):
+        self.writer = None
+
+    def write_chunk(self, chunk):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        chunk = chunk[self.columns].infer_objects()
+        if self.writer is None:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = pa.Table.from_pandas(chunk, schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+        self.rows += len(chunk)
+
+    def write_totals(self, totals):
+        if self.writer is None:
+            self.write_chunk(totals.iloc[:0])
+        records = totals[self.columns].astype(object).where(totals[self.columns].notna(), None)
+        self.writer.add_key_value_metadata({
+            'datacompare.totals': json.dumps(records.to_dict(orient='records'), default=str)
+        })
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+WRITERS = {'xlsx': XlsxReportWriter, 'csv': CsvReportWriter, 'parquet': ParquetReportWriter}
+
+
+def report_writer(path, columns):
+    """
+    Return the report writer for the extension of the output path.
+    """
+    return WRITERS[report_format(path)](path, columns)
+
+
+def write_report(path, differences, chunk_rows=CHUNK_ROWS):
+    """
+    Write a differences frame, whose last row is the totals row, to path in chunks of chunk_rows.
+    Returns the number of rows written.
+    """
+    rows, totals = differences.iloc[:-1], differences.iloc[-1:]
+    with report_writer(path, differences.columns) as writer:
+        for start in range(0, len(rows), chunk_rows):
+            writer.write_chunk(rows.iloc[start:start + chunk_rows])
+        writer.write_totals(totals)
+    return writer.rows
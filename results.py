@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# Columns summed into the totals row, in report order
+TOTAL_COLUMNS = [
+    'Protime Hours', 'Agency Hours',
+    'Protime Invoice', 'Agency Invoice',
+    'Hours Difference', 'Difference in Minutes', 'Invoice Difference', 'Overpay Request', 'GXO Overpays'
+]
+
+
+def totals_row(totals, with_agency=False):
+    """
+    Return the totals row of a report for the sums of the total columns.
+    """
+    return pd.DataFrame({
+        **({'Agency': ['']} if with_agency else {}),
+        'Week': ['Total'],
+        'Normalized Name': [''],
+        **{column: [totals[column]] for column in TOTAL_COLUMNS}
+    })
+
+
+def prefix_sums(values):
+    """
+    Cumulative sums of the rows with a leading row of zeros, so rows [i, j) sum to sums[j] - sums[i].
+    Missing values count as 0, like the totals row.
+    """
+    sums = np.zeros((len(values) + 1, values.shape[1]))
+    np.cumsum(np.nan_to_num(values), axis=0, out=sums[1:])
+    return sums
+
+
+class ResultSet:
+    def __init__(self, merged_df, start_week=None, end_week=None):
+        """
+        The unfiltered comparison of the last run for weeks start_week..end_week, indexed so a
+        different minutes threshold, a narrower week range or a name filter is answered without
+        comparing again:
+        - rows ordered by week, with their weeks kept sorted for a binary search of the range;
+        - the rows ordered by 'Difference in Minutes' for a binary search of the threshold;
+        - prefix sums of the total columns in both orders, so the totals of a plain threshold
+          or a plain week range are a subtraction instead of a sum over the rows.
+        Selected rows are returned in the order of the comparison, like filter_differences.
+        """
+        self.frame = merged_df.reset_index(drop=True)
+        self.start_week = start_week
+        self.end_week = end_week
+        values = self.frame[TOTAL_COLUMNS].to_numpy(dtype=float)
+
+        weeks = self.frame['Week'].to_numpy()
+        self.week_order = np.argsort(weeks, kind='stable')
+        self.weeks = weeks[self.week_order]
+        self.week_sums = prefix_sums(values[self.week_order])
+
+        # Missing minutes (names on one side only) sort last and never pass a threshold
+        minutes = self.frame['Difference in Minutes'].to_numpy(dtype=float)
+        self.minutes_order = np.argsort(minutes, kind='stable')
+        self.minutes = minutes[self.minutes_order]
+        self.minutes_known = int(np.count_nonzero(~np.isnan(minutes)))
+        self.minutes_sums = prefix_sums(values[self.minutes_order])
+
+        names = self.frame['Normalized Name']
+        self.names = names if isinstance(names.dtype, pd.CategoricalDtype) else names.astype('category')
+
+    def __len__(self):
+        return len(self.frame)
+
+    def covers(self, start_week, end_week):
+        """
+        True if the weeks start_week..end_week can be answered from this result set,
+        i.e. they lie within the week range it was compared for.
+        """
+        return self.start_week is not None and self.start_week <= start_week <= end_week <= self.end_week
+
+    def name_codes(self, name_filter):
+        """
+        Return the category codes of the normalized names containing name_filter (case-insensitive).
+        Only the name dictionary is searched, not the rows.
+        """
+        categories = pd.Series(self.names.cat.categories, dtype=object)
+        matches = categories.str.contains(name_filter.strip().lower(), regex=False).to_numpy()
+        return np.flatnonzero(matches)
+
+    def select(self, threshold_minutes=None, start_week=None, end_week=None, name_filter=None):
+        """
+        Return (row positions in comparison order, totals per total column) of the rows in the week
+        range with a difference above threshold_minutes and a name containing name_filter.
+        Unset arguments do not filter.
+        """
+        threshold = threshold_minutes if threshold_minutes is not None and threshold_minutes > 0 else None
+        low, high = 0, len(self.weeks)
+        if start_week is not None:
+            low = int(np.searchsorted(self.weeks, start_week, side='left'))
+        if end_week is not None:
+            high = int(np.searchsorted(self.weeks, end_week, side='right'))
+        whole_range = low == 0 and high == len(self.weeks)
+
+        if not name_filter and threshold is None:
+            positions = self.week_order[low:high]
+            totals = self.week_sums[high] - self.week_sums[low]
+        elif not name_filter and whole_range:
+            first = int(np.searchsorted(self.minutes[:self.minutes_known], threshold, side='right'))
+            positions = self.minutes_order[first:self.minutes_known]
+            totals = self.minutes_sums[self.minutes_known] - self.minutes_sums[first]
+        else:
+            positions = self.week_order[low:high]
+            if threshold is not None:
+                positions = positions[self.frame['Difference in Minutes'].to_numpy(dtype=float)[positions] > threshold]
+            if name_filter:
+                codes = self.names.cat.codes.to_numpy()[positions]
+                positions = positions[np.isin(codes, self.name_codes(name_filter))]
+            totals = None
+        positions = np.sort(positions)
+        if totals is None:
+            totals = np.nan_to_num(self.frame[TOTAL_COLUMNS].to_numpy(dtype=float)[positions]).sum(axis=0)
+        return positions, dict(zip(TOTAL_COLUMNS, totals.tolist()))
+
+    def query(self, threshold_minutes=None, start_week=None, end_week=None, name_filter=None):
+        """
+        Return the selected rows with the totals row appended, in the layout of filter_differences.
+        """
+        return self.query_rows(*self.select(threshold_minutes, start_week, end_week, name_filter))
+
+    def query_rows(self, positions, totals):
+        """
+        Return the rows at positions (from select) with the totals row appended.
+        """
+        rows = self.frame.take(positions)
+        return pd.concat([rows, totals_row(totals, 'Agency' in rows.columns)], ignore_index=True)
@@ -0,0 +1,244 @@
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from names import normalize_categories
+from paths import app_data_path
+
+# Bump whenever the tables change; older stores are rebuilt from scratch
+SCHEMA_VERSION = 2
+RESULT_COLUMNS = [
+    'Week', 'Normalized Name', 'Protime Hours', 'Protime Invoice',
+    'Agency Hours', 'Agency Invoice', 'Matched Name', 'Match Score'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    source TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    path TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    PRIMARY KEY (source, path)
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    source TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    path TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    agency TEXT NOT NULL,
+    name TEXT NOT NULL,
+    hours REAL,
+    invoice REAL
+);
+CREATE INDEX IF NOT EXISTS aggregates_by_week ON aggregates (source, folder, week, agency);
+CREATE INDEX IF NOT EXISTS aggregates_by_path ON aggregates (source, path);
+CREATE TABLE IF NOT EXISTS result_weeks (
+    settings TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    PRIMARY KEY (settings, week)
+);
+CREATE TABLE IF NOT EXISTS results (
+    settings TEXT NOT NULL,
+    week INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    protime_hours REAL,
+    protime_invoice REAL,
+    agency_hours REAL,
+    agency_invoice REAL,
+    matched_name TEXT,
+    match_score REAL
+);
+CREATE INDEX IF NOT EXISTS results_by_week ON results (settings, week);
+"""
+
+
+def default_store_path():
+    """
+    Return the per-user location of the aggregate store.
+    """
+    return app_data_path('aggregates.sqlite')
+
+
+def aggregate_workbook(kind, df):
+    """
+    Reduce a prepared workbook to hours and invoices per (Week, Agency, Normalized Name),
+    the grain kept in the store. Agency rows carry an empty agency.
+    """
+    if kind == 'protime':
+        df = pd.DataFrame({
+            'Week': df['Week'],
+            'Agency': df['Temp Agency'].astype(object).fillna('').astype(str),
+            'Normalized Name': normalize_categories(df['Full Name']),
+            'Hours': df['Protime Hours'],
+            'Invoice': df['Protime Invoice']
+        })
+    else:
+        df = pd.DataFrame({
+            'Week': df['Week'],
+            'Agency': '',
+            'Normalized Name': normalize_categories(df['Name']),
+            'Hours': df['Agency Hours'],
+            'Invoice': df['Agency Invoice']
+        })
+    df = df[df['Normalized Name'] != '']
+    return df.groupby(['Week', 'Agency', 'Normalized Name'], as_index=False, observed=True).agg({
+        'Hours': 'sum',
+        'Invoice': 'sum'
+    })
+
+
+class AggregateStore:
+    def __init__(self, path):
+        """
+        SQLite store of per-workbook weekly aggregates and per-week comparison results.
+        Each workbook is remembered with its fingerprint and the weeks it contributes to,
+        so a run only has to re-read changed workbooks and re-compare the weeks they touch.
+        """
+        self.path = path
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                for table in ('files', 'aggregates', 'result_weeks', 'results'):
+                    self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+                self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.connection.executescript(SCHEMA)
+
+    def stale_files(self, source, folder, fingerprints):
+        """
+        Compare the current {path: fingerprint} of a source folder with the store.
+        Returns (paths that are new or changed, paths that were removed).
+        """
+        with self.lock:
+            known = dict(self.connection.execute(
+                "SELECT path, fingerprint FROM files WHERE source = ? AND folder = ?", (source, folder)
+            ).fetchall())
+        changed = [path for path, fingerprint in fingerprints.items() if known.get(path) != fingerprint]
+        removed = [path for path in known if path not in fingerprints]
+        return changed, removed
+
+    def file_weeks(self, source, path):
+        rows = self.connection.execute(
+            "SELECT DISTINCT week FROM aggregates WHERE source = ? AND path = ?", (source, path)
+        ).fetchall()
+        return {week for (week,) in rows}
+
+    def replace_file(self, source, folder, path, fingerprint, aggregates):
+        """
+        Store the aggregates of a new or changed workbook and return the weeks it touched,
+        both the weeks it used to contain and the weeks it contains now.
+        """
+        rows = [
+            (source, folder, path, int(week), agency, name, hours, invoice)
+            for week, agency, name, hours, invoice in aggregates[
+                ['Week', 'Agency', 'Normalized Name', 'Hours', 'Invoice']
+            ].itertuples(index=False)
+        ]
+        with self.lock, self.connection:
+            weeks = self.file_weeks(source, path)
+            self.connection.execute("DELETE FROM aggregates WHERE source = ? AND path = ?", (source, path))
+            self.connection.executemany("INSERT INTO aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (source, folder, path, fingerprint)
+            )
+        return weeks | {row[3] for row in rows}
+
+    def remove_file(self, source, path):
+        """
+        Forget a workbook that no longer exists and return the weeks it contained.
+        """
+        with self.lock, self.connection:
+            weeks = self.file_weeks(source, path)
+            self.connection.execute("DELETE FROM aggregates WHERE source = ? AND path = ?", (source, path))
+            self.connection.execute("DELETE FROM files WHERE source = ? AND path = ?", (source, path))
+        return weeks
+
+    def invalidate(self, weeks):
+        """
+        Drop the stored comparison results of the given weeks for all settings.
+        """
+        params = [(int(week),) for week in weeks]
+        with self.lock, self.connection:
+            self.connection.executemany("DELETE FROM results WHERE week = ?", params)
+            self.connection.executemany("DELETE FROM result_weeks WHERE week = ?", params)
+
+    def source_weeks(self, source, folder, start_week, end_week, agency=''):
+        """
+        Return the sorted weeks in the range that have data for the source folder.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT DISTINCT week FROM aggregates "
+                "WHERE source = ? AND folder = ? AND agency = ? AND week BETWEEN ? AND ? ORDER BY week",
+                (source, folder, agency, start_week, end_week)
+            ).fetchall()
+        return [week for (week,) in rows]
+
+    def missing_weeks(self, settings, weeks):
+        """
+        Return the weeks that have no stored comparison results for the settings.
+        """
+        with self.lock:
+            done = {week for (week,) in self.connection.execute(
+                "SELECT week FROM result_weeks WHERE settings = ?", (settings,)
+            ).fetchall()}
+        return [week for week in weeks if week not in done]
+
+    def weekly_aggregates(self, source, folder, weeks, agency=''):
+        """
+        Sum the stored workbook aggregates of a source folder per week and name.
+        """
+        weeks = [int(week) for week in weeks]
+        if not weeks:
+            return pd.DataFrame(columns=['Week', 'Normalized Name', 'Hours', 'Invoice'])
+        placeholders = ', '.join('?' * len(weeks))
+        with self.lock:
+            return pd.read_sql_query(
+                "SELECT week AS \"Week\", name AS \"Normalized Name\", "
+                "TOTAL(hours) AS \"Hours\", TOTAL(invoice) AS \"Invoice\" "
+                f"FROM aggregates WHERE source = ? AND folder = ? AND agency = ? AND week IN ({placeholders}) "
+                "GROUP BY week, name ORDER BY week, name",
+                self.connection,
+                params=[source, folder, agency] + weeks
+            )
+
+    def store_results(self, settings, weeks, merged_df):
+        """
+        Store the comparison rows of the given weeks and mark those weeks as done.
+        """
+        merged_df = merged_df.reindex(columns=RESULT_COLUMNS)
+        merged_df['Matched Name'] = merged_df['Matched Name'].fillna('')
+        rows = [
+            (settings, int(row[0]), *row[1:])
+            for row in merged_df.astype(object).where(merged_df.notna(), None).itertuples(index=False)
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO result_weeks VALUES (?, ?)", [(settings, int(week)) for week in weeks]
+            )
+
+    def load_results(self, settings, start_week, end_week):
+        """
+        Return the stored comparison rows of the week range, ordered like an outer merge.
+        """
+        with self.lock:
+            df = pd.read_sql_query(
+                "SELECT week, name, protime_hours, protime_invoice, agency_hours, agency_invoice, "
+                "matched_name, match_score FROM results WHERE settings = ? AND week BETWEEN ? AND ? "
+                "ORDER BY week, name",
+                self.connection,
+                params=[settings, start_week, end_week]
+            )
+        df.columns = RESULT_COLUMNS
+        return df
+
+    def close(self):
+        self.connection.close()
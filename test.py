@@ -3,6 +3,7 @@ import os
 import time
 import numpy as np
 import re
+from names import map_unique
 
 # Function to normalize and simplify names
 def normalize_name(name):
@@ -121,8 +122,8 @@ if __name__ == '__main__':
     # Proceed only if both DataFrames are not empty
     if not protime.empty and not agency.empty:
         # Normalize names in both DataFrames
-        protime['Normalized Name'] = protime['Full Name'].apply(normalize_name)
-        agency['Normalized Name'] = agency['Name'].apply(normalize_name)
+        protime['Normalized Name'] = map_unique(protime['Full Name'], normalize_name)
+        agency['Normalized Name'] = map_unique(agency['Name'], normalize_name)
 
         # Remove entries with empty 'Normalized Name'
         protime = protime[protime['Normalized Name'] != '']
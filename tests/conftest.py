@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+from openpyxl import Workbook
+
+# The modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+AGENCY_HEADER = ['Datum', 'Gewerkte week', 'Naam Medewerker', 'Uren', 'Nettowaarde']
+PROTIME_HEADER = ['Date', 'Week', 'Temp Agency', 'Full Name', 'Hours (Dec)', 'Invoice incl ADV']
+
+
+def write_workbook(path, header, rows):
+    """
+    Write a workbook with a header row and the given rows to path.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(list(row))
+    workbook.save(path)
+    return path
+
+
+@pytest.fixture
+def write_agency(tmp_path):
+    """
+    Write an agency workbook of (Datum, Gewerkte week, Naam Medewerker, Uren, Nettowaarde) rows.
+    """
+    return lambda name, rows, folder='Agency': write_workbook(str(tmp_path / folder / name), AGENCY_HEADER, rows)
+
+
+@pytest.fixture
+def write_protime(tmp_path):
+    """
+    Write a Protime workbook of (Date, Week, Temp Agency, Full Name, Hours (Dec), Invoice incl ADV) rows.
+    """
+    return lambda name, rows, folder='Protime': write_workbook(str(tmp_path / folder / name), PROTIME_HEADER, rows)
+
+
+@pytest.fixture(scope='session')
+def synthetic_dataset(tmp_path_factory):
+    """
+    Seeded synthetic Agency and Protime folders of about 3000 rows each, split over three workbooks.
+    Returns (agency folder, protime folder).
+    """
+    from benchmarks.synthetic import generate_dataset
+
+    return generate_dataset(str(tmp_path_factory.mktemp('synthetic')), 3000, seed=7, files=3)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from aliases import AliasStore
+from matching import apply_fuzzy_matches
+
+
+def merged_frame(rows):
+    return pd.DataFrame(rows, columns=['Week', 'Normalized Name', 'Protime Hours', 'Protime Invoice',
+                                       'Agency Hours', 'Agency Invoice'])
+
+
+def test_learn_stores_swapped_names(tmp_path):
+    merged_df = apply_fuzzy_matches(merged_frame([
+        (1, 'piet jansen', 8.0, 100.0, np.nan, np.nan),
+        (1, 'jansen piet', np.nan, np.nan, 8.0, 100.0),
+        (1, 'anna de vries', 6.0, 75.0, np.nan, np.nan),
+        (1, 'ana de vries', np.nan, np.nan, 6.0, 75.0),
+        (1, 'tim bakker', 4.0, 50.0, 4.0, 50.0),
+    ]), 80, workers=1)
+    swapped = merged_df.loc[merged_df['Matched Name'] == 'jansen piet', 'Match Score']
+    assert swapped.tolist() == [100.0]
+
+    store = AliasStore(str(tmp_path / 'aliases.sqlite'))
+    try:
+        assert store.learn(merged_df, 80) == 2
+        assert store.index['agency'] == {'jansen piet': 'piet jansen', 'ana de vries': 'anna de vries'}
+    finally:
+        store.close()
+
+
+def test_learn_skips_exact_matches_and_low_scores(tmp_path):
+    merged_df = merged_frame([
+        (1, 'tim bakker', 4.0, 50.0, 4.0, 50.0),
+        (1, 'piet jansen', 8.0, 100.0, 8.0, 100.0),
+    ]).assign(**{'Matched Name': ['', 'p jansen'], 'Match Score': [100.0, 85.0]})
+
+    store = AliasStore(str(tmp_path / 'aliases.sqlite'))
+    try:
+        assert store.learn(merged_df, 90) == 0
+        assert len(store) == 0
+    finally:
+        store.close()
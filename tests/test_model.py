@@ -0,0 +1,30 @@
+import argparse
+import contextlib
+import io
+from datetime import datetime
+
+from benchmarks.pipeline import run_stages
+from model import DataModel
+
+
+def test_workbooks_with_different_names(tmp_path, write_agency, write_protime):
+    monday = datetime(2024, 1, 1)
+    write_agency('agency_1.xlsx', [(monday, 1, 'Piet Jansen', 8, 160)])
+    write_agency('agency_2.xlsx', [(monday, 2, 'Anna Vries', 6, 120), (monday, 2, 'Tim Bakker', 4, 80)])
+    write_protime('protime_1.xlsx', [(monday, 1, 'OTTO', 'Piet Jansen', 8, 160)])
+    write_protime('protime_2.xlsx', [(monday, 2, 'OTTO', 'Anna Vries', 5, 100)])
+    agency_folder, protime_folder = str(tmp_path / 'Agency'), str(tmp_path / 'Protime')
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = DataModel()
+        model.set_agency_path(agency_folder)
+        model.set_protime_path(protime_folder)
+        model.set_week_range(1, 52)
+        model.load_data()
+        model.process_data()
+        stages = run_stages(agency_folder, protime_folder,
+                            argparse.Namespace(threshold='', workers='1', compare_workers='1'))
+
+    rows = model.differences.iloc[:-1]
+    assert sorted(rows['Normalized Name'].astype(str)) == ['anna vries', 'piet jansen', 'tim bakker']
+    assert stages['process_data']['rows_out'] == len(model.differences)
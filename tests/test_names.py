@@ -0,0 +1,67 @@
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from model import DataModel
+from names import normalize_categories, normalize_name, normalize_names
+
+# (raw name, normalized name)
+NAMES = [
+    ('Anna Vries', 'anna vries'),
+    # Accents are kept, only the case changes
+    ('José Álvarez', 'josé álvarez'),
+    ('JOSÉ ÁLVAREZ', 'josé álvarez'),
+    ('Zoë Müller-Lüdenscheidt', 'zoë lüdenscheidt'),
+    # Extra whitespace, tabs and non-breaking spaces
+    ('  Anna   Vries ', 'anna vries'),
+    ('Anna\tVries', 'anna vries'),
+    ('Anna\u00a0Vries', 'anna vries'),
+    # Casing
+    ('ANNA VRIES', 'anna vries'),
+    ('aNNa vRIES', 'anna vries'),
+    # Middle names and hyphens
+    ('Anna de Vries', 'anna vries'),
+    ('Jan-Peter de Groot-Smit', 'jan smit'),
+    ('Jan - Bakker', 'jan bakker'),
+    # Punctuation other than hyphens is kept
+    ("O'Brien, Sean", "o'brien, sean"),
+    ('J. Bakker', 'j. bakker'),
+    ('Bakker', 'bakker'),
+    # Empty and missing values
+    ('', ''),
+    ('   ', ''),
+    ('-', ''),
+    (np.nan, ''),
+    (None, ''),
+    (12345, ''),
+]
+
+
+def normalize_row(name):
+    """
+    The per-row path: DataModel.normalize_name applied to one value.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_model = DataModel()
+    return data_model.normalize_name(name)
+
+
+@pytest.mark.parametrize('raw, expected', NAMES, ids=[repr(raw) for raw, _ in NAMES])
+def test_normalize_name(raw, expected):
+    assert normalize_row(raw) == expected
+    assert normalize_name(raw) == expected
+    assert normalize_names(pd.Series([raw], dtype=object)).tolist() == [expected]
+
+
+def test_normalize_paths_agree():
+    # Every name twice, so categories are shared by several rows
+    raw = pd.Series([name for name, _ in NAMES if not isinstance(name, int)] * 2, dtype=object)
+    per_row = raw.map(normalize_row)
+
+    pd.testing.assert_series_equal(normalize_names(raw), per_row)
+    per_category = normalize_categories(raw.astype('category'))
+    assert list(per_category.cat.categories) == sorted(set(per_row))
+    pd.testing.assert_series_equal(per_category.astype(object), per_row)
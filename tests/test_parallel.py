@@ -0,0 +1,46 @@
+import contextlib
+import io
+
+import pandas as pd
+import pytest
+
+import model
+from model import DataModel
+
+
+def compare(agency_folder, protime_folder, workers, start_week=1, end_week=52, match=None, agencies=False):
+    """
+    Load the dataset and return the unfiltered comparison and the names of the compare stages.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_model = DataModel()
+        if agencies:
+            # The same workbooks twice: OTTO matches, RANDSTAD only has the Protime rows of its own agency
+            data_model.set_agency_paths({'OTTO': agency_folder, 'RANDSTAD': agency_folder})
+        else:
+            data_model.set_agency_path(agency_folder)
+        data_model.set_protime_path(protime_folder)
+        data_model.set_week_range(start_week, end_week)
+        data_model.set_match_threshold(match)
+        data_model.set_compare_workers(workers)
+        data_model.load_data()
+        data_model.start_metrics()
+        merged_df = data_model.compare_frames()
+    return merged_df, [stage['stage'] for stage in data_model.metrics.stages]
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'start_week': 3, 'end_week': 3},
+    {'start_week': 10, 'end_week': 14},
+    {'match': '80'},
+    {'agencies': True},
+    {'agencies': True, 'match': '80'},
+], ids=['full', 'one-week', 'narrow', 'match', 'agencies', 'agencies-match'])
+def test_parallel_compare_matches_serial(monkeypatch, synthetic_dataset, options):
+    monkeypatch.setattr(model, 'PARALLEL_MIN_ROWS', 0)
+    serial, serial_stages = compare(*synthetic_dataset, 1, **options)
+    parallel, parallel_stages = compare(*synthetic_dataset, 2, **options)
+
+    assert 'parallel_compare' in parallel_stages and 'parallel_compare' not in serial_stages
+    pd.testing.assert_frame_equal(parallel, serial, check_exact=True)
@@ -0,0 +1,65 @@
+import contextlib
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from model import DataModel, agency_report_path
+
+AGENCIES = ('OTTO', 'RANDSTAD')
+
+
+def run_report(agency_folder, protime_folder, folder, out_of_core, grain='week', threshold=None, match=None,
+               agencies=False):
+    """
+    Run the comparison in memory or out of core and save the report as <folder>/report.csv.
+    Returns the report path.
+    """
+    os.makedirs(folder)
+    output_path = os.path.join(folder, 'report.csv')
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_model = DataModel()
+        if agencies:
+            data_model.set_agency_paths({agency: agency_folder for agency in AGENCIES})
+        else:
+            data_model.set_agency_path(agency_folder)
+        data_model.set_protime_path(protime_folder)
+        data_model.set_week_range(1, 52)
+        data_model.set_grain(grain)
+        data_model.set_threshold_minutes(threshold)
+        data_model.set_match_threshold(match)
+        if out_of_core:
+            data_model.set_out_of_core(True, os.path.join(folder, 'partitions'))
+            data_model.run_partitioned(output_path)
+        else:
+            data_model.run()
+            data_model.save_report(output_path)
+    return output_path
+
+
+def assert_reports_equal(partitioned_path, memory_path):
+    partitioned = pd.read_csv(partitioned_path)
+    memory = pd.read_csv(memory_path)
+    assert len(memory) > 1
+    # Totals are summed week by week out of core, so only the last digits may differ
+    pd.testing.assert_frame_equal(partitioned, memory, check_dtype=False, check_exact=False)
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'threshold': '30'},
+    {'grain': 'day'},
+    {'grain': 'day', 'threshold': '30'},
+    {'match': '80'},
+    {'agencies': True},
+    {'agencies': True, 'match': '80', 'threshold': '30'},
+], ids=['week', 'threshold', 'day', 'day-threshold', 'match', 'agencies', 'agencies-match-threshold'])
+def test_partitioned_run_matches_memory_run(tmp_path, synthetic_dataset, options):
+    memory_path = run_report(*synthetic_dataset, str(tmp_path / 'memory'), False, **options)
+    partitioned_path = run_report(*synthetic_dataset, str(tmp_path / 'partitioned'), True, **options)
+
+    # The report, or in multi-agency mode the agency summary
+    assert_reports_equal(partitioned_path, memory_path)
+    for agency in AGENCIES if options.get('agencies') else ():
+        assert_reports_equal(agency_report_path(partitioned_path, agency), agency_report_path(memory_path, agency))
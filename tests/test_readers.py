@@ -0,0 +1,58 @@
+import contextlib
+import io
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from benchmarks.readers import READERS, export
+from conftest import write_workbook
+from model import read_prepared_workbook
+from readers import CalamineWorkbook
+
+AGENCY_ROWS = [
+    # Odd header: an empty first column, the columns out of order and columns that are not read
+    [None, 'Opmerking', 'Naam Medewerker', 'Gewerkte week', 'Nettowaarde', 'Uren', 'Datum', 'Extra'],
+    [None, 'x', '  Jansen,  Piet ', 1, 120.5, 8, datetime(2024, 1, 1), 1],
+    [None, None, 'Müller, Zoë', 1, '#N/A', 7.25, datetime(2024, 1, 2), None],
+    [None, '', '', 1, 60, 4, None, 2],
+    [],  # Blank row
+    [None, None, None, 'Totaal', None, 19.25, None, None],
+    [None, 'y', 12345, '2', 0, '#VALUE!', datetime(2024, 1, 8), 3],  # Numeric name
+    [None, None, 'Çelik, Emre', 2, 1.5, 0.1, datetime(2024, 1, 9), None],
+    [None, None, 'Bakker, Tim', None, 90, 6, None, None],  # Missing week
+    [],
+    [None, None, 'Visser, Noah', 5, 40, 2.5, datetime(2024, 1, 29), 4],  # Weeks 3 and 4 missing
+    [None, None, None, 'Totaal', None, 8.6, None, None],
+]
+PROTIME_ROWS = [
+    ['Week', 'Full Name', 'Extra', 'Temp Agency', 'Hours (Dec)', 'Invoice incl ADV', 'Date'],
+    [1, 'Piet Jansen', 1, 'OTTO', 8, 130.0, datetime(2024, 1, 1)],
+    [1, 'Zoë Müller', 2, 'OTTO', 7.25, '#DIV/0!', datetime(2024, 1, 2)],
+    [],
+    [1, ' Anna-Lotte de Vries ', None, 'RANDSTAD', 4.5, 70, None],
+    [2, 12345, 3, 'OTTO', 2, 40, datetime(2024, 1, 8)],
+    [2, 'Emre Çelik', 3, '', 0.1, 1.5, datetime(2024, 1, 8)],
+    ['#N/A', 'Tim Bakker', 4, 'OTTO', 6, 90, datetime(2024, 1, 9)],
+    [5, 'Noah Visser', 5, 'OTTO', 2.5, 40, datetime(2024, 1, 29)],
+]
+
+
+def read(path, kind, engine=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return read_prepared_workbook(path, kind, engine=engine)
+
+
+@pytest.mark.parametrize('kind, rows', [('agency', AGENCY_ROWS), ('protime', PROTIME_ROWS)])
+@pytest.mark.parametrize('label, extension, engine, options', READERS[1:], ids=[reader[0] for reader in READERS[1:]])
+def test_reader_matches_openpyxl(tmp_path, kind, rows, label, extension, engine, options):
+    if engine == 'calamine' and CalamineWorkbook is None:
+        pytest.skip("python-calamine is not installed")
+    path = write_workbook(str(tmp_path / f"{kind}.xlsx"), rows[0], rows[1:])
+    expected = read(path, kind, 'openpyxl')
+    assert len(expected) > 0
+
+    source = path if extension == '.xlsx' else export(path, extension, options)
+    assert os.path.splitext(source)[1] == extension
+    pd.testing.assert_frame_equal(read(source, kind, engine), expected)
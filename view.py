@@ -4,13 +4,207 @@ from ttkbootstrap.constants import *
 from tkinter import filedialog, messagebox
 import tkinter as tk
 
+# Rows drawn at a time by the results grid; only these Treeview items ever exist
+VISIBLE_ROWS = 20
+
+
+def format_cell(value):
+    """
+    Text shown in the results grid for one value: decimals with two digits, missing values empty.
+    """
+    if value is None or value != value:
+        return ''
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+class ResultsGrid:
+    def __init__(self, master, filter_var, visible_rows=VISIBLE_ROWS):
+        """
+        A virtualised table of a differences frame. The Treeview only holds the visible rows;
+        scrolling moves a window over the frame and fills those rows again. Sorting and filtering
+        work on the frame's arrays (an order of row positions), never on Treeview items,
+        so 100k+ rows stay responsive. The totals row is pinned below the table.
+        filter_var is the window's name filter: typing in it filters the shown rows right away,
+        the next run applies it to the comparison.
+        """
+        self.visible_rows = visible_rows
+        self.frame = ttk.Frame(master, padding=10)
+        self.columns = []
+        self.values = {}
+        self.rows = 0
+        self.order = None  # Row positions shown, after filtering and sorting
+        self.top = 0
+        self.sort_column = None
+        self.descending = False
+
+        self.filter_var = filter_var
+        self.filter_var.trace_add('write', lambda *args: self.apply_filter())
+        self.count_label = ttk.Label(self.frame, text="")
+        self.count_label.pack(anchor=W)
+
+        table_frame = ttk.Frame(self.frame)
+        table_frame.pack(fill=BOTH, expand=True)
+        self.tree = ttk.Treeview(table_frame, show='headings', height=visible_rows, selectmode='browse')
+        self.scrollbar = ttk.Scrollbar(table_frame, orient=VERTICAL, command=self.on_scroll)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=True)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.totals = ttk.Treeview(self.frame, show='', height=1, selectmode='none')
+        self.totals.pack(fill=X)
+        for widget in (self.tree, self.totals):
+            widget.bind('<MouseWheel>', lambda event: self.scroll_rows(-1 if event.delta > 0 else 1) or 'break')
+            widget.bind('<Button-4>', lambda event: self.scroll_rows(-1) or 'break')
+            widget.bind('<Button-5>', lambda event: self.scroll_rows(1) or 'break')
+        self.tree.bind('<Up>', lambda event: self.scroll_rows(-1) or 'break')
+        self.tree.bind('<Down>', lambda event: self.scroll_rows(1) or 'break')
+        self.tree.bind('<Prior>', lambda event: self.scroll_rows(-self.visible_rows) or 'break')
+        self.tree.bind('<Next>', lambda event: self.scroll_rows(self.visible_rows) or 'break')
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_frame(self, differences):
+        """
+        Show a differences frame whose last row is the totals row.
+        """
+        import pandas as pd  # Loaded with the model, not at startup
+
+        self.columns = list(differences.columns)
+        # Without the totals row the Week column is numeric again
+        rows, totals = differences.iloc[:-1].infer_objects(), differences.iloc[-1:]
+        self.values = {
+            column: rows[column].dt.strftime('%Y-%m-%d').fillna('').to_numpy()
+            if pd.api.types.is_datetime64_any_dtype(rows[column]) else rows[column].to_numpy()
+            for column in self.columns
+        }
+        self.sort_keys = {}
+        self.rows = len(rows)
+        self.names = rows['Normalized Name'] if 'Normalized Name' in rows.columns else None
+        self.sort_column = None
+        self.descending = False
+
+        for widget in (self.tree, self.totals):
+            widget.delete(*widget.get_children())
+            widget['columns'] = self.columns
+            for column in self.columns:
+                widget.column(column, width=140 if 'Name' in column else 100, anchor=W if 'Name' in column else E)
+        for column in self.columns:
+            self.tree.heading(column, text=column, command=lambda c=column: self.sort_by(c))
+        for index in range(self.visible_rows):
+            self.tree.insert('', END, iid=str(index), values=())
+        self.totals.insert('', END, values=[format_cell(value) for value in totals.iloc[0].tolist()])
+        self.apply_filter()
+
+    def clear(self):
+        for widget in (self.tree, self.totals):
+            widget.delete(*widget.get_children())
+        self.rows = 0
+        self.order = None
+        self.count_label.config(text="")
+
+    def apply_filter(self):
+        """
+        Keep the rows whose normalized name contains the filter text, in the current sort order.
+        Only the distinct names are searched, then the rows are selected by name code.
+        """
+        import numpy as np
+
+        if not self.rows and not self.values:
+            return
+        text = self.filter_var.get().strip().lower()
+        if text and self.names is not None:
+            names = self.names.astype('category')
+            categories = names.cat.categories.astype(str)
+            matches = np.flatnonzero(categories.str.contains(text, regex=False))
+            positions = np.flatnonzero(np.isin(names.cat.codes.to_numpy(), matches))
+        else:
+            positions = np.arange(self.rows)
+        if self.sort_column is not None:
+            keys = self.sort_key(self.sort_column)[positions]
+            positions = positions[np.argsort(keys, kind='stable')]
+            if self.descending:
+                # Reverse, but keep missing numbers last
+                positions = positions[::-1]
+                missing = np.isinf(self.sort_key(self.sort_column)[positions])
+                positions = np.concatenate([positions[~missing], positions[missing]])
+        self.order = positions
+        self.count_label.config(text=f"{len(positions):,} of {self.rows:,} rows")
+        self.top = 0
+        self.render()
+
+    def sort_key(self, column):
+        """
+        Return an array that sorts like the column: the values for numbers, otherwise sorted codes.
+        Missing numbers sort last. Computed once per column.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if column not in self.sort_keys:
+            values = self.values[column]
+            if values.dtype.kind in 'fiub':
+                keys = np.where(np.isnan(values.astype(float)), np.inf, values.astype(float))
+            else:
+                keys, _ = pd.factorize(pd.Series(values).astype(str), sort=True)
+            self.sort_keys[column] = keys
+        return self.sort_keys[column]
+
+    def sort_by(self, column):
+        """
+        Sort on a column; clicking the same heading again reverses the order.
+        """
+        self.descending = not self.descending if self.sort_column == column else False
+        self.sort_column = column
+        for name in self.columns:
+            arrow = (' \u25bc' if self.descending else ' \u25b2') if name == column else ''
+            self.tree.heading(name, text=name + arrow)
+        self.apply_filter()
+
+    def scroll_rows(self, count):
+        self.move_to(self.top + count)
+
+    def move_to(self, top):
+        last = max(0, len(self.order) - self.visible_rows) if self.order is not None else 0
+        top = min(max(0, int(top)), last)
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    def on_scroll(self, *args):
+        """
+        Scrollbar command: 'moveto <fraction>' or 'scroll <n> units|pages'.
+        """
+        if self.order is None:
+            return
+        if args[0] == 'moveto':
+            self.move_to(float(args[1]) * len(self.order))
+        elif args[0] == 'scroll':
+            step = self.visible_rows if args[2] == 'pages' else 1
+            self.scroll_rows(int(args[1]) * step)
+
+    def render(self):
+        """
+        Fill the visible Treeview rows from the frame's arrays and update the scrollbar.
+        """
+        window = self.order[self.top:self.top + self.visible_rows]
+        cells = [[format_cell(value) for value in self.values[column][window].tolist()] for column in self.columns]
+        for index in range(self.visible_rows):
+            values = [cell[index] for cell in cells] if index < len(window) else ()
+            self.tree.item(str(index), values=values)
+        total = max(len(self.order), 1)
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_rows) / total))
+
+
 class DataView:
-    def __init__(self, master, run_callback):
+    def __init__(self, master, run_callback, export_callback=None, cancel_callback=None):
         self.master = master
         self.master.title("Data Comparison Tool")
         self.agency_path = ''
         self.protime_path = ''
         self.run_callback = run_callback  # Accept the callback function
+        self.export_callback = export_callback  # Saves the shown results as a report
+        self.cancel_callback = cancel_callback  # Stops the running comparison
         self.create_widgets()
 
     def create_widgets(self):
@@ -43,6 +237,24 @@ class DataView:
         threshold_minutes_entry = ttk.Entry(threshold_frame, width=10, textvariable=self.threshold_minutes_var)
         threshold_minutes_entry.pack(side=LEFT, padx=5)
 
+        # Frame for Fuzzy Name Matching
+        match_frame = ttk.Frame(self.master, padding=10)
+        match_frame.pack(fill=X)
+        match_label = ttk.Label(match_frame, text="Name Match Threshold (0-100, empty = exact only):")
+        match_label.pack(side=LEFT)
+        self.match_threshold_var = tk.StringVar(value='')
+        match_threshold_entry = ttk.Entry(match_frame, width=10, textvariable=self.match_threshold_var)
+        match_threshold_entry.pack(side=LEFT, padx=5)
+
+        # Frame for Name Filter
+        name_frame = ttk.Frame(self.master, padding=10)
+        name_frame.pack(fill=X)
+        name_label = ttk.Label(name_frame, text="Only Names Containing (empty = all):")
+        name_label.pack(side=LEFT)
+        self.name_filter_var = tk.StringVar(value='')
+        name_filter_entry = ttk.Entry(name_frame, width=20, textvariable=self.name_filter_var)
+        name_filter_entry.pack(side=LEFT, padx=5)
+
         # Frame for Week Selection
         week_frame = ttk.Frame(self.master, padding=10)
         week_frame.pack(fill=X)
@@ -60,7 +272,7 @@ class DataView:
         # Frame for Progress Bar
         progress_frame = ttk.Frame(self.master, padding=10)
         progress_frame.pack(fill=X)
-        self.progress_bar = ttk.Progressbar(progress_frame, mode='indeterminate')
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate', maximum=100)
         self.progress_bar.pack(fill=X)
 
         # Frame for Run Button
@@ -68,9 +280,24 @@ class DataView:
         run_frame.pack(fill=X)
         self.run_button = ttk.Button(run_frame, text="Run", command=self.run_callback)  # Use the callback
         self.run_button.pack(side=LEFT)
+        self.cancel_button = ttk.Button(run_frame, text="Cancel", command=self.cancel_callback, state='disabled')
+        self.cancel_button.pack(side=LEFT, padx=5)
+        self.export_button = ttk.Button(run_frame, text="Export", command=self.export_callback, state='disabled')
+        self.export_button.pack(side=LEFT, padx=5)
         self.status_label = ttk.Label(run_frame, text="")
         self.status_label.pack(side=LEFT, padx=10)
 
+        # Results of the last run, exporting them as a report is optional
+        self.results_grid = ResultsGrid(self.master, self.name_filter_var)
+        self.results_grid.pack(fill=BOTH, expand=True)
+
+    def show_results(self, differences):
+        """
+        Show a differences frame (last row = totals) in the results grid and allow exporting it.
+        """
+        self.results_grid.set_frame(differences)
+        self.export_button.config(state='normal')
+
     def select_agency_folder(self):
         folder_selected = filedialog.askdirectory()
         if folder_selected:
@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+
+from readers import WORKBOOK_EXTENSIONS
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Optional, folders are polled instead
+    FileSystemEventHandler = object
+    Observer = None
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_INTERVAL = 2.0
+
+
+def is_workbook(path):
+    """
+    True for .xlsx, .csv and .parquet files, skipping the ~$ lock files Excel keeps next to open workbooks.
+    """
+    name = os.path.basename(path)
+    return name.lower().endswith(WORKBOOK_EXTENSIONS) and not name.startswith('~$')
+
+
+class FolderPoller:
+    def __init__(self, folders, callback, interval=DEFAULT_INTERVAL):
+        """
+        Fallback watcher: compares the size and modification time of the workbooks in
+        the folders every interval seconds and calls callback(path) for every workbook
+        that was added, changed or removed.
+        """
+        self.folders = folders
+        self.callback = callback
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = None
+        self.state = self.snapshot()
+
+    def snapshot(self):
+        state = {}
+        for folder in self.folders:
+            try:
+                names = os.listdir(folder)
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(folder, name)
+                if is_workbook(path):
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    state[path] = (stat.st_size, stat.st_mtime_ns)
+        return state
+
+    def poll(self):
+        state = self.snapshot()
+        for path in set(state) | set(self.state):
+            if state.get(path) != self.state.get(path):
+                self.callback(path)
+        self.state = state
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+# Reading a workbook raises 'opened' and 'closed_no_write' events, which must not trigger a run
+CHANGE_EVENTS = {'created', 'modified', 'moved', 'deleted', 'closed'}
+
+
+class WorkbookEventHandler(FileSystemEventHandler):
+    def __init__(self, callback):
+        """
+        Forward watchdog events that change workbooks to callback(path); moves report both paths.
+        """
+        super().__init__()
+        self.callback = callback
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in CHANGE_EVENTS:
+            return
+        for path in (event.src_path, getattr(event, 'dest_path', '')):
+            if path and is_workbook(path):
+                self.callback(os.path.abspath(path))
+
+
+class WorkbookWatcher:
+    def __init__(self, model, report_path, debounce=DEFAULT_DEBOUNCE, interval=DEFAULT_INTERVAL, polling=False):
+        """
+        Keep the prepared workbooks of the model's folders in memory and reconcile again
+        whenever a workbook is added, changed or removed. Only those workbooks are read again.
+        Events are debounced: a reconcile starts once no event came in for `debounce` seconds,
+        so a workbook that is still being copied is read once, after the last write.
+        report_path() returns the path of the next report.
+        Uses watchdog (inotify, FSEvents, ReadDirectoryChangesW) when installed and
+        polling every `interval` seconds otherwise or with polling=True.
+        """
+        self.model = model
+        self.report_path = report_path
+        self.debounce = debounce
+        self.interval = interval
+        self.polling = polling or Observer is None
+        self.frames = {}  # {(kind, path): prepared frame}
+        self.dirty = set()
+        self.last_event = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.observer = None
+
+    def folders(self):
+        folders = [os.path.abspath(path) for path in self.model.agency_folders().values()]
+        folders.append(os.path.abspath(self.model.path_protime))
+        return list(dict.fromkeys(folders))
+
+    def notify(self, path):
+        """
+        Record a changed workbook; safe to call from the observer threads.
+        """
+        with self.lock:
+            self.dirty.add(os.path.abspath(path))
+            self.last_event = time.monotonic()
+
+    def start(self):
+        if self.polling:
+            self.observer = FolderPoller(self.folders(), self.notify, self.interval)
+        else:
+            self.observer = Observer()
+            handler = WorkbookEventHandler(self.notify)
+            for folder in self.folders():
+                self.observer.schedule(handler, folder, recursive=False)
+        self.observer.start()
+        print(f"Watch: Watching {', '.join(self.folders())} ({'polling' if self.polling else 'watchdog'})")
+
+    def stop(self):
+        self.stopped.set()
+        if self.observer is not None:
+            self.observer.stop()
+            if not self.polling:
+                self.observer.join()
+            self.observer = None
+
+    def reconcile(self, dirty=()):
+        """
+        Read the workbooks that are new or in dirty, forget removed ones, compare and save the report.
+        Returns the report path.
+        """
+        self.model.start_metrics()
+        agency_files, protime_files = self.model.list_sources()
+        listed = {('agency', os.path.abspath(f)) for files in agency_files.values() for f in files}
+        listed |= {('protime', os.path.abspath(f)) for f in protime_files}
+        for job in set(self.frames) - listed:
+            print(f"Watch: Dropping removed workbook {job[1]}")
+            del self.frames[job]
+        pending = [job for job in sorted(listed) if job not in self.frames or job[1] in dirty]
+        agency_dfs, protime_dfs = self.model.read_workbooks(
+            [path for kind, path in pending if kind == 'agency'],
+            [path for kind, path in pending if kind == 'protime']
+        )
+        agency_pending = [job for job in pending if job[0] == 'agency']
+        protime_pending = [job for job in pending if job[0] == 'protime']
+        self.frames.update(zip(agency_pending, agency_dfs))
+        self.frames.update(zip(protime_pending, protime_dfs))
+
+        self.model.set_frames(
+            {
+                agency: [self.frames[('agency', os.path.abspath(f))] for f in files]
+                for agency, files in agency_files.items()
+            },
+            [self.frames[('protime', os.path.abspath(f))] for f in protime_files]
+        )
+        self.model.process_data()
+        output_path = self.report_path()
+        self.model.save_report(output_path)
+        return output_path
+
+    def run(self, on_report=None, on_error=None):
+        """
+        Reconcile once, then again after every debounced burst of changes until stop() is called.
+        Errors, e.g. a half-written workbook, are reported and the affected workbooks are read
+        again after the next change.
+        """
+        self.start()
+        dirty = set()
+        try:
+            while True:
+                try:
+                    output_path = self.reconcile(dirty)
+                    dirty = set()
+                    if on_report:
+                        on_report(output_path)
+                except Exception as e:
+                    print(f"Watch: Error reconciling - {e}")
+                    if on_error:
+                        on_error(e)
+                dirty |= self.wait_for_changes()
+                if self.stopped.is_set():
+                    break
+        finally:
+            self.stop()
+
+    def wait_for_changes(self):
+        """
+        Block until events came in and then stayed quiet for the debounce period, or until stop().
+        Returns the changed workbook paths.
+        """
+        while not self.stopped.wait(0.2):
+            with self.lock:
+                if self.last_event is not None and time.monotonic() - self.last_event >= self.debounce:
+                    dirty, self.dirty, self.last_event = self.dirty, set(), None
+                    print(f"Watch: {len(dirty)} workbook(s) changed")
+                    return dirty
+        return set()